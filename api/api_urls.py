@@ -2,13 +2,15 @@
 # File with all api's urlspatterns in one place
 #----------------------------------------------
 from django.urls import path
-from rest_framework.authtoken import views
+
+from api.users.views import ObtainExpiringAuthToken, RotateAuthToken
 
 from api.users.urls import urlpatterns as users_urlpatterns
 from api.chats.urls import urlpatterns as chats_urlpatterns
 
 urlpatterns = [
-    path('token-auth/', views.obtain_auth_token, name='api-token-auth'),
+    path('token-auth/', ObtainExpiringAuthToken.as_view(), name='api-token-auth'),
+    path('token-auth/rotate/', RotateAuthToken.as_view(), name='api-token-rotate'),
 ]
 urlpatterns += users_urlpatterns
 urlpatterns += chats_urlpatterns
@@ -0,0 +1,135 @@
+from collections import OrderedDict
+
+from rest_framework.pagination import BasePagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate queryset by ranges of unique, indexed `key_field`
+    (`?before=<key>` or `?after=<key>`) instead of OFFSET, so every page
+    costs the same index range scan however deep it is.
+
+    Results of page are ordered by key ascending. Without cursor the
+    last (newest) page is returned, or the first one if
+    `start_from_last` is False.
+    """
+    key_field = 'id'
+    start_from_last = True
+    page_size = 50
+    max_page_size = 100
+    page_size_query_param = 'limit'
+    before_query_param = 'before'
+    after_query_param = 'after'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.before = self.get_key(request, self.before_query_param)
+        self.after = self.get_key(request, self.after_query_param)
+        page_size = self.get_page_size(request)
+
+        if self.is_ascending():
+            if self.after is not None:
+                queryset = queryset.filter(
+                    **{f'{self.key_field}__gt': self.after})
+            page = list(queryset.order_by(self.key_field)[:page_size + 1])
+            self.has_more = len(page) > page_size
+            page = page[:page_size]
+        else:
+            if self.before is not None:
+                queryset = queryset.filter(
+                    **{f'{self.key_field}__lt': self.before})
+            page = list(queryset.order_by(f'-{self.key_field}')[:page_size + 1])
+            self.has_more = len(page) > page_size
+            page = page[:page_size][::-1]
+
+        self.page = page
+        return page
+
+    def get_key(self, request, param):
+        value = request.query_params.get(param)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise NotFound('Invalid cursor.')
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_page_key(self, obj):
+        return getattr(obj, self.key_field)
+
+    def is_ascending(self) -> bool:
+        return self.after is not None or (
+            self.before is None and not self.start_from_last)
+
+    def get_previous_link(self):
+        """Link to page with smaller keys"""
+        if not self.page:
+            return None
+        if self.is_ascending():
+            # First page has nothing before it
+            if self.after is None:
+                return None
+        elif not self.has_more:
+            return None
+        return self.build_link(self.before_query_param,
+            self.get_page_key(self.page[0]))
+
+    def get_next_link(self):
+        """Link to page with bigger keys"""
+        if not self.page:
+            return None
+        if self.is_ascending():
+            if not self.has_more:
+                return None
+        # Last page has nothing after it
+        elif self.before is None:
+            return None
+        return self.build_link(self.after_query_param,
+            self.get_page_key(self.page[-1]))
+
+    def build_link(self, param, key):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.before_query_param)
+        url = remove_query_param(url, self.after_query_param)
+        return replace_query_param(url, param, key)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('previous', self.get_previous_link()),
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class ChatPagination(KeysetPagination):
+    """Chats in order of creation, oldest first"""
+    page_size = 20
+    max_page_size = 100
+    start_from_last = False
+
+
+class MessagePagination(KeysetPagination):
+    key_field = 'sequence'
+
+
+class MessageSearchPagination(MessagePagination):
+    # Every found message carries snippets
+    page_size = 20
+    max_page_size = 50
+
+
+class MembershipPagination(KeysetPagination):
+    key_field = 'profile_id'
+    page_size = 100
+    max_page_size = 1000
+    start_from_last = False
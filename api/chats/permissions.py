@@ -9,4 +9,13 @@ class IsOwnerOrAuthenticatedOrReadOnly(BasePermission):
             return request.user.is_authenticated
 
     def has_object_permission(self, request, view, obj):
-        return obj.owner == request.user
+        return request.user.is_authenticated and obj.owner_id == request.user.id
+
+
+class IsChatMember(BasePermission):
+    """Allow access only to owner and members of chat"""
+    def has_permission(self, request, view):
+        return request.user.is_authenticated
+
+    def has_object_permission(self, request, view, obj):
+        return obj.has_access(request.user)
@@ -2,14 +2,21 @@ from typing import Dict, List
 
 from rest_framework.exceptions import ValidationError
 from rest_framework import serializers
+from django.utils.html import escape
 
-from apps.chats.models import Chat
+from apps.chats.models import (Chat, Message, Membership, SNIPPET_START_SEL,
+    SNIPPET_STOP_SEL)
+from api.users.serializers import ProfileSerializer, ImageRenditionsField
 
 
 META_FIELDS: Dict[str, List[str]] = {
     'CHAT_SERIALIZER_FIELDS': [
         'url', 'id', 'owner', 'label',
-        'description', 'name', 'avatar'],
+        'description', 'name', 'avatar', 'avatar_renditions'],
+    'MEMBERSHIP_SERIALIZER_FIELDS': ['id', 'role', 'joined_at'],
+    'MESSAGE_SERIALIZER_FIELDS': [
+        'chat', 'sequence', 'author', 'author_username',
+        'text', 'created_at'],
 }
 
 
@@ -18,6 +25,7 @@ class ChatSerializer(serializers.HyperlinkedModelSerializer):
         max_length=50,
         help_text='Name must be unique and cannot be changed.',
     )
+    avatar_renditions = ImageRenditionsField(source='avatar')
 
     def validate_name(self, value):
         if self.instance and self.instance.name != value:
@@ -31,3 +39,68 @@ class ChatSerializer(serializers.HyperlinkedModelSerializer):
             'url': {'view_name': 'chats:chat', 'lookup_field': 'pk'},
             'owner': {'view_name': 'api-profile', 'lookup_field': 'pk'},
         }
+
+
+class MessageSerializer(serializers.ModelSerializer):
+    author_username = serializers.CharField(
+        source='author.username',
+        read_only=True,
+        default=None,
+    )
+
+    class Meta:
+        model = Message
+        fields = META_FIELDS['MESSAGE_SERIALIZER_FIELDS']
+        read_only_fields = fields
+
+
+class MessageSearchSerializer(MessageSerializer):
+    """
+    Found message with `snippet` - escaped HTML fragments of text where
+    matched words are enclosed in <mark> tags.
+    """
+    snippet = serializers.SerializerMethodField()
+
+    def get_snippet(self, obj) -> str:
+        return escape(obj.snippet)\
+            .replace(SNIPPET_START_SEL, '<mark>')\
+            .replace(SNIPPET_STOP_SEL, '</mark>')
+
+    class Meta(MessageSerializer.Meta):
+        fields = META_FIELDS['MESSAGE_SERIALIZER_FIELDS'] + ['snippet']
+        read_only_fields = fields
+
+
+class MembershipSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='profile_id', read_only=True)
+
+    class Meta:
+        model = Membership
+        fields = META_FIELDS['MEMBERSHIP_SERIALIZER_FIELDS']
+        read_only_fields = fields
+
+
+class ExpandedMembershipSerializer(MembershipSerializer):
+    """Membership with embedded public summary of member's profile"""
+    profile = ProfileSerializer(read_only=True)
+
+    class Meta(MembershipSerializer.Meta):
+        fields = META_FIELDS['MEMBERSHIP_SERIALIZER_FIELDS'] + ['profile']
+        read_only_fields = fields
+
+
+class BulkMembershipSerializer(serializers.Serializer):
+    """Batch of profiles ids for bulk operations with chat members"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=50000,
+    )
+    role = serializers.ChoiceField(
+        choices=Membership.ROLE_CHOICES,
+        default=Membership.MEMBER,
+    )
+
+    def validate_ids(self, value):
+        # Remove duplicates, but keep order of ids
+        return list(dict.fromkeys(value))
@@ -1,3 +1,5 @@
+import json
+
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
@@ -29,7 +31,86 @@ class TestChatViewSet__List(APITestCase):
         )
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 10)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNone(response.data['next'])
+
+    def get_names(self, response):
+        return [chat['name'] for chat in response.data['results']]
+
+    def test_pagination(self):
+        url = reverse('api-chat-list')
+        response = self.client.get(url, {'limit': 4})
+        self.assertEqual(self.get_names(response), [
+            'name_1', 'name_2', 'name_3', 'name_4'])
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(self.get_names(response), [
+            'name_5', 'name_6', 'name_7', 'name_8'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(self.get_names(response), ['name_9', 'name_10'])
+        self.assertIsNone(response.data['next'])
+
+    def test_filters(self):
+        u2 = Profile.objects.create_user(
+            username='testuser2',
+            email='testuser2@mail.com',
+            password='hardpwd123',
+        )
+        chat = Chat.objects.create(owner=u2, label='Label', name='other')
+        Chat.objects.get(name='name_3').add_member_by_id(u2.pk)
+        url = reverse('api-chat-list')
+
+        response = self.client.get(url, {'owner': u2.pk})
+        self.assertEqual(self.get_names(response), ['other'])
+
+        response = self.client.get(url, {'member': u2.pk})
+        self.assertEqual(self.get_names(response), ['name_3'])
+
+        self.client.force_login(u2)
+        response = self.client.get(url, {'member': 'me', 'owner': self.u1.pk})
+        self.assertEqual(self.get_names(response), ['name_3'])
+
+        response = self.client.get(url, {'owner': 'somebody'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_member_me_requires_authentication(self):
+        response = self.client.get(reverse('api-chat-list'), {'member': 'me'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_sparse_fields(self):
+        url = reverse('api-chat-list')
+        response = self.client.get(url, {'fields': 'id,name', 'limit': 1})
+        self.assertEqual(
+            response.data['results'],
+            [{'id': Chat.objects.get(name='name_1').pk, 'name': 'name_1'}],
+        )
+        etag = response['ETag']
+
+        response = self.client.get(url, {'limit': 1})
+        self.assertIn('label', response.data['results'][0])
+        self.assertNotEqual(response['ETag'], etag)
+
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_etag(self):
+        url = reverse('api-chat-list')
+        response = self.client.get(url, format='json')
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        chat = Chat.objects.get(name='name_1')
+        chat.label = 'Changed'
+        chat.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn(
+            'Changed', [c['label'] for c in response.data['results']])
 
 
 class TestChatViewSet__Create(APITestCase):
@@ -111,6 +192,51 @@ class TestChatViewSet__Retrieve(APITestCase):
         self.assertEqual(response.data['detail'], 'Authentication credentials were not provided.')
 
 
+class TestChatViewSet__RetrieveCache(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = Profile.objects.create_user(
+            username='testuser',
+            email='testuser@mail.com',
+            password='hardpwd123',
+        )
+        cls.chat = Chat.objects.create(
+            owner=cls.u1,
+            label='Label',
+            name='name',
+        )
+
+    def setUp(self):
+        self.client.force_login(self.u1)
+
+    def test_etag(self):
+        url = reverse('api-chat-details', kwargs={'pk': self.chat.pk})
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        # Chat permissions check only, session is stored in cookie
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data['label'], 'Label')
+
+        self.client.patch(url, {'label': 'New'}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['label'], 'New')
+
+    def test_deleted_chat(self):
+        chat = Chat.objects.create(owner=self.u1, label='Label', name='other')
+        url = reverse('api-chat-details', kwargs={'pk': chat.pk})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        Chat.objects.get(pk=chat.pk).delete()
+        self.assertEqual(
+            self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
 class TestChatMembersView(APITestCase):
     @classmethod
     def setUpTestData(cls):
@@ -145,7 +271,293 @@ class TestChatMembersView(APITestCase):
             format='json',
         )
 
-        self.assertEqual(len(response.data['members']), 5)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(response.data['results'][0]['role'], 'member')
+
+    def test_pagination(self):
+        self.client.force_login(self.u1)
+        url = reverse('api-chat-members', kwargs={'pk': self.chat1.pk})
+        ids = sorted(Profile.objects.values_list('id', flat=True))
+
+        response = self.client.get(url + '?limit=3', format='json')
+        self.assertEqual([m['id'] for m in response.data['results']], ids[:3])
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get(response.data['next'], format='json')
+        self.assertEqual([m['id'] for m in response.data['results']], ids[3:])
+        self.assertIsNone(response.data['next'])
+
+    def test_expand_profile(self):
+        self.client.force_login(self.u1)
+        url = reverse('api-chat-members', kwargs={'pk': self.chat1.pk})
+
+        with self.assertNumQueries(3):
+            # user, chat and members with profiles (session is cookie)
+            response = self.client.get(url + '?expand=profile', format='json')
+
+        member = response.data['results'][0]
+        self.assertEqual(member['profile']['id'], member['id'])
+        self.assertIn(
+            reverse('users:profile', kwargs={'pk': member['id']}),
+            member['profile']['url'])
+
+    def test_ndjson_export(self):
+        self.client.force_login(self.u1)
+        response = self.client.get(
+            reverse('api-chat-members', kwargs={'pk': self.chat1.pk})
+            + '?export=ndjson',
+        )
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines],
+            sorted(Profile.objects.values_list('id', flat=True)))
+
+
+class TestChatBulkMembersView(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = Profile.objects.create_user(
+            username='testuser1',
+            email='testuser1@mail.com',
+            password='hardpwd123',
+        )
+        cls.u2 = Profile.objects.create_user(
+            username='testuser2',
+            email='testuser2@mail.com',
+            password='hardpwd123',
+        )
+        cls.u3 = Profile.objects.create_user(
+            username='testuser3',
+            email='testuser3@mail.com',
+            password='hardpwd123',
+        )
+
+        cls.chat1 = Chat.objects.create(
+            owner=cls.u1,
+            label='Label №1',
+            name='name_1',
+        )
+
+    def setUp(self):
+        self.url = reverse('api-chat-members', kwargs={'pk': self.chat1.pk})
+        self.chat1.add_member_by_id(self.u2.id)
+
+    def get_statuses(self, response):
+        return [(r['id'], r['status']) for r in response.data['results']]
+
+    def test_add_members(self):
+        self.client.force_login(self.u1)
+        response = self.client.post(
+            self.url,
+            data={'ids': [self.u2.id, self.u3.id, 100500, self.u3.id]},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_statuses(response), [
+            (self.u2.id, 'already_member'),
+            (self.u3.id, 'added'),
+            (100500, 'not_found'),
+        ])
+        self.assertTrue(self.chat1.has_member(self.u3.id))
+        self.assertEqual(self.chat1.memberships.count(), 2)
+
+    def test_change_members_role(self):
+        self.client.force_login(self.u1)
+        response = self.client.patch(
+            self.url,
+            data={'ids': [self.u2.id, self.u3.id], 'role': 'moderator'},
+            format='json',
+        )
+
+        self.assertEqual(self.get_statuses(response), [
+            (self.u2.id, 'updated'),
+            (self.u3.id, 'not_member'),
+        ])
+        self.assertEqual(
+            self.chat1.memberships.get(profile=self.u2).role, 'moderator')
+
+    def test_remove_members(self):
+        self.client.force_login(self.u1)
+        response = self.client.delete(
+            self.url,
+            data={'ids': [self.u2.id, self.u3.id]},
+            format='json',
+        )
+
+        self.assertEqual(self.get_statuses(response), [
+            (self.u2.id, 'removed'),
+            (self.u3.id, 'not_member'),
+        ])
+        self.assertFalse(self.chat1.has_member(self.u2.id))
+
+    def test_errors(self):
+        self.client.force_login(self.u1)
+        response = self.client.post(self.url, data={'ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.patch(
+            self.url, data={'ids': [self.u2.id], 'role': 'king'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Only owner can manage members
+        self.client.force_login(self.u2)
+        response = self.client.post(
+            self.url, data={'ids': [self.u3.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(self.chat1.has_member(self.u3.id))
+
+
+class TestChatMessagesView(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = Profile.objects.create_user(
+            username='testuser1',
+            email='testuser1@mail.com',
+            password='hardpwd123',
+        )
+        cls.u2 = Profile.objects.create_user(
+            username='testuser2',
+            email='testuser2@mail.com',
+            password='hardpwd123',
+        )
+
+        cls.chat1 = Chat.objects.create(
+            owner=cls.u1,
+            label='Label №1',
+            name='name_1',
+        )
+        for i in range(1, 121):
+            cls.chat1.post_message(cls.u1, f'message {i}')
+
+    def get_sequences(self, response):
+        return [m['sequence'] for m in response.data['results']]
+
+    def test_latest_page(self):
+        self.client.force_login(self.u1)
+        response = self.client.get(
+            reverse('api-chat-messages', kwargs={'pk': self.chat1.pk}),
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_sequences(response), list(range(71, 121)))
+        self.assertEqual(response.data['results'][-1]['text'], 'message 120')
+        self.assertEqual(response.data['results'][-1]['author'], self.u1.id)
+        self.assertIsNone(response.data['next'])
+        self.assertIn('before=71', response.data['previous'])
+
+    def test_scroll_back(self):
+        self.client.force_login(self.u1)
+        url = reverse('api-chat-messages', kwargs={'pk': self.chat1.pk})
+
+        response = self.client.get(url + '?before=71', format='json')
+        self.assertEqual(self.get_sequences(response), list(range(21, 71)))
+        self.assertIn('after=70', response.data['next'])
+
+        response = self.client.get(response.data['previous'], format='json')
+        self.assertEqual(self.get_sequences(response), list(range(1, 21)))
+        self.assertIsNone(response.data['previous'])
+
+    def test_newer_messages(self):
+        self.client.force_login(self.u1)
+        response = self.client.get(
+            reverse('api-chat-messages', kwargs={'pk': self.chat1.pk})
+            + '?after=100&limit=10',
+            format='json',
+        )
+
+        self.assertEqual(self.get_sequences(response), list(range(101, 111)))
+        self.assertIn('after=110', response.data['next'])
+
+        response = self.client.get(response.data['next'], format='json')
+        self.assertEqual(self.get_sequences(response), list(range(111, 121)))
+        self.assertIsNone(response.data['next'])
+
+    def test_permissions(self):
+        url = reverse('api-chat-messages', kwargs={'pk': self.chat1.pk})
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_login(self.u2)
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.chat1.add_member_by_id(self.u2.id)
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TestChatMessagesSearchView(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = Profile.objects.create_user(
+            username='testuser1',
+            email='testuser1@mail.com',
+            password='hardpwd123',
+        )
+        cls.u2 = Profile.objects.create_user(
+            username='testuser2',
+            email='testuser2@mail.com',
+            password='hardpwd123',
+        )
+
+        cls.chat1 = Chat.objects.create(
+            owner=cls.u1,
+            label='Label №1',
+            name='name_1',
+        )
+        cls.chat2 = Chat.objects.create(
+            owner=cls.u1,
+            label='Label №2',
+            name='name_2',
+        )
+        for i in range(1, 31):
+            cls.chat1.post_message(cls.u1, f'meeting {i}' if i % 2 else 'hi')
+        cls.chat1.post_message(cls.u1, 'Meetings are moved, Tom & Jerry')
+        cls.chat2.post_message(cls.u1, 'meeting in other chat')
+
+    def get_sequences(self, response):
+        return [m['sequence'] for m in response.data['results']]
+
+    def test_search(self):
+        self.client.force_login(self.u1)
+        url = reverse('api-chat-messages-search', kwargs={'pk': self.chat1.pk})
+        response = self.client.get(url, {'q': 'meet', 'limit': 10})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_sequences(response), list(range(13, 30, 2)) + [31])
+        self.assertEqual(
+            response.data['results'][-1]['snippet'],
+            '<mark>Meetings</mark> are moved, Tom &amp; Jerry',
+        )
+        self.assertIn('before=13', response.data['previous'])
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self.get_sequences(response), list(range(1, 12, 2)))
+        self.assertIsNone(response.data['previous'])
+
+    def test_empty_query(self):
+        self.client.force_login(self.u1)
+        url = reverse('api-chat-messages-search', kwargs={'pk': self.chat1.pk})
+        response = self.client.get(url, {'q': '!'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_permissions(self):
+        url = reverse('api-chat-messages-search', kwargs={'pk': self.chat1.pk})
+        response = self.client.get(url, {'q': 'meeting'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_login(self.u2)
+        response = self.client.get(url, {'q': 'meeting'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.chat1.add_member_by_id(self.u2.id)
+        response = self.client.get(url, {'q': 'meeting'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
 class TestChatViewSet__Partial_Update(APITestCase):
@@ -6,6 +6,9 @@ chats_list = ChatViewSet.as_view({
     'get': 'list',
     'post': 'create',
 })
+chats_search = ChatViewSet.as_view({
+    'get': 'search',
+})
 chat_details = ChatViewSet.as_view({
     'get': 'retrieve',
     'patch': 'partial_update',
@@ -13,6 +16,15 @@ chat_details = ChatViewSet.as_view({
 })
 chat_members = ChatViewSet.as_view({
     'get': 'members',
+    'post': 'add_members',
+    'patch': 'change_members_role',
+    'delete': 'remove_members',
+})
+chat_messages = ChatViewSet.as_view({
+    'get': 'messages',
+})
+chat_messages_search = ChatViewSet.as_view({
+    'get': 'search_messages',
 })
 
 urlpatterns = [
@@ -22,6 +34,12 @@ urlpatterns = [
         name='api-chat-list',
     ),
 
+    path(
+        'chats/search',
+        chats_search,
+        name='api-chat-search',
+    ),
+
     path(
         'chats/<int:pk>',
         chat_details,
@@ -33,4 +51,16 @@ urlpatterns = [
         chat_members,
         name='api-chat-members',
     ),
+
+    path(
+        'chats/<int:pk>/messages',
+        chat_messages,
+        name='api-chat-messages',
+    ),
+
+    path(
+        'chats/<int:pk>/messages/search',
+        chat_messages_search,
+        name='api-chat-messages-search',
+    ),
 ]
\ No newline at end of file
@@ -1,22 +1,319 @@
+import hashlib
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.generics import RetrieveAPIView
+from rest_framework.exceptions import ValidationError, NotAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.fields import DateTimeField
+from django.db import transaction
 from rest_framework import viewsets
 
-from .permissions import IsOwnerOrAuthenticatedOrReadOnly
-from .serializers import ChatSerializer
-from apps.chats.models import Chat
+from .permissions import IsOwnerOrAuthenticatedOrReadOnly, IsChatMember
+from .serializers import (ChatSerializer, MessageSerializer,
+    MessageSearchSerializer, MembershipSerializer, ExpandedMembershipSerializer,
+    BulkMembershipSerializer)
+from .pagination import (ChatPagination, MessagePagination,
+    MessageSearchPagination, MembershipPagination)
+from apps.chats.models import Chat, Membership
+from apps.chats.cache import get_cached_representations
 
 
 class ChatViewSet(viewsets.ModelViewSet):
     permission_classes = [IsOwnerOrAuthenticatedOrReadOnly]
     queryset = Chat.objects.all()
     serializer_class = ChatSerializer
+    pagination_class = ChatPagination
+    search_limit = 20
+    search_max_limit = 50
+    search_max_query_length = 100
+
+    def get_permissions(self):
+        if self.action in ('messages', 'search_messages'):
+            return [IsChatMember()]
+        return super().get_permissions()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('retrieve', 'members', 'messages', 'search_messages',
+                'add_members', 'remove_members', 'change_members_role'):
+            # Only fields needed for permissions checks and cache
+            queryset = queryset.only('pk', 'owner', 'cache_version')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Chats paginated by id (?after=<id>, ?before=<id>), filtered by
+        ?owner=<id> and ?member=<id> ('me' for current user) and
+        limited to ?fields=<name>,... Chats are serialized from cache by
+        their versions, ETag of page is built from ids and versions.
+        """
+        fields = self.get_sparse_fields()
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.only('pk', 'cache_version'))
+        ids = [chat.pk for chat in page]
+        versions = {chat.pk: chat.cache_version for chat in page}
+        etag = self.get_etag(':'.join([
+            '.'.join(f'{pk}-{versions[pk]}' for pk in ids),
+            ','.join(fields),
+            # Links change when chats are added after last page
+            str(self.paginator.get_previous_link()),
+            str(self.paginator.get_next_link()),
+        ]))
+        not_modified = self.get_not_modified_response(etag)
+        if not_modified is not None:
+            return not_modified
+
+        representations = get_cached_representations(
+            versions,
+            self.get_representation_kind(),
+            lambda missing: {
+                chat.pk: self.get_serializer(chat).data
+                for chat in Chat.objects.filter(pk__in=missing)
+            },
+        )
+        response = self.get_paginated_response([
+            self.select_fields(representations[pk], fields) for pk in ids])
+        response['ETag'] = etag
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        """Chat is served from cache, unchanged chat returns 304"""
+        fields = self.get_sparse_fields()
+        chat = self.get_object()
+        version = chat.cache_version
+        etag = self.get_etag(f'{chat.pk}-{version}:{",".join(fields)}')
+        not_modified = self.get_not_modified_response(etag)
+        if not_modified is not None:
+            return not_modified
+
+        representation = get_cached_representations(
+            {chat.pk: version},
+            self.get_representation_kind(),
+            lambda missing: {
+                chat.pk: self.get_serializer(Chat.objects.get(pk=chat.pk)).data
+            },
+        )[chat.pk]
+        response = Response(self.select_fields(representation, fields))
+        response['ETag'] = etag
+        return response
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        owner = self.get_profile_id_param('owner')
+        if owner is not None:
+            queryset = queryset.filter(owner_id=owner)
+        member = self.get_profile_id_param('member')
+        if member is not None:
+            queryset = queryset.filter(memberships__profile_id=member)
+        return queryset
+
+    def get_profile_id_param(self, param):
+        """Return id of profile from query param, 'me' is current user"""
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        if value == 'me':
+            if not self.request.user.is_authenticated:
+                raise NotAuthenticated()
+            return self.request.user.id
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({param: 'Must be id of profile or "me".'})
+
+    def get_sparse_fields(self) -> list:
+        """Return fields requested by ?fields=, all fields by default"""
+        all_fields = self.get_serializer_class().Meta.fields
+        value = self.request.query_params.get('fields')
+        if not value:
+            return list(all_fields)
+        fields = list(dict.fromkeys(
+            name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in fields if name not in all_fields]
+        if unknown:
+            raise ValidationError(
+                {'fields': f'Unknown fields: {", ".join(unknown)}.'})
+        return fields
+
+    def select_fields(self, representation: dict, fields: list) -> dict:
+        return {name: representation[name] for name in fields}
+
+    def get_representation_kind(self) -> str:
+        # Serialized chats contain absolute urls
+        return f'api.{self.request.scheme}.{self.request.get_host()}'
+
+    def get_etag(self, value: str) -> str:
+        return quote_etag(hashlib.sha1(
+            f'{self.get_representation_kind()}:{value}'.encode()).hexdigest())
+
+    def get_not_modified_response(self, etag: str):
+        response = get_conditional_response(self.request, etag=etag)
+        if response is not None:
+            response['ETag'] = etag
+        return response
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
-    
+
     @action(methods=['get'], detail=False)
+    def search(self, request, *args, **kwargs):
+        """
+        Chats matching ?q= ordered by relevance (?limit=<n> of them).
+        `?q=@name` searches chats by name.
+        """
+        query = request.query_params.get('q', '')[:self.search_max_query_length]
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = self.search_limit
+        limit = max(1, min(limit, self.search_max_limit))
+
+        chats = self.get_queryset().search(query)[:limit]
+        serializer = self.get_serializer(chats, many=True)
+        return Response({'results': serializer.data})
+    
+    @action(methods=['get'], detail=True)
     def members(self, request, *args, **kwargs):
-        return Response({'members': self.get_object().members})
+        """
+        Members of chat, paginated by profile id (?after=<id>).
+        ?expand=profile embeds public profile summaries,
+        ?export=ndjson streams all members as newline delimited json.
+        """
+        memberships = self.get_object().memberships.all()
+        if request.query_params.get('export') == 'ndjson':
+            return self._stream_members(memberships)
+
+        serializer_class = MembershipSerializer
+        if request.query_params.get('expand') == 'profile':
+            memberships = memberships.select_related('profile')
+            serializer_class = ExpandedMembershipSerializer
+
+        paginator = MembershipPagination()
+        page = paginator.paginate_queryset(memberships, request, view=self)
+        serializer = serializer_class(
+            page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @members.mapping.post
+    def add_members(self, request, *args, **kwargs):
+        """Add batch of profiles ({"ids": [...], "role": ...}) to chat"""
+        return self._bulk_members_operation(
+            request,
+            lambda chat, data: Membership.objects.bulk_add(
+                chat, data['ids'], data['role']),
+            statuses=('added', 'already_member'),
+            fallback_status='not_found',
+        )
+
+    @members.mapping.patch
+    def change_members_role(self, request, *args, **kwargs):
+        """Set role ({"ids": [...], "role": ...}) of batch of members"""
+        return self._bulk_members_operation(
+            request,
+            lambda chat, data: Membership.objects.bulk_set_role(
+                chat, data['ids'], data['role']),
+            statuses=('updated', 'not_member'),
+        )
+
+    @members.mapping.delete
+    def remove_members(self, request, *args, **kwargs):
+        """Remove batch of members ({"ids": [...]}) from chat"""
+        return self._bulk_members_operation(
+            request,
+            lambda chat, data: Membership.objects.bulk_remove(
+                chat, data['ids']),
+            statuses=('removed', 'not_member'),
+        )
+
+    def _bulk_members_operation(self, request, operation, statuses,
+        fallback_status=None) -> Response:
+        """
+        Run set-based operation with batch of ids in one transaction
+        and return status of every passed id.
+
+         Args:
+           operation - function (chat, validated_data) -> set of
+                       affected profiles ids
+           statuses - statuses for (affected, not affected) ids
+           fallback_status - status for not affected ids which
+                       are not members of chat either
+        """
+        chat = self.get_object()
+        serializer = BulkMembershipSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+
+        with transaction.atomic():
+            affected = operation(chat, serializer.validated_data)
+            members = set()
+            if fallback_status:
+                members = set(chat.memberships.filter(
+                    profile_id__in=set(ids) - affected,
+                ).values_list('profile_id', flat=True))
+
+        def get_status(profile_id):
+            if profile_id in affected:
+                return statuses[0]
+            if fallback_status and profile_id not in members:
+                return fallback_status
+            return statuses[1]
+
+        return Response({'results': [
+            {'id': profile_id, 'status': get_status(profile_id)}
+            for profile_id in ids
+        ]})
+
+    def _stream_members(self, memberships) -> StreamingHttpResponse:
+        rows = memberships.order_by('profile_id').values_list(
+            'profile_id', 'role', 'joined_at').iterator(chunk_size=2000)
+        date_field = DateTimeField()
+        lines = (
+            json.dumps({
+                'id': profile_id,
+                'role': role,
+                'joined_at': date_field.to_representation(joined_at),
+            }) + '\n'
+            for profile_id, role, joined_at in rows
+        )
+        return StreamingHttpResponse(
+            lines, content_type='application/x-ndjson')
+
+
+    @action(methods=['get'], detail=True)
+    def messages(self, request, *args, **kwargs):
+        """
+        History of chat messages, paginated by message sequence number
+        (?before=<sequence> for older and ?after=<sequence> for newer).
+        """
+        paginator = MessagePagination()
+        page = paginator.paginate_queryset(
+            self.get_object().messages.select_related('author'),
+            request,
+            view=self,
+        )
+        serializer = MessageSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(methods=['get'], detail=True, url_path='messages/search')
+    def search_messages(self, request, *args, **kwargs):
+        """
+        Messages of chat matching ?q= with highlighted snippets, newest
+        first page is returned and older pages are fetched with
+        ?before=<sequence>, like history of chat.
+        """
+        query = request.query_params.get('q', '')[:self.search_max_query_length]
+        paginator = MessageSearchPagination()
+        page = paginator.paginate_queryset(
+            self.get_object().messages.search(query).select_related('author'),
+            request,
+            view=self,
+        )
+        serializer = MessageSearchSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.authtoken.models import Token
+from django.utils import timezone
+from django.conf import settings
+
+from apps.users.cache import token_cache, user_cache
+
+
+def get_token_expires(created):
+    return created + timedelta(seconds=settings.API_TOKEN_LIFETIME)
+
+
+def is_token_expired(created) -> bool:
+    return get_token_expires(created) <= timezone.now()
+
+
+def rotate_token(user) -> Token:
+    """Replace token of user with new one"""
+    Token.objects.filter(user=user).delete()
+    return Token.objects.create(user=user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication which loads tokens and users from caches
+    (see apps.users.cache), so authenticated request usually doesn't
+    query database. Tokens expire API_TOKEN_LIFETIME seconds after
+    creation and must be rotated.
+    """
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            raise AuthenticationFailed('Invalid token.')
+        user_id, created = entry
+        if is_token_expired(created):
+            raise AuthenticationFailed('Token has expired.')
+
+        user = user_cache.get(user_id)
+        if user is None or not user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+
+        token = Token.from_db(
+            'default', ['key', 'user_id', 'created'], [key, user_id, created])
+        token.user = user
+        return (user, token)
@@ -0,0 +1,28 @@
+from rest_framework.parsers import BaseParser
+from django.conf import settings
+
+from apps.users.imports import READERS
+
+
+class UsersImportParser(BaseParser):
+    """
+    Parse body into lazy (line number, row) pairs of apps.users.imports,
+    so body is read from stream while users are imported.
+    """
+    format = None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        lines = (line.decode(encoding) for line in iter(stream.readline, b''))
+        return READERS[self.format](lines)
+
+
+class CSVUsersParser(UsersImportParser):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONUsersParser(UsersImportParser):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
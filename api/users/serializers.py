@@ -6,11 +6,30 @@ from apps.users.models import Profile
 
 
 META_FIELDS: Dict[str, List[str]] = {
-    'PROFILE_SERIALIZER_FIELDS': ['url', 'id', 'avatar_image'],
+    'PROFILE_SERIALIZER_FIELDS': [
+        'url', 'id', 'avatar_image', 'avatar_renditions'],
 }
 
 
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """
+    Represent RenditionImageField as
+    {size_name: {format: absolute url}}.
+    """
+    def to_representation(self, value):
+        request = self.context.get('request')
+        return {
+            size_name: {
+                image_format: request.build_absolute_uri(url) if request else url
+                for image_format, url in formats.items()
+            }
+            for size_name, formats in value.renditions.items()
+        }
+
+
 class ProfileSerializer(serializers.HyperlinkedModelSerializer):
+    avatar_renditions = ImageRenditionsField(source='avatar_image')
+
     class Meta:
         model = Profile
         fields = META_FIELDS['PROFILE_SERIALIZER_FIELDS']
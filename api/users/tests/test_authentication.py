@@ -0,0 +1,137 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import Permission, ContentType
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.test import override_settings
+from django.urls import reverse
+
+from apps.users.cache import token_cache, user_cache
+from apps.users.utils import (get_can_login_permission_id,
+    grant_login_permission)
+from apps.users.models import Profile
+from ..authentication import CachedTokenAuthentication
+
+
+class TestCachedTokenAuthentication(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = Profile.objects.create_user(
+            username='temp1',
+            email='temp1@mail.co',
+            password='hardpwd123'
+        )
+
+    def setUp(self):
+        token_cache.clear()
+        user_cache.clear()
+        self.token = Token.objects.create(user=self.u1)
+        self.url = reverse('api-token-rotate')
+
+    def authenticate(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+    def test_cached_token(self):
+        authentication = CachedTokenAuthentication()
+        with self.assertNumQueries(2):
+            user, token = authentication.authenticate_credentials(
+                self.token.key)
+        with self.assertNumQueries(0):
+            user, token = authentication.authenticate_credentials(
+                self.token.key)
+        self.assertEqual(user, self.u1)
+        self.assertEqual(token, self.token)
+        self.assertEqual(token.created, self.token.created)
+
+    def test_invalid_token_is_cached(self):
+        self.authenticate('a' * 40)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        with self.assertNumQueries(0):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rotated_token_is_invalid(self):
+        self.authenticate(self.token.key)
+        new_key = self.client.post(self.url).data['token']
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(str(response.data['detail']), 'Invalid token.')
+
+        self.authenticate(new_key)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_expired_token(self):
+        self.authenticate(self.token.key)
+        with override_settings(API_TOKEN_LIFETIME=0):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(str(response.data['detail']), 'Token has expired.')
+
+    def test_deactivated_user(self):
+        self.authenticate(self.token.key)
+        self.assertEqual(
+            self.client.post(self.url).status_code, status.HTTP_200_OK)
+
+        self.authenticate(Token.objects.get(user=self.u1).key)
+        user = Profile.objects.get(pk=self.u1.pk)
+        user.is_active = False
+        user.save()
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(
+            str(response.data['detail']), 'User inactive or deleted.')
+
+    @override_settings(USERS_CACHE_ALIAS='default')
+    def test_shared_cache(self):
+        self.assertEqual(token_cache.get(self.token.key)[0], self.u1.pk)
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(token_cache.get(self.token.key)[0], self.u1.pk)
+
+        key = self.token.key
+        self.token.delete()
+        token_cache.clear()
+        self.assertIsNone(token_cache.get(key))
+
+
+class TestObtainAuthToken(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = Profile.objects.create_user(
+            username='temp1',
+            email='temp1@mail.co',
+            password='hardpwd123'
+        )
+        Permission.objects.create(
+            codename='can_login',
+            name='Can login to site',
+            content_type=ContentType.objects.get_for_model(Profile),
+        )
+        get_can_login_permission_id.cache_clear()
+        grant_login_permission(cls.u1)
+
+    def obtain(self):
+        return self.client.post(reverse('api-token-auth'), {
+            'username': 'temp1',
+            'password': 'hardpwd123',
+        })
+
+    def test_obtain(self):
+        response = self.obtain()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data['token'], Token.objects.get(user=self.u1).key)
+        self.assertIn('expires', response.data)
+        self.assertEqual(self.obtain().data['token'], response.data['token'])
+
+    def test_expired_token_is_rotated(self):
+        key = self.obtain().data['token']
+        Token.objects.filter(key=key).update(
+            created=Token.objects.get(key=key).created - timedelta(days=31))
+        new_key = self.obtain().data['token']
+        self.assertNotEqual(new_key, key)
+        self.assertFalse(Token.objects.filter(key=key).exists())
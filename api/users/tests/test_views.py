@@ -58,3 +58,75 @@ class TestProfileViewSet(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(str(response.data['detail']), 'Not found.')
+
+
+class TestImportUsers(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Profile.objects.create_superuser(
+            username='admin',
+            email='admin@mail.co',
+            password='hardpwd123',
+        )
+        cls.u1 = Profile.objects.create_user(
+            username='temp1',
+            email='temp1@mail.co',
+            password='hardpwd123',
+        )
+
+    def test_permissions(self):
+        url = reverse('api-profiles-import')
+        response = self.client.post(url, 'username,email\n',
+            content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(self.u1)
+        response = self.client.post(url, 'username,email\n',
+            content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(
+            reverse('api-profiles-import'),
+            '{"username": "temp2", "email": "temp2@mail.co"}\n'
+            '{"username": "temp1", "email": "temp3@mail.co"}\n',
+            content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [{'line': 2, 'errors': [
+            'User with this username or email already exists.']}])
+        self.assertTrue(Profile.objects.filter(username='temp2').exists())
+
+        response = self.client.post(
+            reverse('api-profiles-import'), '{}', content_type='application/json')
+        self.assertEqual(response.status_code,
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_limits(self):
+        self.client.force_authenticate(self.admin)
+        body = 'username,email\n' + ''.join(
+            f'user{i},user{i}@mail.co\n' for i in range(3))
+
+        with self.settings(USERS_IMPORT_API_MAX_ROWS=2):
+            response = self.client.post(reverse('api-profiles-import'), body,
+                content_type='text/csv')
+        self.assertEqual(response.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        with self.settings(USERS_IMPORT_API_MAX_SIZE=len(body) - 1):
+            response = self.client.post(reverse('api-profiles-import'), body,
+                content_type='text/csv')
+        self.assertEqual(response.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(Profile.objects.filter(username='user0').exists())
+
+    def test_malformed_content_length(self):
+        self.client.force_authenticate(self.admin)
+        for content_length in ['abc', '-1']:
+            response = self.client.post(reverse('api-profiles-import'),
+                'username,email\n', content_type='text/csv',
+                CONTENT_LENGTH=content_length)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
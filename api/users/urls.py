@@ -1,6 +1,6 @@
 from django.urls import path
 
-from .views import ProfileViewSet
+from .views import ProfileViewSet, ImportUsers
 
 profile_detail = ProfileViewSet.as_view({
     'get': 'retrieve'
@@ -8,4 +8,5 @@ profile_detail = ProfileViewSet.as_view({
 
 urlpatterns = [
     path('profiles/<int:pk>/', profile_detail, name='api-profile'),
+    path('profiles/import/', ImportUsers.as_view(), name='api-profiles-import'),
 ]
\ No newline at end of file
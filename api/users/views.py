@@ -1,9 +1,22 @@
+from itertools import islice
 from typing import Dict
 
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import viewsets
 from rest_framework import mixins
+from rest_framework import status
+from django.db import transaction
+from django.conf import settings
 
+from .authentication import get_token_expires, is_token_expired, rotate_token
+from .parsers import CSVUsersParser, NDJSONUsersParser
 from .serializers import ProfileSerializer
+from apps.users.imports import import_users
 from apps.users.models import Profile
 
 
@@ -26,3 +39,69 @@ class ProfileViewSet(viewsets.ReadOnlyModelViewSet):
             if value != 'hidden' and field not in serializer_cls.Meta.fields:
                 serializer_cls.Meta.fields.append(field)
         return serializer_cls
+
+
+def get_token_response(token) -> Response:
+    return Response({
+        'token': token.key,
+        'expires': get_token_expires(token.created),
+    })
+
+
+class ObtainExpiringAuthToken(ObtainAuthToken):
+    """Return token of user, expired token is replaced with new one"""
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        with transaction.atomic():
+            token, _ = Token.objects.get_or_create(user=user)
+            if is_token_expired(token.created):
+                token = rotate_token(user)
+        return get_token_response(token)
+
+
+class RotateAuthToken(APIView):
+    """Replace token of authenticated user with new one"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        with transaction.atomic():
+            token = rotate_token(request.user)
+        return get_token_response(token)
+
+
+class ImportTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Import is too large, use import_users command.'
+    default_code = 'import_too_large'
+
+
+class ImportUsers(APIView):
+    """
+    Create users from CSV or NDJSON body (see apps.users.imports) and
+    return numbers of created and failed rows with errors of rows.
+    Passwords are hashed in request, so body is limited by
+    USERS_IMPORT_API_MAX_SIZE bytes and USERS_IMPORT_API_MAX_ROWS rows.
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [CSVUsersParser, NDJSONUsersParser]
+
+    def post(self, request, *args, **kwargs):
+        if self.get_content_length(request) > settings.USERS_IMPORT_API_MAX_SIZE:
+            raise ImportTooLarge()
+        max_rows = settings.USERS_IMPORT_API_MAX_ROWS
+        rows = list(islice(request.data, max_rows + 1))
+        if len(rows) > max_rows:
+            raise ImportTooLarge(
+                f'Import has more than {max_rows} rows, use import_users command.')
+        return Response(import_users(rows, processes=1))
+
+    def get_content_length(self, request) -> int:
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            raise ParseError('Invalid Content-Length header.')
+        return content_length
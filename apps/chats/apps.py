@@ -1,5 +1,11 @@
+from django.db.models.signals import post_migrate
 from django.apps import AppConfig
 
 
 class ChatsConfig(AppConfig):
-    name = 'chats'
+    name = 'apps.chats'
+
+    def ready(self):
+        from .search import install_search
+        from . import signals
+        post_migrate.connect(install_search, sender=self)
@@ -0,0 +1,56 @@
+"""
+Cached representations of chats.
+
+Every chat row has `cache_version`, which is increased by the same
+statement that changes chat (see Chat.save) or right after its
+memberships change (see signals), so all processes see new version as
+soon as change is committed. Rendered fragments and serialized chats are
+cached (CHATS_CACHE_ALIAS) under version they were built for and version
+doubles as ETag. Stale entries are never read again and just expire.
+
+Representation is built from row loaded after version was read, so it
+can only be newer than its version, never older.
+"""
+from typing import Dict
+
+from django.core.cache import caches
+from django.conf import settings
+
+
+def get_cache():
+    return caches[settings.CHATS_CACHE_ALIAS]
+
+
+def get_representation_key(chat_id: int, version: int, kind: str) -> str:
+    return f'chats.chat.{chat_id}.{version}.{kind}'
+
+
+def get_cached_representations(chats_versions: Dict[int, int], kind: str,
+    build) -> Dict[int, object]:
+    """
+    Return {chat_id: representation} for chats of passed versions.
+
+     Args:
+       kind - name of representation, e.g. 'api' (with everything
+              it depends on, like host of absolute urls)
+       build - function (missing chat ids) -> {chat_id: representation}
+    """
+    cache = get_cache()
+    keys = {
+        get_representation_key(chat_id, version, kind): chat_id
+        for chat_id, version in chats_versions.items()
+    }
+    representations = {
+        keys[key]: value for key, value in cache.get_many(keys).items()}
+
+    missing = [chat_id for chat_id in chats_versions
+        if chat_id not in representations]
+    if missing:
+        built = build(missing)
+        cache.set_many({
+            get_representation_key(
+                chat_id, chats_versions[chat_id], kind): value
+            for chat_id, value in built.items()
+        }, settings.CHATS_CACHE_TIMEOUT)
+        representations.update(built)
+    return representations
@@ -0,0 +1,224 @@
+"""
+ASGI websocket consumer which delivers chat messages in real time.
+
+Client connects to `ws/chats/<pk>` and authenticates either with
+session cookie or with api token passed as `token` query parameter
+(or `Authorization: Token <key>` header). Only owner and members of
+chat can connect. Cookies are sent by browser to any page which opens
+socket, so cookie authentication requires Origin of allowed host.
+Access is checked again before every posted message and at least once
+per CHATS_ACCESS_CHECK_INTERVAL while messages are delivered, socket of
+user who lost access is closed with the same codes as at connect.
+
+Client -> server: {"text": "..."}
+Server -> client: {"type": "message", "chat": ..., "sequence": ...,
+                   "author": ..., "author_username": "...",
+                   "text": "...", "created_at": "..."}
+                  {"type": "error", "detail": "..."}
+"""
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+from typing import Optional
+import asyncio
+import json
+import time
+
+from rest_framework.exceptions import AuthenticationFailed
+from django.contrib.auth.models import AnonymousUser
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http.request import split_domain_port, validate_host
+from django.http import parse_cookie
+from django.conf import settings
+
+from api.chats.serializers import MessageSerializer
+from api.users.authentication import CachedTokenAuthentication
+from .models import Chat, MESSAGE_MAX_LENGTH
+from .pubsub import get_broker
+
+# Close codes (4000-4999 are reserved for applications)
+CLOSE_NOT_FOUND = 4404
+CLOSE_FORBIDDEN = 4403
+CLOSE_UNAUTHORIZED = 4401
+
+
+def database_sync_to_async(func):
+    """
+    Run function which uses database in thread. Connections are closed
+    like at start and end of http request, so long-lived websockets
+    don't hold stale connections.
+    """
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(wrapper, thread_sensitive=True)
+
+
+def get_chat_group(chat_id: int) -> str:
+    return f'chat.{chat_id}'
+
+
+def get_scope_header(scope, name: bytes) -> str:
+    for key, value in scope.get('headers', []):
+        if key.lower() == name:
+            return value.decode('latin1')
+    return ''
+
+
+def is_allowed_origin(scope) -> bool:
+    """
+    Check that Origin header is host of request or one of ALLOWED_HOSTS,
+    like Django checks Host header of http requests.
+    """
+    origin = urlparse(get_scope_header(scope, b'origin')).netloc.lower()
+    if not origin:
+        return False
+    if origin == get_scope_header(scope, b'host').lower():
+        return True
+    domain, _ = split_domain_port(origin)
+    allowed_hosts = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed_hosts:
+        allowed_hosts = ['.localhost', '127.0.0.1', '[::1]']
+    return bool(domain) and validate_host(domain, allowed_hosts)
+
+
+def authenticate_scope(scope):
+    """
+    Return user authenticated by api token or session cookie,
+    otherwise AnonymousUser. Raise AuthenticationFailed if passed
+    token is invalid or expired, or session cookie is sent by page
+    of another site.
+    """
+    query = parse_qs(scope.get('query_string', b'').decode())
+    token = query.get('token', [''])[0]
+    auth_header = get_scope_header(scope, b'authorization').split()
+    if not token and len(auth_header) == 2 and auth_header[0] == 'Token':
+        token = auth_header[1]
+
+    if token:
+        user, _ = CachedTokenAuthentication().authenticate_credentials(token)
+        return user
+
+    cookies = parse_cookie(get_scope_header(scope, b'cookie'))
+    session_key = cookies.get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return AnonymousUser()
+    if not is_allowed_origin(scope):
+        raise AuthenticationFailed('Origin is not allowed.')
+    engine = import_module(settings.SESSION_ENGINE)
+    return get_user(SimpleNamespace(session=engine.SessionStore(session_key)))
+
+
+class ChatConsumer:
+    """
+    Serve one websocket connection. Connection holds only one asyncio
+    task and one queue while idle, so single worker can keep thousands
+    of open connections.
+    """
+    def __init__(self, scope, receive, send, chat_id: int):
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.chat_id = chat_id
+        self.group = get_chat_group(chat_id)
+        self.broker = get_broker()
+        self.closed = False
+
+    async def __call__(self):
+        message = await self.receive()
+        if message['type'] != 'websocket.connect':
+            return
+
+        if not await self.check_access():
+            return
+
+        await self.send({'type': 'websocket.accept'})
+        subscription = self.broker.subscribe(self.group)
+        sender = asyncio.ensure_future(self.send_messages(subscription))
+        try:
+            while not self.closed:
+                message = await self.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message['type'] == 'websocket.receive':
+                    await self.handle_receive(message)
+        finally:
+            subscription.close()
+            sender.cancel()
+
+    async def check_access(self) -> bool:
+        """Close socket if user can't access chat (anymore)"""
+        close_code = await database_sync_to_async(self.authorize)()
+        self.access_checked_at = time.monotonic()
+        if close_code:
+            await self.close(close_code)
+        return close_code is None
+
+    def authorize(self):
+        """Return close code if user can't access chat, otherwise None"""
+        try:
+            self.user = authenticate_scope(self.scope)
+        except AuthenticationFailed:
+            return CLOSE_UNAUTHORIZED
+        try:
+            chat = Chat.objects.only('pk', 'owner').get(pk=self.chat_id)
+        except Chat.DoesNotExist:
+            return CLOSE_NOT_FOUND
+        if not chat.has_access(self.user):
+            return CLOSE_FORBIDDEN
+        self.chat = chat
+        return None
+
+    async def send_messages(self, subscription):
+        async for message in subscription:
+            checked_ago = time.monotonic() - self.access_checked_at
+            if (checked_ago >= settings.CHATS_ACCESS_CHECK_INTERVAL
+                    and not await self.check_access()):
+                return
+            await self.send_json(message)
+
+    async def handle_receive(self, message):
+        try:
+            data = json.loads(message.get('text') or '')
+            text = str(data['text']).strip()
+        except (ValueError, TypeError, KeyError):
+            await self.send_error('Invalid message format.')
+            return
+
+        if not text:
+            await self.send_error('Message is empty.')
+        elif len(text) > MESSAGE_MAX_LENGTH:
+            await self.send_error('Message is too long.')
+        elif await self.check_access():
+            message = await database_sync_to_async(self.save_message)(text)
+            if message is None:
+                await self.close(CLOSE_NOT_FOUND)
+            else:
+                await self.broker.publish(self.group, message)
+
+    def save_message(self, text: str) -> Optional[dict]:
+        """
+        Store message and return its representation for subscribers,
+        None if chat was deleted after access check.
+        """
+        try:
+            message = self.chat.post_message(self.user, text)
+        except Chat.DoesNotExist:
+            return None
+        return {'type': 'message', **MessageSerializer(message).data}
+
+    async def close(self, code: int):
+        if not self.closed:
+            self.closed = True
+            await self.send({'type': 'websocket.close', 'code': code})
+
+    async def send_error(self, detail: str):
+        await self.send_json({'type': 'error', 'detail': detail})
+
+    async def send_json(self, data: dict):
+        await self.send({'type': 'websocket.send', 'text': json.dumps(data)})
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.chats.models import Chat, Membership
+from apps.users.models import Profile
+
+
+class Command(BaseCommand):
+    help = ('Copy chat members and moderators from legacy Chat.members and '
+        'Chat.moderators arrays to Membership table.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of chats proceeded in one transaction.',
+        )
+
+    def handle(self, *args, batch_size=500, **options):
+        chats = Chat.objects.exclude(members=[], moderators=[])\
+            .order_by('pk').values_list('pk', 'members', 'moderators')
+
+        proceeded = 0
+        batch = []
+        for row in chats.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                proceeded += self._backfill(batch)
+                batch = []
+        if batch:
+            proceeded += self._backfill(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Proceeded {proceeded} memberships.'))
+
+    def _backfill(self, rows) -> int:
+        """
+        Create Membership rows for passed (chat_id, members, moderators)
+        rows. Ids of deleted profiles are skipped, already existing
+        memberships are left untouched.
+        """
+        roles = {}
+        for chat_id, members, moderators in rows:
+            for user_id in members or []:
+                roles[(chat_id, user_id)] = Membership.MEMBER
+            for user_id in moderators or []:
+                roles[(chat_id, user_id)] = Membership.MODERATOR
+
+        existing_profiles = set(Profile.objects.filter(
+            pk__in={user_id for _, user_id in roles}
+        ).values_list('pk', flat=True))
+
+        memberships = [
+            Membership(chat_id=chat_id, profile_id=user_id, role=role)
+            for (chat_id, user_id), role in roles.items()
+            if user_id in existing_profiles
+        ]
+
+        with transaction.atomic():
+            Membership.objects.bulk_create(memberships, ignore_conflicts=True)
+        return len(memberships)
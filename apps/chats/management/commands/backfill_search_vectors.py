@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.chats.search import SEARCH_VECTOR_SOURCES, backfill_search_vectors
+
+
+class Command(BaseCommand):
+    help = ('Fill search vectors of chats and messages created before '
+        'search triggers were installed. Run it once after first migrate '
+        'with search.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Range of primary keys updated in one transaction.',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to sleep between batches.',
+        )
+
+    def handle(self, *args, batch_size=1000, pause=0, **options):
+        for table in SEARCH_VECTOR_SOURCES:
+            updated = backfill_search_vectors(table, batch_size, pause)
+            self.stdout.write(self.style.SUCCESS(
+                f'Updated {updated} rows of {table}.'))
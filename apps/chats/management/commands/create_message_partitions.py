@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.chats.models import Message
+
+
+def add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = ('Create monthly partitions of messages table in advance. '
+        'Table must be already converted to table partitioned by '
+        'RANGE (created_at) with primary key (id, created_at) and '
+        'unique (chat_id, sequence, created_at).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=3,
+            help='Number of months (starting from current) to create.',
+        )
+
+    def handle(self, *args, months=3, **options):
+        table = Message._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM pg_partitioned_table '
+                'WHERE partrelid = %s::regclass', [table])
+            if cursor.fetchone() is None:
+                raise CommandError(f'Table {table} is not partitioned.')
+
+            start = add_months(date.today(), 0)
+            for i in range(months):
+                month_start = add_months(start, i)
+                month_end = add_months(start, i + 1)
+                partition = f'{table}_{month_start:%Y_%m}'
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS {partition} '
+                    f'PARTITION OF {table} '
+                    'FOR VALUES FROM (%s) TO (%s)',
+                    [month_start, month_end])
+                self.stdout.write(f'Partition {partition} is ready.')
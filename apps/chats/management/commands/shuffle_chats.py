@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from apps.chats.models import Chat
+from apps.chats.utils import generate_shuffle_key
+
+
+class Command(BaseCommand):
+    help = ('Assign new random shuffle keys to chats, i.e. reshuffle '
+        'chats list. Run it after shuffle_key column was added.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of chats updated in one query.',
+        )
+
+    def handle(self, *args, batch_size=1000, **options):
+        chats = Chat.objects.only('pk').order_by('pk')
+
+        batch = []
+        proceeded = 0
+        for chat in chats.iterator(chunk_size=batch_size):
+            chat.shuffle_key = generate_shuffle_key()
+            batch.append(chat)
+            if len(batch) >= batch_size:
+                proceeded += self._update(batch)
+                batch = []
+        if batch:
+            proceeded += self._update(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Reshuffled {proceeded} chats.'))
+
+    def _update(self, chats) -> int:
+        Chat.objects.bulk_update(chats, ['shuffle_key'])
+        return len(chats)
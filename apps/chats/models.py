@@ -1,15 +1,76 @@
+from django.contrib.postgres.search import (SearchRank, SearchHeadline,
+    SearchVectorField, TrigramSimilarity)
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
 from django.contrib.postgres.fields import ArrayField
 from django.core.validators import MaxLengthValidator
-from django.db import models
-
+from django.db.models.functions import Coalesce
+from django.db import models, transaction, connection
+from django.utils import timezone
+import re
 
 from ..users.validators import image_size_validator
+from ..core.images import RenditionImageField
 from .validators import validate_empty_string
 from ..users.models import Profile
+from .utils import generate_shuffle_key
+from .search import get_search_query, get_search_config, has_trigram_extension
+
+
+MESSAGE_MAX_LENGTH = 4000
 
 
 def chat_avatars_directory(instance, filename):
-    return 'chats_avatars/{0}/{1}'.format(instance.name, filename)
+    # Storage replaces filename with hash of content
+    return 'chats_avatars/{0}'.format(filename)
+
+
+class ChatQuerySet(models.QuerySet):
+    def with_members_count(self):
+        """
+        Annotate chats with `members_count`. Correlated subquery is used
+        instead of JOIN + GROUP BY so it's evaluated only for fetched rows.
+        """
+        count = Membership.objects.filter(chat=models.OuterRef('pk'))\
+            .order_by().values('chat').annotate(c=models.Count('*')).values('c')
+        return self.annotate(members_count=Coalesce(
+            models.Subquery(count, output_field=models.IntegerField()), 0))
+
+    def search(self, query: str):
+        """
+        Return chats matching query ordered by relevance. Query starting
+        with '@' is matched against chat names (handles).
+        """
+        query = query.strip()
+        if query.startswith('@'):
+            return self._search_by_name(query[1:])
+
+        search_query = get_search_query(query)
+        if search_query is None:
+            return self.none()
+        return self.filter(search_vector=search_query)\
+            .annotate(rank=SearchRank(models.F('search_vector'), search_query))\
+            .order_by('-rank', 'pk')
+
+    def _search_by_name(self, name: str):
+        if not name or not re.fullmatch(r'[-\w]+', name):
+            return self.none()
+        if not has_trigram_extension():
+            return self.filter(name__startswith=name).order_by('name')
+        return self.filter(
+            models.Q(name__startswith=name) | models.Q(name__trigram_similar=name)
+        ).annotate(
+            similarity=TrigramSimilarity('name', name),
+        ).order_by('-similarity', 'pk')
+
+    def bump_cache_version(self) -> int:
+        """Invalidate cached representations of chats, see apps.chats.cache"""
+        return self.update(cache_version=models.F('cache_version') + 1)
+
+
+class ChatManager(models.Manager.from_queryset(ChatQuerySet)):
+    def get_queryset(self):
+        # Search vector is needed only in database
+        return super().get_queryset().defer('search_vector')
 
 
 class Chat(models.Model):
@@ -17,10 +78,13 @@ class Chat(models.Model):
         Profile,
         on_delete=models.SET_NULL,
         null=True,
-        related_name='chats'
+        related_name='chats',
+        # Served by chat_owner_idx
+        db_index=False,
     )
     
-    # List of users id
+    # Legacy lists of users id, superseded by Membership.
+    # Kept only until `manage.py backfill_memberships` has been run.
     moderators = ArrayField(
         base_field=models.PositiveBigIntegerField(),
         default=list,
@@ -54,20 +118,322 @@ class Chat(models.Model):
         help_text='Name must be unique and cannot be changed.'
     )
 
-    avatar = models.ImageField(
+    avatar = RenditionImageField(
         upload_to=chat_avatars_directory,
         blank=True,
         default='chats_avatars/default_chat_avatar.png',
         validators=[image_size_validator],
     )
 
-    def add_member_by_id(self, user_id):
-        """Use this method instead of direct item adding"""
-        if user_id not in self.members:
-            self.members.append(user_id)
+    # Random position of chat in chats list, see `get_shuffled_page`
+    shuffle_key = models.BigIntegerField(
+        default=generate_shuffle_key,
+        db_index=True,
+        editable=False,
+    )
+
+    # Filled by database trigger, see apps.chats.search
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+
+    # Version of cached representations, see apps.chats.cache
+    cache_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+    )
+
+    objects = ChatManager()
+
+    class Meta:
+        indexes = [
+            # Chats of owner paginated by id
+            models.Index(fields=['owner', 'id'], name='chat_owner_idx'),
+            GinIndex(fields=['search_vector'], name='chat_search_vector_idx'),
+            # Serves prefix search by name (`@name` queries)
+            models.Index(
+                fields=['name'],
+                name='chat_name_prefix_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            # Increased by database, so concurrent bump isn't overwritten
+            self.cache_version = models.F('cache_version') + 1
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            # New version is loaded from database on access
+            self.__dict__.pop('cache_version', None)
+
+    def add_member_by_id(self, user_id, role=None):
+        """Use this method instead of direct Membership creating"""
+        membership, _ = Membership.objects.get_or_create(
+            chat=self,
+            profile_id=user_id,
+            defaults={'role': role or Membership.MEMBER},
+        )
+        return membership
+
+    def remove_member_by_id(self, user_id):
+        Membership.objects.filter(chat=self, profile_id=user_id).delete()
+
+    def has_member(self, user_id) -> bool:
+        return Membership.objects.filter(
+            chat=self, profile_id=user_id).exists()
+
+    def has_access(self, user) -> bool:
+        """Owner and members of chat can read and write messages"""
+        return user.is_authenticated and (
+            self.owner_id == user.id or self.has_member(user.id))
+
+    def post_message(self, author, text: str):
+        """
+        Use this method instead of direct Message creating,
+        it assigns next sequence number of chat to message.
+        """
+        with transaction.atomic():
+            # Lock chat row, so concurrent messages get different numbers
+            Chat.objects.select_for_update().only('pk').get(pk=self.pk)
+            last_sequence = self.messages.aggregate(
+                last=models.Max('sequence'))['last'] or 0
+            return Message.objects.create(
+                chat=self,
+                author=author,
+                text=text,
+                sequence=last_sequence + 1,
+            )
+
+    def get_members_ids(self):
+        """Return queryset of ids of profiles which are members of chat"""
+        return self.memberships.values_list('profile_id', flat=True)
 
     def get_name(self):
         return '@'+self.name
 
     def __str__(self):
         return self.name
+
+
+class MembershipManager(models.Manager):
+    """
+    Set-based operations with many members of one chat. Every
+    operation is a single statement which returns ids of affected
+    profiles.
+    """
+    def _execute(self, sql: str, params) -> set:
+        with connection.cursor() as cursor:
+            cursor.execute(sql.format(
+                membership=self.model._meta.db_table,
+                profile=Profile._meta.db_table,
+            ), params)
+            return {row[0] for row in cursor.fetchall()}
+
+    def _execute_for_members_count(self, chat, sql: str, params) -> set:
+        """Execute operation which changes number of members of chat"""
+        affected = self._execute(sql, params)
+        if affected:
+            # Statements don't send signals
+            Chat.objects.filter(pk=chat.pk).bump_cache_version()
+        return affected
+
+    def bulk_add(self, chat, ids, role=None) -> set:
+        """Add existing profiles from ids to chat, skip current members"""
+        return self._execute_for_members_count(
+            chat,
+            'INSERT INTO {membership} (chat_id, profile_id, role, joined_at) '
+            'SELECT %s, id, %s, %s FROM {profile} WHERE id = ANY(%s) '
+            'ON CONFLICT (chat_id, profile_id) DO NOTHING '
+            'RETURNING profile_id',
+            [chat.pk, role or self.model.MEMBER, timezone.now(), list(ids)],
+        )
+
+    def bulk_remove(self, chat, ids) -> set:
+        return self._execute_for_members_count(
+            chat,
+            'DELETE FROM {membership} '
+            'WHERE chat_id = %s AND profile_id = ANY(%s) '
+            'RETURNING profile_id',
+            [chat.pk, list(ids)],
+        )
+
+    def bulk_set_role(self, chat, ids, role) -> set:
+        return self._execute(
+            'UPDATE {membership} SET role = %s '
+            'WHERE chat_id = %s AND profile_id = ANY(%s) '
+            'RETURNING profile_id',
+            [role, chat.pk, list(ids)],
+        )
+
+
+class Membership(models.Model):
+    """
+    Relation between chat and profile which is member of this chat.
+
+     Attrs:
+       chat - chat which profile joined
+       profile - member of chat
+       role - role of member in chat (e.g. member or moderator)
+       joined_at - date when profile joined chat
+    """
+    MEMBER = 'member'
+    MODERATOR = 'moderator'
+    ROLE_CHOICES = [
+        (MEMBER, 'Member'),
+        (MODERATOR, 'Moderator'),
+    ]
+
+    chat = models.ForeignKey(
+        Chat,
+        on_delete=models.CASCADE,
+        related_name='memberships',
+    )
+
+    profile = models.ForeignKey(
+        Profile,
+        on_delete=models.CASCADE,
+        related_name='memberships',
+    )
+
+    role = models.CharField(
+        max_length=10,
+        choices=ROLE_CHOICES,
+        default=MEMBER,
+    )
+
+    joined_at = models.DateTimeField(default=timezone.now)
+
+    objects = MembershipManager()
+
+    class Meta:
+        constraints = [
+            # Also serves "is profile X a member of chat Y" lookups
+            models.UniqueConstraint(
+                fields=['chat', 'profile'],
+                name='unique_chat_membership',
+            ),
+        ]
+        indexes = [
+            # "Which chats is profile X in"
+            models.Index(
+                fields=['profile', 'joined_at'],
+                name='membership_profile_idx',
+            ),
+            # Chats of member paginated by id
+            models.Index(
+                fields=['profile', 'chat'],
+                name='membership_profile_chat_idx',
+            ),
+            models.Index(
+                fields=['chat', 'role'],
+                name='membership_chat_role_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.profile_id} in {self.chat_id} ({self.role})'
+
+
+# Delimiters of matched words in message snippets, they can't appear
+# in text typed by user, so snippet can be escaped before highlighting.
+SNIPPET_START_SEL = '\x02'
+SNIPPET_STOP_SEL = '\x03'
+
+
+class MessageQuerySet(models.QuerySet):
+    def search(self, query: str):
+        """
+        Return messages matching words of query by prefix. Messages are
+        annotated with `snippet` - fragments of text around matched
+        words, enclosed by SNIPPET_START_SEL and SNIPPET_STOP_SEL.
+        Queryset isn't ordered, so it can be paginated by sequence.
+        """
+        search_query = get_search_query(query)
+        if search_query is None:
+            return self.none()
+        return self.filter(search_vector=search_query).annotate(
+            snippet=SearchHeadline(
+                'text',
+                search_query,
+                config=get_search_config(),
+                start_sel=SNIPPET_START_SEL,
+                stop_sel=SNIPPET_STOP_SEL,
+                max_fragments=3,
+                fragment_delimiter=' ... ',
+            ),
+        )
+
+
+class MessageManager(models.Manager.from_queryset(MessageQuerySet)):
+    def get_queryset(self):
+        # Search vector is needed only in database
+        return super().get_queryset().defer('search_vector')
+
+
+class Message(models.Model):
+    """
+    Message of chat. Messages are append-only and identified inside chat
+    by monotonically increasing `sequence`, so history is read by ranges
+    of (chat, sequence) index and never with OFFSET.
+
+    Table is ready to be converted to declarative partitioning by month
+    of `created_at` (see `create_message_partitions` command): no query
+    relies on global ordering of ids.
+
+     Attrs:
+       chat - chat where message was sent
+       sequence - number of message inside chat, starts from 1
+       author - profile which sent message
+       text - content of message
+       created_at - date when message was sent
+       search_vector - words of text, filled by database trigger
+                       (see apps.chats.search)
+    """
+    chat = models.ForeignKey(
+        Chat,
+        on_delete=models.CASCADE,
+        related_name='messages',
+    )
+
+    sequence = models.PositiveBigIntegerField()
+
+    author = models.ForeignKey(
+        Profile,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='messages',
+    )
+
+    text = models.TextField(
+        validators=[MaxLengthValidator(MESSAGE_MAX_LENGTH)],
+    )
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+
+    objects = MessageManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['chat', 'sequence'],
+                name='unique_chat_message_sequence',
+            ),
+        ]
+        indexes = [
+            # Tiny index which fits append-only, time-ordered table
+            BrinIndex(fields=['created_at'], name='message_created_at_brin'),
+            # Combined with (chat, sequence) index by bitmap AND when
+            # history of one chat is searched
+            GinIndex(fields=['search_vector'], name='message_search_vector_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.chat_id}#{self.sequence}'
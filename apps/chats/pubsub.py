@@ -0,0 +1,74 @@
+"""
+Publish/subscribe layer used to fan chat messages out to
+connected websockets. Broker class is chosen with CHATS_PUBSUB_BROKER
+setting, so in-process broker can be replaced by another one
+(e.g. based on Redis) without changing consumers.
+"""
+from collections import defaultdict
+from functools import lru_cache
+import asyncio
+
+from django.utils.module_loading import import_string
+from django.conf import settings
+
+
+class Subscription:
+    """
+    Queue of messages published to specific group.
+    Use it as async iterator to receive messages.
+    """
+    def __init__(self, broker, group: str, max_size: int):
+        self.broker = broker
+        self.group = group
+        self.queue = asyncio.Queue(maxsize=max_size)
+
+    def put(self, message: dict):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow subscriber: drop message instead of blocking publisher
+            pass
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        return await self.queue.get()
+
+
+class InMemoryBroker:
+    """
+    Broker which keeps subscriptions in memory of current process.
+    It's enough while all websockets are served by one worker.
+    """
+    subscription_class = Subscription
+    max_queue_size = 100
+
+    def __init__(self):
+        self._groups = defaultdict(set)
+
+    def subscribe(self, group: str) -> Subscription:
+        subscription = self.subscription_class(
+            self, group, self.max_queue_size)
+        self._groups[group].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._groups.get(subscription.group)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._groups[subscription.group]
+
+    async def publish(self, group: str, message: dict):
+        for subscription in list(self._groups.get(group, ())):
+            subscription.put(message)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """Return broker instance shared by whole process"""
+    return import_string(settings.CHATS_PUBSUB_BROKER)()
@@ -0,0 +1,25 @@
+#----------------------------------------------
+# Websocket urlpatterns of chats app
+#----------------------------------------------
+from django.urls import path
+
+from .consumers import ChatConsumer
+
+
+websocket_urlpatterns = [
+    path('ws/chats/<int:pk>', ChatConsumer, name='ws-chat'),
+]
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI application which routes websocket connections to consumers"""
+    path_ = scope['path'].lstrip('/')
+    for pattern in websocket_urlpatterns:
+        match = pattern.resolve(path_)
+        if match:
+            consumer = match.func(scope, receive, send, match.kwargs['pk'])
+            return await consumer()
+
+    # Reject connection to unknown path
+    await receive()
+    await send({'type': 'websocket.close'})
@@ -0,0 +1,157 @@
+"""
+Full-text search of chats and their messages.
+
+Chat.search_vector is filled by database trigger from name (weight A,
+'simple' config, so handles aren't stemmed), label (A) and description
+(B), and is served by GIN index. Trigger is installed after every
+`migrate` (see ChatsConfig.ready), because tsvector triggers can't be
+expressed by model fields. Rows created before trigger was installed
+are filled once by `manage.py backfill_search_vectors`, same as
+messages below.
+
+Message.search_vector is filled by trigger from message text when
+message is inserted, so history of chat is searched by GIN index instead
+of scanning rows.
+
+`@name` queries match handles by prefix and, when pg_trgm extension is
+available, by trigram similarity, so typos are tolerated.
+"""
+from functools import lru_cache
+import time
+import re
+
+from django.db import (connection, connections, transaction, DatabaseError,
+    DEFAULT_DB_ALIAS)
+from django.contrib.postgres.search import SearchQuery
+from django.conf import settings
+
+
+def get_search_config() -> str:
+    config = settings.CHATS_SEARCH_CONFIG
+    if not re.fullmatch(r'\w+', config):
+        raise ValueError(f'Invalid text search config: {config}')
+    return config
+
+
+CHAT_SEARCH_TRIGGER_SQL = '''
+CREATE OR REPLACE FUNCTION chats_chat_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(NEW.label, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS chats_chat_search_vector_trigger ON chats_chat;
+CREATE TRIGGER chats_chat_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, label, description ON chats_chat
+    FOR EACH ROW EXECUTE PROCEDURE chats_chat_search_vector_update();
+'''
+
+MESSAGE_SEARCH_TRIGGER_SQL = '''
+CREATE OR REPLACE FUNCTION chats_message_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('{config}', coalesce(NEW.text, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS chats_message_search_vector_trigger ON chats_message;
+CREATE TRIGGER chats_message_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF text ON chats_message
+    FOR EACH ROW EXECUTE PROCEDURE chats_message_search_vector_update();
+'''
+
+# Tables whose search_vector is filled by trigger: {table: column which
+# is touched to fire trigger}
+SEARCH_VECTOR_SOURCES = {
+    'chats_chat': 'name',
+    'chats_message': 'text',
+}
+
+CHAT_NAME_TRIGRAM_INDEX_SQL = '''
+CREATE INDEX IF NOT EXISTS chat_name_trgm_idx
+    ON chats_chat USING gin (name gin_trgm_ops);
+'''
+
+
+@lru_cache(maxsize=None)
+def has_trigram_extension() -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def install_trigram_index(using=DEFAULT_DB_ALIAS):
+    """Create pg_trgm extension and index if extension is available"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+        try:
+            with transaction.atomic(using=using):
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                cursor.execute(CHAT_NAME_TRIGRAM_INDEX_SQL)
+        except DatabaseError:
+            # Not enough privileges, search works without typo tolerance
+            pass
+    has_trigram_extension.cache_clear()
+
+
+def install_search(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate handler"""
+    if connections[using].vendor != 'postgresql':
+        return
+    with connections[using].cursor() as cursor:
+        for sql in (CHAT_SEARCH_TRIGGER_SQL, MESSAGE_SEARCH_TRIGGER_SQL):
+            cursor.execute(sql.format(config=get_search_config()))
+    install_trigram_index(using)
+
+
+def backfill_search_vectors(table: str, batch_size: int,
+    pause: float = 0) -> int:
+    """
+    Fill search_vector of rows created before trigger was installed.
+    Rows are touched by ranges of primary key, each range in its own
+    transaction, so table isn't rewritten by one long UPDATE. Return
+    number of updated rows.
+    """
+    qn = connection.ops.quote_name
+    column = qn(SEARCH_VECTOR_SOURCES[table])
+    table = qn(table)
+    updated = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT min(id), max(id) FROM {table}')
+        first, last = cursor.fetchone()
+        if first is None:
+            return 0
+        for start in range(first, last + 1, batch_size):
+            with transaction.atomic():
+                cursor.execute(
+                    f'UPDATE {table} SET {column} = {column} '
+                    'WHERE id >= %s AND id < %s AND search_vector IS NULL',
+                    [start, start + batch_size])
+                updated += cursor.rowcount
+            if pause:
+                time.sleep(pause)
+    return updated
+
+
+def get_prefix_tsquery(query: str) -> str:
+    """
+    Turn user input into raw tsquery where every word is matched
+    by prefix: `hello wor` -> `hello:* & wor:*`.
+    """
+    words = re.findall(r'[^\W_]+', query)
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+def get_search_query(query: str):
+    """Return SearchQuery matching words of query by prefix or None"""
+    tsquery = get_prefix_tsquery(query)
+    if not tsquery:
+        return None
+    return SearchQuery(tsquery, search_type='raw', config=get_search_config())
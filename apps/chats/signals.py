@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Chat, Membership
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def invalidate_chat_members_cache(sender, instance, **kwargs):
+    """Chat representations include number of members"""
+    Chat.objects.filter(pk=instance.chat_id).bump_cache_version()
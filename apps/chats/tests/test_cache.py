@@ -0,0 +1,100 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from ..cache import get_cache, get_cached_representations
+from ..models import Chat, Membership
+from apps.users.models import Profile
+
+
+class TestChatCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = Profile.objects.create_user(
+            username='testuser',
+            email='testuser@mail.com',
+            password='hardpwd123',
+        )
+        cls.u2 = Profile.objects.create_user(
+            username='testuser2',
+            email='testuser2@mail.com',
+            password='hardpwd123',
+        )
+        cls.chat = Chat.objects.create(
+            owner=cls.u1,
+            label='Test Chat',
+            name='test_chat',
+        )
+
+    def get_version(self) -> int:
+        return Chat.objects.get(pk=self.chat.pk).cache_version
+
+    def test_version_is_bumped(self):
+        chat = Chat.objects.get(pk=self.chat.pk)
+        version = self.get_version()
+        chat.label = 'New label'
+        chat.save()
+        self.assertEqual(chat.cache_version, version + 1)
+
+        # Stale instance doesn't overwrite newer version
+        Chat.objects.filter(pk=chat.pk).bump_cache_version()
+        self.chat.save()
+        self.assertEqual(self.get_version(), version + 3)
+
+        version = self.get_version()
+        self.chat.add_member_by_id(self.u2.pk)
+        self.assertEqual(self.get_version(), version + 1)
+
+        version = self.get_version()
+        Membership.objects.bulk_remove(self.chat, [self.u2.pk])
+        self.assertEqual(self.get_version(), version + 1)
+
+        version = self.get_version()
+        Membership.objects.bulk_remove(self.chat, [self.u2.pk])
+        self.assertEqual(self.get_version(), version)
+
+        # Versions are stored in database, not in cache
+        get_cache().clear()
+        self.assertEqual(self.get_version(), version)
+
+    def test_cached_representations(self):
+        built = []
+
+        def build(missing):
+            built.append(missing)
+            return {pk: f'chat {pk}' for pk in missing}
+
+        versions = {self.chat.pk: self.get_version()}
+        for i in range(2):
+            self.assertEqual(
+                get_cached_representations(versions, 'test', build),
+                {self.chat.pk: f'chat {self.chat.pk}'},
+            )
+        self.assertEqual(built, [[self.chat.pk]])
+
+    def test_chat_details_fragment(self):
+        self.client.force_login(self.u1)
+        url = reverse('chats:chat', kwargs={'pk': self.chat.pk})
+        response = self.client.get(url)
+        self.assertContains(response, 'Members: 0')
+        self.assertContains(response, 'chatDeleteModal')
+
+        self.chat.add_member_by_id(self.u2.pk)
+        response = self.client.get(url)
+        self.assertContains(response, 'Members: 1')
+
+        # Owner actions are cached separately
+        self.client.force_login(self.u2)
+        response = self.client.get(url)
+        self.assertNotContains(response, 'chatDeleteModal')
+
+    def test_chats_list_fragment(self):
+        url = reverse('chats:chat-list')
+        self.assertContains(self.client.get(url), 'Test Chat')
+
+        Chat.objects.filter(pk=self.chat.pk).update(label='Renamed')
+        # Update by statement doesn't send signals
+        self.assertContains(self.client.get(url), 'Test Chat')
+
+        self.chat.refresh_from_db()
+        self.chat.save()
+        self.assertContains(self.client.get(url), 'Renamed')
@@ -0,0 +1,229 @@
+from datetime import timedelta
+import json
+
+from rest_framework.authtoken.models import Token
+from asgiref.testing import ApplicationCommunicator
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase, Client
+from django.utils import timezone
+from django.conf import settings
+
+from ..consumers import (CLOSE_FORBIDDEN, CLOSE_NOT_FOUND, CLOSE_UNAUTHORIZED,
+    database_sync_to_async)
+from ..routing import websocket_application
+from ..models import Chat, Message
+from apps.users.models import Profile
+
+
+class TestChatConsumer(TransactionTestCase):
+    """
+    Consumer accesses database from another thread, so data
+    must be committed to be visible for it.
+    """
+    def setUp(self):
+        self.u1 = Profile.objects.create_user(
+            username='testuser1',
+            email='testuser1@mail.com',
+            password='hardpwd123',
+        )
+        self.u2 = Profile.objects.create_user(
+            username='testuser2',
+            email='testuser2@mail.com',
+            password='hardpwd123',
+        )
+        self.u3 = Profile.objects.create_user(
+            username='testuser3',
+            email='testuser3@mail.com',
+            password='hardpwd123',
+        )
+
+        self.chat = Chat.objects.create(
+            owner=self.u1,
+            label='Chat 1',
+            name='chat1',
+        )
+        self.chat.add_member_by_id(self.u2.id)
+        self.token = Token.objects.create(user=self.u2)
+
+        self.session_headers = {}
+        for user in (self.u1, self.u3):
+            client = Client()
+            client.force_login(user)
+            session_id = client.cookies['sessionid'].value
+            self.session_headers[user] = [
+                (b'cookie', f'sessionid={session_id}'.encode()),
+                (b'origin', b'http://testserver'),
+            ]
+
+    def get_communicator(self, chat_id=None, query_string=b'', headers=None):
+        scope = {
+            'type': 'websocket',
+            'path': '/ws/chats/%d' % (chat_id or self.chat.pk),
+            'query_string': query_string,
+            'headers': headers or [],
+        }
+        return ApplicationCommunicator(websocket_application, scope)
+
+    async def connect(self, communicator):
+        await communicator.send_input({'type': 'websocket.connect'})
+        return await communicator.receive_output(timeout=3)
+
+    async def test_messages_delivery(self):
+        # Owner connects with session, member connects with api token
+        owner = self.get_communicator(headers=self.session_headers[self.u1])
+        member = self.get_communicator(
+            query_string=f'token={self.token.key}'.encode())
+
+        self.assertEqual((await self.connect(owner))['type'], 'websocket.accept')
+        self.assertEqual((await self.connect(member))['type'], 'websocket.accept')
+
+        await owner.send_input({
+            'type': 'websocket.receive',
+            'text': json.dumps({'text': 'Hello'}),
+        })
+
+        for communicator in (owner, member):
+            output = await communicator.receive_output(timeout=3)
+            message = json.loads(output['text'])
+            self.assertEqual(message['type'], 'message')
+            self.assertEqual(message['text'], 'Hello')
+            self.assertEqual(message['chat'], self.chat.pk)
+            self.assertEqual(message['author'], self.u1.id)
+            self.assertEqual(message['sequence'], 1)
+
+            await communicator.send_input({'type': 'websocket.disconnect'})
+            await communicator.wait(timeout=3)
+
+        message = await sync_to_async(self.chat.messages.get)()
+        self.assertEqual(message.text, 'Hello')
+
+    async def test_invalid_message(self):
+        member = self.get_communicator(
+            query_string=f'token={self.token.key}'.encode())
+        await self.connect(member)
+
+        for text in ['not json', json.dumps({'text': '  '})]:
+            await member.send_input({'type': 'websocket.receive', 'text': text})
+            output = json.loads((await member.receive_output(timeout=3))['text'])
+            self.assertEqual(output['type'], 'error')
+
+        await member.send_input({'type': 'websocket.disconnect'})
+        await member.wait(timeout=3)
+
+    async def test_rejections(self):
+        cases = [
+            # Anonymous user
+            (self.get_communicator(), CLOSE_FORBIDDEN),
+            # Invalid token
+            (self.get_communicator(query_string=b'token=wrong'),
+                CLOSE_UNAUTHORIZED),
+            # Not a member
+            (self.get_communicator(
+                headers=self.session_headers[self.u3]), CLOSE_FORBIDDEN),
+            # Chat doesn't exist
+            (self.get_communicator(
+                chat_id=100500,
+                headers=self.session_headers[self.u1]), CLOSE_NOT_FOUND),
+        ]
+        for communicator, code in cases:
+            output = await self.connect(communicator)
+            self.assertEqual(output, {'type': 'websocket.close', 'code': code})
+
+    async def test_expired_token(self):
+        def expire_token():
+            self.token.created = timezone.now() - timedelta(
+                seconds=settings.API_TOKEN_LIFETIME + 1)
+            self.token.save()
+        await database_sync_to_async(expire_token)()
+
+        communicator = self.get_communicator(
+            query_string=f'token={self.token.key}'.encode())
+        output = await self.connect(communicator)
+        self.assertEqual(output,
+            {'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+
+    async def test_session_origin(self):
+        cookie = self.session_headers[self.u1][0]
+        cases = [
+            # Page of another site
+            ([cookie, (b'origin', b'https://evil.example')], CLOSE_UNAUTHORIZED),
+            # Non-browser client without Origin
+            ([cookie], CLOSE_UNAUTHORIZED),
+        ]
+        for headers, code in cases:
+            output = await self.connect(self.get_communicator(headers=headers))
+            self.assertEqual(output, {'type': 'websocket.close', 'code': code})
+
+        # Origin matches host of request
+        communicator = self.get_communicator(headers=[
+            cookie,
+            (b'host', b'chat.example:8000'),
+            (b'origin', b'https://chat.example:8000'),
+        ])
+        output = await self.connect(communicator)
+        self.assertEqual(output['type'], 'websocket.accept')
+        await communicator.send_input({'type': 'websocket.disconnect'})
+        await communicator.wait(timeout=3)
+
+    async def post(self, communicator, text: str):
+        await communicator.send_input({
+            'type': 'websocket.receive',
+            'text': json.dumps({'text': text}),
+        })
+        return await communicator.receive_output(timeout=3)
+
+    async def assert_closed_on_post(self, communicator, revoke, code):
+        self.assertEqual(
+            (await self.connect(communicator))['type'], 'websocket.accept')
+        await database_sync_to_async(revoke)()
+        output = await self.post(communicator, 'Hello')
+        self.assertEqual(output, {'type': 'websocket.close', 'code': code})
+        await communicator.wait(timeout=3)
+
+    async def test_access_lost_before_post(self):
+        def expire_token():
+            self.token.created = timezone.now() - timedelta(
+                seconds=settings.API_TOKEN_LIFETIME + 1)
+            self.token.save()
+
+        token_query = f'token={self.token.key}'.encode()
+        # Member is removed, then token of member expires
+        await self.assert_closed_on_post(
+            self.get_communicator(query_string=token_query),
+            lambda: self.chat.remove_member_by_id(self.u2.id),
+            CLOSE_FORBIDDEN,
+        )
+        await database_sync_to_async(self.chat.add_member_by_id)(self.u2.id)
+        await self.assert_closed_on_post(
+            self.get_communicator(query_string=token_query),
+            expire_token,
+            CLOSE_UNAUTHORIZED,
+        )
+        # Chat is deleted
+        await self.assert_closed_on_post(
+            self.get_communicator(headers=self.session_headers[self.u1]),
+            lambda: Chat.objects.filter(pk=self.chat.pk).delete(),
+            CLOSE_NOT_FOUND,
+        )
+
+        count = await database_sync_to_async(Message.objects.count)()
+        self.assertEqual(count, 0)
+
+    async def test_access_lost_while_receiving(self):
+        owner = self.get_communicator(headers=self.session_headers[self.u1])
+        member = self.get_communicator(
+            query_string=f'token={self.token.key}'.encode())
+        await self.connect(owner)
+        await self.connect(member)
+
+        await database_sync_to_async(self.chat.remove_member_by_id)(self.u2.id)
+        with self.settings(CHATS_ACCESS_CHECK_INTERVAL=0):
+            output = await self.post(owner, 'Hello')
+            self.assertEqual(json.loads(output['text'])['text'], 'Hello')
+            output = await member.receive_output(timeout=3)
+
+        self.assertEqual(
+            output, {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        for communicator in (owner, member):
+            await communicator.send_input({'type': 'websocket.disconnect'})
+            await communicator.wait(timeout=3)
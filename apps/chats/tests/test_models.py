@@ -1,9 +1,12 @@
+from io import StringIO
+
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import Permission
+from django.core.management import call_command
 from django.db.utils import DataError
 from django.test import TestCase
 
-from ..models import Chat
+from ..models import Chat, Membership
 from apps.users.models import Profile
 
 
@@ -48,4 +51,90 @@ class TestChatModel(TestCase):
         self.chat.add_member_by_id(self.u1.id)
         self.chat.add_member_by_id(self.u2.id)
 
-        self.assertEqual(len(self.chat.members), 2)
+        self.assertEqual(self.chat.memberships.count(), 2)
+        self.assertTrue(self.chat.has_member(self.u1.id))
+        self.assertTrue(self.chat.has_member(self.u2.id))
+
+    def test_remove_member_method(self):
+        self.chat.add_member_by_id(self.u1.id)
+        self.chat.add_member_by_id(self.u2.id, role=Membership.MODERATOR)
+        self.chat.remove_member_by_id(self.u1.id)
+
+        self.assertFalse(self.chat.has_member(self.u1.id))
+        self.assertEqual(list(self.chat.get_members_ids()), [self.u2.id])
+        self.assertEqual(
+            self.chat.memberships.get().role, Membership.MODERATOR)
+
+    def test_profile_active_chats(self):
+        chat2 = Chat.objects.create(
+            owner=self.u2,
+            label='Test Chat 2',
+            name='test_chat2',
+        )
+        self.chat.add_member_by_id(self.u1.id)
+        chat2.add_member_by_id(self.u1.id)
+        chat2.add_member_by_id(self.u2.id)
+
+        self.assertEqual(list(self.u1.get_active_chats()), [self.chat, chat2])
+        self.assertEqual(list(self.u2.get_active_chats()), [chat2])
+
+    def test_post_message_method(self):
+        chat2 = Chat.objects.create(
+            owner=self.u2,
+            label='Test Chat 2',
+            name='test_chat2',
+        )
+        m1 = self.chat.post_message(self.u1, 'first')
+        m2 = self.chat.post_message(self.u2, 'second')
+        m3 = chat2.post_message(self.u1, 'first in another chat')
+
+        self.assertEqual((m1.sequence, m2.sequence, m3.sequence), (1, 2, 1))
+        self.assertEqual(
+            list(self.chat.messages.values_list('text', flat=True)),
+            ['first', 'second'])
+
+    def test_has_access_method(self):
+        self.chat.add_member_by_id(self.u2.id)
+        stranger = Profile.objects.create_user(
+            username='testuser3',
+            email='testuser3@mail.co',
+            password='hardpwd123',
+        )
+
+        self.assertTrue(self.chat.has_access(self.u1))
+        self.assertTrue(self.chat.has_access(self.u2))
+        self.assertFalse(self.chat.has_access(stranger))
+
+
+class TestBackfillMembershipsCommand(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = Profile.objects.create_user(
+            username='testuser',
+            email='testuser@mail.com',
+            password='hardpwd123'
+        )
+        cls.u2 = Profile.objects.create_user(
+            username='testuser2',
+            email='testuser2@mail.co',
+            password='hardpwd123',
+        )
+
+        cls.chat = Chat.objects.create(
+            owner=cls.u1,
+            label='Test Chat',
+            name='test_chat',
+            members=[cls.u1.id, cls.u2.id, 100500],
+            moderators=[cls.u2.id],
+        )
+
+    def test_backfill(self):
+        call_command('backfill_memberships', stdout=StringIO())
+        # Running twice must not duplicate memberships
+        call_command('backfill_memberships', stdout=StringIO())
+
+        roles = dict(self.chat.memberships.values_list('profile_id', 'role'))
+        self.assertEqual(roles, {
+            self.u1.id: Membership.MEMBER,
+            self.u2.id: Membership.MODERATOR,
+        })
@@ -0,0 +1,103 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..search import get_prefix_tsquery
+from ..models import Chat, Message
+from apps.users.models import Profile
+
+
+class TestChatSearch(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = Profile.objects.create_user(
+            username='testuser',
+            email='testuser@mail.com',
+            password='hardpwd123',
+        )
+        cls.python = Chat.objects.create(
+            owner=cls.u1,
+            label='Python developers',
+            name='python_devs',
+            description='Talking about programming',
+        )
+        cls.cooking = Chat.objects.create(
+            owner=cls.u1,
+            label='Cooking',
+            name='cooking',
+            description='Recipes for python lovers',
+        )
+        cls.music = Chat.objects.create(
+            owner=cls.u1,
+            label='Music',
+            name='music_club',
+        )
+
+    def test_prefix_tsquery(self):
+        self.assertEqual(get_prefix_tsquery('hello wor'), 'hello:* & wor:*')
+        self.assertEqual(get_prefix_tsquery("it's & | !"), 'it:* & s:*')
+        self.assertEqual(get_prefix_tsquery(' ::* '), '')
+
+    def test_search_vector_is_filled_by_trigger(self):
+        chat = Chat.objects.only('search_vector').get(pk=self.music.pk)
+        self.assertIn('music', chat.search_vector)
+
+        Chat.objects.filter(pk=self.music.pk).update(label='Jazz')
+        self.assertEqual(list(Chat.objects.search('jazz')), [self.music])
+
+    def test_backfill_search_vectors(self):
+        # Chats created before trigger was installed
+        Chat.objects.update(search_vector=None)
+        self.assertEqual(list(Chat.objects.search('music')), [])
+
+        message = self.music.post_message(self.u1, 'Rehearsal tonight')
+        Message.objects.update(search_vector=None)
+        self.assertFalse(Message.objects.search('rehearsal').exists())
+
+        out = StringIO()
+        call_command('backfill_search_vectors', batch_size=2, stdout=out)
+        self.assertIn('Updated 3 rows of chats_chat.', out.getvalue())
+        self.assertIn('Updated 1 rows of chats_message.', out.getvalue())
+        self.assertEqual(list(Chat.objects.search('music')), [self.music])
+        self.assertEqual(
+            list(Message.objects.search('rehearsal').values_list('pk', flat=True)),
+            [message.pk])
+
+    def test_label_matches_rank_higher_than_description(self):
+        self.assertEqual(
+            list(Chat.objects.search('python')),
+            [self.python, self.cooking],
+        )
+
+    def test_stemming_and_prefixes(self):
+        self.assertEqual(list(Chat.objects.search('program')), [self.python])
+        self.assertEqual(list(Chat.objects.search('recipe')), [self.cooking])
+        self.assertEqual(list(Chat.objects.search('pyth dev')), [self.python])
+
+    def test_search_by_name(self):
+        self.assertEqual(list(Chat.objects.search('@mus')), [self.music])
+        self.assertEqual(list(Chat.objects.search('@')), [])
+        self.assertEqual(list(Chat.objects.search('@a b')), [])
+
+    def test_empty_query(self):
+        self.assertEqual(list(Chat.objects.search('')), [])
+        self.assertEqual(list(Chat.objects.search('&!')), [])
+
+    def test_search_view(self):
+        response = self.client.get(reverse('chats:chat-search'), {'q': 'python'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(response.context['chats']), [self.python, self.cooking])
+        self.assertEqual(response.context['chats'][0].members_count, 0)
+        self.assertContains(response, 'value="python"')
+
+    def test_search_api(self):
+        response = self.client.get(
+            reverse('api-chat-search'), {'q': 'python', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [chat['id'] for chat in response.data['results']],
+            [self.python.pk],
+        )
@@ -46,7 +46,7 @@ class TestChatsListView(TestCase):
 
         # Check for proper image
         src_attr = chats[0].find('img')['src']
-        self.assertEqual(src_attr, '/media/chats_avatars/default_chat_avatar.png')
+        self.assertEqual(src_attr, '/media/chats_avatars/default_chat_avatar.128x128.jpeg')
     
     def test_template2(self):
         response = self.client.get(reverse('chats:chat-list'))
@@ -66,6 +66,44 @@ class TestChatsListView(TestCase):
         self.assertIsNotNone(create_link)
         self.assertEqual(create_link['href'], reverse('chats:chat-create'))
 
+    def test_pagination(self):
+        for i in range(11, 21):
+            Chat.objects.create(
+                owner=self.u1,
+                label=f'Label №{i}',
+                name=f'name_{i}',
+            )
+
+        def get_page(url):
+            soup = BeautifulSoup(self.client.get(url).content, 'html.parser')
+            names = [
+                a.find('span').get_text()
+                for a in soup.select('.chat__wrapper .media-body a')
+            ]
+            next_link = soup.find('a', string='Next')
+            return names, next_link and next_link['href']
+
+        first_page, next_url = get_page(reverse('chats:chat-list'))
+        self.assertEqual(len(first_page), 16)
+        self.assertIsNotNone(next_url)
+
+        second_page, last_url = get_page(reverse('chats:chat-list') + next_url)
+        self.assertEqual(len(second_page), 4)
+        self.assertIsNone(last_url)
+
+        # Every chat is shown exactly once
+        self.assertEqual(
+            sorted(first_page + second_page),
+            sorted(chat.get_name() for chat in Chat.objects.all()),
+        )
+
+        # Order is stable during session
+        self.assertEqual(get_page(reverse('chats:chat-list'))[0], first_page)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('chats:chat-list') + '?after=abc')
+        self.assertEqual(response.status_code, 404)
+
 
 class TestChatView(TestCase):
     @classmethod
@@ -80,8 +118,8 @@ class TestChatView(TestCase):
             owner=cls.u1,
             label='Chat 1',
             name='chat1',
-            members=[cls.u1.id],
         )
+        cls.c1.add_member_by_id(cls.u1.id)
 
     def test_basics(self):
         response = self.client.get(
@@ -10,6 +10,12 @@ urlpatterns = [
         name='chat-list',
     ),
 
+    path(
+        'search/',
+        views.ChatSearchView.as_view(),
+        name='chat-search',
+    ),
+
     path(
         'create/',
         views.ChatCreateView.as_view(),
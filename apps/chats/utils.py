@@ -0,0 +1,46 @@
+from typing import List, Optional, Tuple
+from secrets import randbits
+
+from django.db.models import Q
+
+
+SHUFFLE_KEY_BITS = 62
+
+
+def generate_shuffle_key() -> int:
+    """
+    Return random number which determine position of chat
+    in randomly ordered chats list (also used as session seed).
+    """
+    return randbits(SHUFFLE_KEY_BITS)
+
+
+def get_shuffled_page(queryset, seed: int, after: Optional[int] = None,
+    size: int = 16) -> Tuple[List, Optional[int]]:
+    """
+    Return page of chats in random, but stable for passed seed, order
+    and cursor of next page (None if it's last page).
+
+    Chats are ordered by indexed `shuffle_key` starting from `seed`
+    and wrapping around to the smallest keys, so every page costs
+    one or two index range scans instead of sorting whole table.
+
+     Args:
+       seed - start point of permutation, e.g. stored in session
+       after - shuffle_key of last chat from previous page
+       size - number of chats per page
+    """
+    if after is None:
+        segments = [Q(shuffle_key__gte=seed), Q(shuffle_key__lt=seed)]
+    elif after >= seed:
+        segments = [Q(shuffle_key__gt=after), Q(shuffle_key__lt=seed)]
+    else:
+        segments = [Q(shuffle_key__gt=after, shuffle_key__lt=seed)]
+
+    page = []
+    for segment in segments:
+        limit = size + 1 - len(page)
+        page += queryset.filter(segment).order_by('shuffle_key')[:limit]
+        if len(page) > size:
+            return page[:size], page[size - 1].shuffle_key
+    return page, None
@@ -1,11 +1,14 @@
 from django.core.exceptions import ValidationError
 
+from apps.core.uploads import validate_upload_size
+
 
 def validate_empty_string(val):
     if len(val.split()) == 0:
         raise ValidationError("Field is empty.")
 
-def file_size_validator(self):
-    # If size > 10Mb
-    if img.file.size > 1024 * 1024 * 10:
-        raise ValidationError('This file too large.')
+
+def file_size_validator(file):
+    # If size > UPLOAD_MAX_SIZES['attachment'] (10Mb)
+    validate_upload_size(file, 'attachment')
+
@@ -1,4 +1,4 @@
-from django.http import HttpResponse, HttpResponseBadRequest
+from django.http import HttpResponse, HttpResponseBadRequest, Http404
 from django.views.generic.edit import CreateView, UpdateView
 from django.contrib.auth.decorators import login_required
 from django.views.generic.detail import SingleObjectMixin
@@ -7,18 +7,87 @@ from django.views.decorators.cache import never_cache
 from django.utils.decorators import method_decorator
 from django.views.generic.base import RedirectView
 from django.shortcuts import render, redirect
+from django.conf import settings
 from django.urls import reverse
 
+from .utils import generate_shuffle_key, get_shuffled_page
 from .models import Chat
 
 
-class ChatsList(ListView):
-    model = Chat
-    paginate_by = 16
-    ordering = '?'
+class ChatCacheMixin:
+    """
+    Provide settings of chats cache to templates, fragments of chats
+    are cached by their `cache_version` (see apps.chats.cache).
+    """
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx['chats_cache_alias'] = settings.CHATS_CACHE_ALIAS
+        ctx['chats_cache_timeout'] = settings.CHATS_CACHE_TIMEOUT
+        return ctx
+
+
+class ChatsList(ChatCacheMixin, ListView):
+    """
+    List of chats in random order. Order is stable during session
+    (it depends on seed stored in session) and pages are fetched
+    by cursor, so paging through list doesn't repeat or skip chats.
+    """
+    queryset = Chat.objects.with_members_count()
+    page_size = 16
+    seed_session_key = 'chats_list_seed'
     context_object_name = 'chats'
     template_name = 'chats/chats_list/chats_list.html'
 
+    def get_queryset(self):
+        chats, self.next_cursor = get_shuffled_page(
+            super().get_queryset(),
+            seed=self.get_seed(),
+            after=self.get_cursor(),
+            size=self.page_size,
+        )
+        return chats
+
+    def get_seed(self) -> int:
+        if self.seed_session_key not in self.request.session:
+            self.request.session[self.seed_session_key] = generate_shuffle_key()
+        return self.request.session[self.seed_session_key]
+
+    def get_cursor(self):
+        after = self.request.GET.get('after')
+        if after is None:
+            return None
+        try:
+            return int(after)
+        except ValueError:
+            raise Http404('Invalid page.')
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx['next_cursor'] = self.next_cursor
+        ctx['is_first_page'] = self.request.GET.get('after') is None
+        return ctx
+
+
+class ChatSearchView(ChatCacheMixin, ListView):
+    """
+    Chats matching `?q=` ordered by relevance, see ChatQuerySet.search.
+    """
+    paginate_by = 16
+    max_query_length = 100
+    context_object_name = 'chats'
+    template_name = 'chats/chat_search/chat_search.html'
+
+    def get_query(self) -> str:
+        return self.request.GET.get('q', '')[:self.max_query_length]
+
+    def get_queryset(self):
+        return Chat.objects.with_members_count().search(self.get_query())
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx['query'] = self.get_query()
+        return ctx
+
 
 @method_decorator(login_required(redirect_field_name=None), name='dispatch')
 @method_decorator(never_cache, name='dispatch')
@@ -36,11 +105,16 @@ class ChatCreateView(CreateView):
 
 
 @method_decorator(login_required(redirect_field_name=None), name='dispatch')
-class ChatView(DetailView):
-    model = Chat
+class ChatView(ChatCacheMixin, DetailView):
+    queryset = Chat.objects.with_members_count()
     context_object_name = 'chat'
     template_name = 'chats/chat_details/chat_details.html'
 
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx['is_owner'] = self.object.owner_id == self.request.user.id
+        return ctx
+
 
 @method_decorator(login_required(redirect_field_name=None), name='dispatch')
 class DeleteChatView(RedirectView, SingleObjectMixin):
@@ -70,9 +144,15 @@ class EditChatView(UpdateView):
     template_name = 'chats/chat_edit/chat_edit.html'
 
     def dispatch(self, request, *args, **kwargs):
-        if request.user != self.get_object().owner:
+        if request.user.id != self.get_object().owner_id:
             return HttpResponseBadRequest('No way.')
         return super().dispatch(request, *args, **kwargs)
+
+    def get_object(self, queryset=None):
+        # Object is needed in dispatch and then again in get/post
+        if not hasattr(self, '_object'):
+            self._object = super().get_object(queryset)
+        return self._object
     
     def get_success_url(self):
-        return reverse('chats:chat-edit', kwargs={'pk':self.get_object().pk})
+        return reverse('chats:chat-edit', kwargs={'pk': self.object.pk})
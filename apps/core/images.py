@@ -0,0 +1,212 @@
+"""
+Image field which keeps small fixed-size renditions of uploaded image
+next to the original, e.g. for `chats_avatars/chat/photo.png`:
+
+    chats_avatars/chat/photo.64x64.webp
+    chats_avatars/chat/photo.64x64.jpeg
+    ...
+
+Sizes and formats are set by IMAGE_RENDITIONS and
+IMAGE_RENDITION_FORMATS settings. Renditions are generated when image
+is uploaded, images stored before get them by
+`manage.py generate_image_renditions` or on first request of missing
+rendition (see apps.core.views.serve_media). Urls of renditions are
+built from names only, so rendering page doesn't touch storage.
+"""
+from typing import Optional
+from io import BytesIO
+import posixpath
+import logging
+import re
+import os
+
+from django.db.models.fields.files import ImageField, ImageFieldFile
+from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
+from django.core.files.base import ContentFile
+from django.core.cache import cache
+from django.conf import settings
+from django import forms
+from PIL import Image, ImageOps
+
+from .uploads import validate_upload_size, sniff_image_format
+from .storage import is_content_addressed
+
+
+logger = logging.getLogger(__name__)
+
+RENDITION_NAME_RE = re.compile(r'^(.+)\.(\d+)x\2\.(\w+)$')
+
+
+def get_rendition_name(name: str, size: int, image_format: str) -> str:
+    root, _ = os.path.splitext(name)
+    return f'{root}.{size}x{size}.{image_format}'
+
+
+def get_rendition_source(storage, name: str) -> Optional[str]:
+    """
+    Return name of stored image which rendition `name` belongs to, None
+    if name isn't configured rendition or image doesn't exist.
+    """
+    match = RENDITION_NAME_RE.match(name)
+    if (match is None
+            or int(match[2]) not in settings.IMAGE_RENDITIONS.values()
+            or match[3] not in settings.IMAGE_RENDITION_FORMATS):
+        return None
+    directory, root = posixpath.split(match[1])
+    try:
+        _, files = storage.listdir(directory)
+    except OSError:
+        return None
+    for file in files:
+        # Renditions have longer root, e.g. photo.64x64 for photo.png
+        file_root, ext = os.path.splitext(file)
+        if file_root == root and ext:
+            return posixpath.join(directory, file)
+    return None
+
+
+def make_rendition(image: Image.Image, size: int, image_format: str) -> bytes:
+    """Crop image to square of passed size and encode it"""
+    image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        # JPEG doesn't support transparency, so put image on white
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+
+    output = BytesIO()
+    image.save(output, image_format,
+        quality=settings.IMAGE_RENDITION_QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def generate_renditions(storage, name: str):
+    with storage.open(name, 'rb') as f:
+        image = ImageOps.exif_transpose(Image.open(f))
+        image.load()
+
+    # Content addressed storage must keep names of renditions
+    save = getattr(storage, 'save_as', storage.save)
+    for size in settings.IMAGE_RENDITIONS.values():
+        for image_format in settings.IMAGE_RENDITION_FORMATS:
+            rendition = get_rendition_name(name, size, image_format)
+            # Storage would add suffix to name of existing file
+            storage.delete(rendition)
+            save(rendition, ContentFile(
+                make_rendition(image, size, image_format)))
+
+
+def get_failed_key(name: str) -> str:
+    return f'core.renditions.{name}.failed'
+
+
+def generate_missing_rendition(storage, name: str) -> Optional[str]:
+    """
+    Generate renditions of image which missing rendition `name` belongs
+    to and return name of file to serve instead: the rendition, or the
+    image itself if renditions can't be made. Return None if `name`
+    isn't rendition of stored image.
+    """
+    source = get_rendition_source(storage, name)
+    if source is None or cache.get(get_failed_key(source)):
+        return source
+    try:
+        generate_renditions(storage, source)
+    except (OSError, ValueError) as e:
+        logger.warning('Failed to generate renditions of %s: %s', source, e)
+        # Broken image isn't decoded again on every request
+        cache.set(get_failed_key(source), True,
+            settings.IMAGE_RENDITION_RETRY_DELAY)
+        return source
+    return name
+
+
+class RenditionImageFieldFile(ImageFieldFile):
+    def get_rendition_names(self):
+        """Return {size_name: {format: rendition name}}"""
+        return {
+            size_name: {
+                image_format: get_rendition_name(self.name, size, image_format)
+                for image_format in settings.IMAGE_RENDITION_FORMATS
+            }
+            for size_name, size in settings.IMAGE_RENDITIONS.items()
+        }
+
+    def has_renditions(self) -> bool:
+        return all(
+            self.storage.exists(name)
+            for formats in self.get_rendition_names().values()
+            for name in formats.values()
+        )
+
+    def generate_renditions(self):
+        generate_renditions(self.storage, self.name)
+
+    @cached_property
+    def renditions(self) -> dict:
+        """Return {size_name: {format: url}} without touching storage"""
+        if not self.name:
+            return {}
+        return {
+            size_name: {f: self.storage.url(name) for f, name in formats.items()}
+            for size_name, formats in self.get_rendition_names().items()
+        }
+
+    def save(self, name, content, save=True):
+        super().save(name, content, save)
+        self.__dict__.pop('renditions', None)
+        try:
+            # Identical image could be already stored with renditions
+            if not self.has_renditions():
+                self.generate_renditions()
+        except (OSError, ValueError) as e:
+            # Broken image is rejected by form validation, if it's saved
+            # anyway its renditions are served by original image.
+            logger.warning('Failed to generate renditions of %s: %s',
+                self.name, e)
+            cache.set(get_failed_key(self.name), True,
+                settings.IMAGE_RENDITION_RETRY_DELAY)
+
+    def delete(self, save=True):
+        self.__dict__.pop('renditions', None)
+        if self.name and is_content_addressed(self.name):
+            # File can be shared by other rows, so only reference is
+            # removed. collect_media_garbage deletes unreferenced files.
+            self.close()
+            self.name = None
+            setattr(self.instance, self.field.attname, self.name)
+            self._committed = False
+            if save:
+                self.instance.save()
+            return
+
+        if self.name:
+            for formats in self.get_rendition_names().values():
+                for name in formats.values():
+                    self.storage.delete(name)
+        super().delete(save)
+
+
+class ImageUploadField(forms.ImageField):
+    """
+    Check size and signature of uploaded file before it's
+    decoded by Pillow, so fakes are rejected cheaply.
+    """
+    def to_python(self, data):
+        if data and hasattr(data, 'size'):
+            validate_upload_size(data, 'image')
+            if sniff_image_format(data) is None:
+                raise ValidationError(
+                    self.error_messages['invalid_image'],
+                    code='invalid_image',
+                )
+        return super().to_python(data)
+
+
+class RenditionImageField(ImageField):
+    attr_class = RenditionImageFieldFile
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{'form_class': ImageUploadField, **kwargs})
@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class UpperIndex(models.Index):
+    """
+    Index on UPPER(column) for each of fields. Postgres compiles
+    `iexact` lookup to `UPPER(column::text) = UPPER(value)`, so plain
+    btree index on column can't serve it, but this index can.
+    """
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        statement = super().create_sql(model, schema_editor, using, **kwargs)
+        statement.parts['columns'] = ', '.join(
+            'UPPER({0})'.format(schema_editor.quote_name(
+                model._meta.get_field(field_name).column))
+            for field_name, _ in self.fields_orders
+        )
+        return statement
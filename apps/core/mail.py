@@ -0,0 +1,107 @@
+from datetime import timedelta
+from typing import Iterable, List, Optional, Tuple
+import logging
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+from django.conf import settings
+
+from .models import OutgoingEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+def queue_mail(subject: str, message: str, from_email: Optional[str],
+    recipient_list: List[str], html_message: Optional[str] = None):
+    """
+    Put email to outbox instead of sending it. Arguments are the same
+    as `django.core.mail.send_mail` has.
+    """
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=message,
+        html_body=html_message or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=recipient_list,
+    )
+
+
+def queue_mass_mail(datatuple: Iterable[tuple]) -> List[OutgoingEmail]:
+    """
+    Put many emails to outbox by one query. Every item of datatuple is
+    (subject, message, from_email, recipient_list, html_message), like
+    in `django.core.mail.send_mass_mail` plus html version.
+    """
+    return OutgoingEmail.objects.bulk_create([
+        OutgoingEmail(
+            subject=subject,
+            body=message,
+            html_body=html_message or '',
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            recipients=recipient_list,
+        )
+        for subject, message, from_email, recipient_list, html_message
+        in datatuple
+    ])
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: delay doubles after every failed attempt"""
+    return timedelta(
+        seconds=settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def send_queued_mail(batch_size: int = 100, connection=None) -> Tuple[int, int]:
+    """
+    Send batch of pending emails through one connection and return
+    numbers of sent and failed emails. Emails locked by another worker
+    are skipped, so several workers can run at the same time.
+
+     Args:
+       connection - opened email backend connection, which will be
+                    reused and left opened. New one is used otherwise.
+    """
+    close_connection = connection is None
+    if connection is None:
+        connection = get_connection(settings.EMAIL_QUEUE_BACKEND)
+
+    sent = failed = 0
+    with transaction.atomic():
+        emails = list(OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.PENDING,
+                next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')[:batch_size])
+
+        try:
+            for email in emails:
+                try:
+                    # Reopen connection if previous attempt broke it
+                    connection.open()
+                    connection.send_messages([email.to_message(connection)])
+                except Exception as e:
+                    logger.warning('Failed to send email %s: %s', email.pk, e)
+                    connection.close()
+                    _mark_failed(email, e)
+                    failed += 1
+                else:
+                    email.status = OutgoingEmail.SENT
+                    email.sent_at = timezone.now()
+                    sent += 1
+        finally:
+            if close_connection:
+                connection.close()
+
+        OutgoingEmail.objects.bulk_update(emails, [
+            'status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
+
+
+def _mark_failed(email: OutgoingEmail, error: Exception):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+        email.status = OutgoingEmail.FAILED
+    else:
+        email.next_attempt_at = timezone.now() + get_retry_delay(email.attempts)
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from collections import Counter
+import os
+
+from django.core.management.base import BaseCommand
+from django.core.files.storage import default_storage
+from django.db.models import FileField, Count
+from django.utils import timezone
+from django.conf import settings
+from django.apps import apps
+
+
+def get_references() -> Counter:
+    """
+    Return number of rows referencing each file name stored in
+    file fields of all models. Defaults of fields are always referenced.
+    """
+    references = Counter()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if not isinstance(field, FileField):
+                continue
+            if isinstance(field.default, str) and field.default:
+                references[field.default] += 1
+
+            names = model._default_manager.exclude(**{field.name: ''})\
+                .exclude(**{f'{field.name}__isnull': True})\
+                .order_by().values_list(field.name)\
+                .annotate(count=Count('*'))
+            for name, count in names.iterator():
+                references[name] += count
+    return references
+
+
+def get_original_root(name: str) -> str:
+    """
+    Return name of file without extensions of derived files, e.g.
+    `a/b.64x64.webp` and `a/b.png` are both turned into `a/b`.
+    """
+    directory, filename = os.path.split(name)
+    return os.path.join(directory, filename.split('.')[0])
+
+
+def walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for filename in files:
+        yield os.path.join(directory, filename)
+    for subdirectory in directories:
+        yield from walk(storage, os.path.join(directory, subdirectory))
+
+
+class Command(BaseCommand):
+    help = ('Delete files (with their renditions) from MEDIA_GC_DIRECTORIES '
+        'which aren\'t referenced by any model anymore.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=24,
+            help=('Files modified less than this number of hours ago are '
+                'kept, because rows referencing them can be not yet '
+                'committed.'),
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only print files which would be deleted.',
+        )
+
+    def handle(self, *args, min_age=24, dry_run=False, **options):
+        storage = default_storage
+        referenced_roots = {
+            get_original_root(name) for name in get_references()}
+        threshold = timezone.now() - timedelta(hours=min_age)
+
+        deleted = 0
+        for directory in settings.MEDIA_GC_DIRECTORIES:
+            if not storage.exists(directory):
+                continue
+            for name in walk(storage, directory):
+                if get_original_root(name) in referenced_roots:
+                    continue
+                if storage.get_modified_time(name) > threshold:
+                    continue
+                if options['verbosity'] > 1 or dry_run:
+                    self.stdout.write(name)
+                if not dry_run:
+                    storage.delete(name)
+                deleted += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Found" if dry_run else "Deleted"} {deleted} unreferenced files.'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.apps import apps
+
+from apps.core.images import RenditionImageField
+
+
+class Command(BaseCommand):
+    help = ('Generate renditions of images stored in RenditionImageField '
+        'fields of all models. Already existing renditions are kept '
+        'unless --force is passed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate existing renditions.',
+        )
+
+    def handle(self, *args, force=False, **options):
+        generated = failed = 0
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if not isinstance(field, RenditionImageField):
+                    continue
+
+                names = model._default_manager.exclude(**{field.name: ''})\
+                    .order_by().values_list(field.name, flat=True).distinct()
+                for name in names.iterator():
+                    file = field.attr_class(None, field, name)
+                    if not force and file.has_renditions():
+                        continue
+                    try:
+                        file.generate_renditions()
+                        generated += 1
+                    except (OSError, ValueError) as e:
+                        self.stderr.write(f'Failed to proceed {name}: {e}')
+                        failed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated renditions for {generated} images, failed: {failed}.'))
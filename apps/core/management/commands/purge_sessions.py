@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from apps.core.sessions import purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = ('Delete expired sessions from database in batches, so table '
+        'isn\'t locked by one long statement.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.SESSION_PURGE_BATCH_SIZE,
+            help='Number of sessions deleted by one statement.',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to sleep between batches.',
+        )
+
+    def handle(self, *args, batch_size=None, pause=0, **options):
+        deleted = purge_expired_sessions(batch_size, pause)
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Deleted {deleted} expired sessions.'))
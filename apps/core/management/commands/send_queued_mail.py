@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.mail import get_connection
+from django.conf import settings
+
+from apps.core.mail import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = ('Send emails from outbox. With --loop works as background '
+        'worker which keeps one email connection opened.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of emails sent through connection at once.',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling outbox instead of exit after one batch.',
+        )
+
+    def handle(self, *args, batch_size=100, loop=False, **options):
+        connection = get_connection(settings.EMAIL_QUEUE_BACKEND)
+        try:
+            while True:
+                sent, failed = send_queued_mail(batch_size, connection)
+                if (sent or failed) and options['verbosity']:
+                    self.stdout.write(f'Sent: {sent}, failed: {failed}.')
+                if not loop:
+                    break
+                # Outbox is empty, so wait for new emails. Idle connection
+                # is closed, because server would drop it anyway.
+                if sent + failed < batch_size:
+                    connection.close()
+                    time.sleep(settings.EMAIL_QUEUE_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
@@ -0,0 +1,98 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def get_query_fingerprint(sql: str) -> str:
+    """
+    Return sql without details which differ between
+    repeated statements (e.g. size of IN (...) lists).
+    """
+    sql = re.sub(r'(%s)(\s*,\s*%s)+', r'\1', sql)
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+class QueryRecorder:
+    """Database execute wrapper which records queries of request"""
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[get_query_fingerprint(sql)] += 1
+
+    def get_repeated(self, limit: int):
+        """Return (fingerprint, count) of statements repeated over limit"""
+        return [(sql, n) for sql, n in self.fingerprints.most_common()
+            if n > limit]
+
+
+class QueryBudgetMiddleware:
+    """
+    Count queries, total sql time and repeated statements (likely N+1)
+    of every request. Warn when query budget of view is exceeded, or
+    raise QueryBudgetExceeded if QUERY_BUDGET_STRICT is enabled (it is
+    by apps.core.runner.TestRunner). In DEBUG mode numbers are added to response headers.
+
+    Budgets are configured by url name in QUERY_BUDGETS, other views
+    use QUERY_BUDGET_DEFAULT.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        self.check_budget(request, recorder)
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time'] = '%.2f' % (recorder.duration * 1000)
+            response['X-Query-Repeated'] = str(max(
+                recorder.fingerprints.values(), default=0))
+        return response
+
+    def get_view_name(self, request) -> str:
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else request.path
+
+    def check_budget(self, request, recorder: QueryRecorder):
+        view_name = self.get_view_name(request)
+        budget = settings.QUERY_BUDGETS.get(
+            view_name, settings.QUERY_BUDGET_DEFAULT)
+        repeated = recorder.get_repeated(settings.QUERY_BUDGET_REPEATED_LIMIT)
+        if recorder.count <= budget and not repeated:
+            return
+
+        message = (
+            f'Query budget exceeded by {view_name}: {recorder.count} queries '
+            f'(budget {budget}), {recorder.duration * 1000:.2f} ms.'
+        )
+        for sql, n in repeated:
+            message += f'\n  {n}x {sql}'
+
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,68 @@
+from django.core.mail import EmailMultiAlternatives
+from django.contrib.postgres.fields import ArrayField
+from django.utils import timezone
+from django.db import models
+
+
+class OutgoingEmail(models.Model):
+    """
+    Email waiting in outbox to be sent by `send_queued_mail` worker,
+    so requests don't wait for SMTP.
+
+     Attrs:
+       status - pending, sent or failed (attempts are exhausted)
+       attempts - number of failed attempts to send email
+       next_attempt_at - date after which email can be sent
+       last_error - error of last failed attempt
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    recipients = ArrayField(base_field=models.EmailField())
+
+    status = models.CharField(
+        max_length=7,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Worker looks only for pending emails
+            models.Index(
+                fields=['next_attempt_at'],
+                name='outgoing_email_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+
+    def to_message(self, connection=None) -> EmailMultiAlternatives:
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.recipients,
+            connection=connection,
+        )
+        if self.html_body:
+            message.attach_alternative(self.html_body, 'text/html')
+        return message
+
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.recipients)} ({self.status})'
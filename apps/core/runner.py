@@ -0,0 +1,17 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Run tests with strict query budget, so views exceeding their budget
+    fail tests instead of logging warnings (see apps.core.middleware).
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.strict_query_budget = override_settings(QUERY_BUDGET_STRICT=True)
+        self.strict_query_budget.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.strict_query_budget.disable()
+        super().teardown_test_environment(**kwargs)
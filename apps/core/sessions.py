@@ -0,0 +1,107 @@
+"""
+Session engine which keeps small sessions in signed cookie and stores
+only big ones on server:
+
+    {'_auth_user_id': ...}        -> cookie is signed data itself
+    data bigger than SESSION_COOKIE_MAX_DATA_SIZE
+                                  -> cookie is random key, data is
+                                     read from cache, then database
+
+Typical session (authenticated user, a few small values) costs no
+queries at all. Session moves between both kinds when its size changes.
+Like with Django's signed_cookies engine, cookie of small session stays
+valid until it expires even after logout, but it's rejected when
+password of user is changed.
+
+Expired rows of spilled sessions are deleted in batches by
+`manage.py purge_sessions` (or `clearsessions`).
+"""
+import time
+
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.models import Session
+from django.core import signing
+from django.utils import timezone
+from django.conf import settings
+
+SIGNING_SALT = 'apps.core.sessions'
+
+
+def is_signed_key(session_key) -> bool:
+    """Random keys of stored sessions never contain signature separator"""
+    return bool(session_key) and ':' in session_key
+
+
+def purge_expired_sessions(batch_size: int, pause: float = 0) -> int:
+    """
+    Delete expired sessions from database by batches of passed size,
+    so table isn't locked by one huge DELETE. Return number of deleted.
+    """
+    deleted = 0
+    while True:
+        keys = Session.objects.filter(expire_date__lt=timezone.now())\
+            .values('session_key')[:batch_size]
+        count, _ = Session.objects.filter(session_key__in=keys).delete()
+        deleted += count
+        if count < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+class SessionStore(CachedDBStore):
+    def load(self):
+        if not is_signed_key(self.session_key):
+            return super().load()
+        try:
+            return signing.loads(
+                self.session_key,
+                serializer=self.serializer,
+                max_age=self.get_session_cookie_age(),
+                salt=SIGNING_SALT,
+            )
+        except Exception:
+            # BadSignature, expired or broken cookie, start new session
+            self._session_key = None
+            return {}
+
+    def save(self, must_create=False):
+        data = self._get_session(no_load=must_create)
+        signed = signing.dumps(
+            data,
+            compress=True,
+            salt=SIGNING_SALT,
+            serializer=self.serializer,
+        )
+        if len(signed) <= settings.SESSION_COOKIE_MAX_DATA_SIZE:
+            if self.session_key and not is_signed_key(self.session_key):
+                # Session became small, stored copy isn't needed anymore
+                super().delete(self.session_key)
+            self._session_key = signed
+            self.modified = True
+            return
+
+        if is_signed_key(self.session_key):
+            # Session became big, it gets random key in create()
+            self._session_key = None
+        super().save(must_create)
+
+    def exists(self, session_key):
+        if is_signed_key(session_key):
+            return False
+        return super().exists(session_key)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if is_signed_key(session_key):
+            if session_key == self.session_key:
+                self._session_key = ''
+                self._session_cache = {}
+                self.modified = True
+            return
+        super().delete(session_key)
+
+    @classmethod
+    def clear_expired(cls):
+        purge_expired_sessions(settings.SESSION_PURGE_BATCH_SIZE)
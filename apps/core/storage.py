@@ -0,0 +1,75 @@
+"""
+Storage which names files by SHA-256 of their content, so identical
+uploads are stored once:
+
+    users_avatars/photo.png -> users_avatars/3a/7b/3a7b...e1.png
+
+Only top directory of passed name is kept. Files derived from stored
+one (e.g. renditions `3a7b...e1.64x64.webp`) are saved with `save_as`
+under exact name. Unreferenced files are removed by
+`manage.py collect_media_garbage`.
+"""
+import hashlib
+import os
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+from django.core.files import File
+
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}(\.|$)')
+
+
+def get_content_digest(content) -> str:
+    sha256 = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        sha256.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return sha256.hexdigest()
+
+
+def is_content_addressed(name: str) -> bool:
+    return bool(DIGEST_RE.match(os.path.basename(name)))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_content_name(self, name: str, content) -> str:
+        digest = get_content_digest(content)
+        directory = os.path.dirname(name).replace('\\', '/').split('/')[0]
+        _, ext = os.path.splitext(name)
+        return os.path.join(
+            directory, digest[:2], digest[2:4], digest + ext.lower())
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.get_content_name(name, content)
+        # Same content is already stored
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    def save_as(self, name, content):
+        """Save file under passed name without hashing"""
+        return super().save(name, content)
+
+
+class ManifestStaticStorage(ManifestStaticFilesStorage):
+    """
+    Static files with hash in name (after collectstatic), so web server
+    can cache them forever. Files which weren't collected (development,
+    tests) are referenced by original names instead of raising error.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
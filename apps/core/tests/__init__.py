@@ -0,0 +1,14 @@
+from tempfile import TemporaryDirectory
+
+from django.test import override_settings
+
+
+class TemporaryMediaMixin:
+    """Store uploaded files of every test in its own temporary MEDIA_ROOT"""
+    def setUp(self):
+        super().setUp()
+        media = TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
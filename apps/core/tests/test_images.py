@@ -0,0 +1,100 @@
+from io import BytesIO, StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage
+from PIL import Image
+
+from apps.chats.models import Chat
+from apps.users.models import Profile
+from ..images import get_rendition_name
+from . import TemporaryMediaMixin
+
+
+def make_image(size=(300, 200), image_format='png', mode='RGBA'):
+    output = BytesIO()
+    Image.new(mode, size, (200, 10, 10)).save(output, image_format)
+    return output.getvalue()
+
+
+@override_settings(IMAGE_RENDITIONS={'small': 32, 'large': 100})
+class TestRenditionImageField(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.u = Profile.objects.create_user(
+            username='user001',
+            email='email@mail.com',
+            password='hardpwd123'
+        )
+        self.chat = Chat.objects.create(owner=self.u, label='Chat', name='chat')
+
+    def test_renditions_on_upload(self):
+        self.chat.avatar = SimpleUploadedFile('photo.png', make_image())
+        self.chat.save()
+
+        storage = self.chat.avatar.storage
+        name = self.chat.avatar.name
+        for size in (32, 100):
+            for image_format in ('webp', 'jpeg'):
+                rendition = get_rendition_name(name, size, image_format)
+                with storage.open(rendition) as f:
+                    image = Image.open(f)
+                    self.assertEqual(image.size, (size, size))
+                    self.assertEqual(image.format.lower(), image_format)
+
+        self.assertEqual(
+            self.chat.avatar.renditions['small']['webp'],
+            '/media/' + get_rendition_name(name, 32, 'webp'),
+        )
+
+    def test_renditions_without_storage_access(self):
+        # Image stored before renditions were introduced
+        storage = FileSystemStorage()
+        storage.save('chats_avatars/chat/old.png', BytesIO(make_image()))
+        Chat.objects.filter(pk=self.chat.pk)\
+            .update(avatar='chats_avatars/chat/old.png')
+        chat = Chat.objects.get(pk=self.chat.pk)
+
+        # Urls are built from names, renditions are made on first request
+        url = chat.avatar.renditions['large']['jpeg']
+        self.assertEqual(url, '/media/chats_avatars/chat/old.100x100.jpeg')
+        self.assertFalse(storage.exists('chats_avatars/chat/old.100x100.jpeg'))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertTrue(storage.exists('chats_avatars/chat/old.32x32.webp'))
+
+    def test_broken_upload(self):
+        with self.assertLogs('apps.core.images', 'WARNING'):
+            self.chat.avatar = SimpleUploadedFile('broken.png', b'not image')
+            self.chat.save()
+        name = self.chat.avatar.name
+        url = self.chat.avatar.renditions['small']['webp']
+        self.assertEqual(url, '/media/' + get_rendition_name(name, 32, 'webp'))
+
+        # Original is served instead, failure isn't retried on request
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('apps.core.images', 'WARNING'):
+                response = self.client.get(url)
+        self.assertRedirects(response, self.chat.avatar.url,
+            fetch_redirect_response=False)
+
+        # Rendition which isn't configured is not generated
+        response = self.client.get('/media/' + get_rendition_name(name, 33, 'webp'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_command(self):
+        storage = FileSystemStorage()
+        storage.save('users_avatars/user001/a.jpg',
+            BytesIO(make_image(image_format='jpeg', mode='RGB')))
+        Profile.objects.filter(pk=self.u.pk)\
+            .update(avatar_image='users_avatars/user001/a.jpg')
+
+        # Default avatar doesn't exist in temporary media
+        stderr = StringIO()
+        call_command('generate_image_renditions',
+            stdout=StringIO(), stderr=stderr)
+        self.assertIn('default_chat_avatar.png', stderr.getvalue())
+        self.assertTrue(storage.exists('users_avatars/user001/a.32x32.webp'))
@@ -0,0 +1,76 @@
+from datetime import timedelta
+from smtplib import SMTPException
+
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.utils import timezone
+from django.core import mail
+
+from ..mail import queue_mail, send_queued_mail
+from ..models import OutgoingEmail
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException('Server is unavailable.')
+
+
+class TestEmailQueue(TestCase):
+    def queue(self, n=1):
+        for i in range(n):
+            queue_mail(
+                subject=f'Subject {i}',
+                message='Text',
+                from_email=None,
+                recipient_list=[f'user{i}@mail.co'],
+                html_message='<p>Text</p>',
+            )
+
+    def test_queue_mail(self):
+        self.queue()
+
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.PENDING)
+        self.assertEqual(email.recipients, ['user0@mail.co'])
+
+    def test_send_queued_mail(self):
+        self.queue(3)
+
+        self.assertEqual(send_queued_mail(batch_size=2), (2, 0))
+        self.assertEqual(send_queued_mail(batch_size=2), (1, 0))
+        self.assertEqual(send_queued_mail(batch_size=2), (0, 0))
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertFalse(OutgoingEmail.objects.exclude(
+            status=OutgoingEmail.SENT).exists())
+
+    @override_settings(
+        EMAIL_QUEUE_BACKEND='apps.core.tests.test_mail.FailingEmailBackend',
+        EMAIL_QUEUE_MAX_ATTEMPTS=2,
+        EMAIL_QUEUE_RETRY_DELAY=60,
+    )
+    def test_retry(self):
+        self.queue()
+
+        self.assertEqual(send_queued_mail(), (0, 1))
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('unavailable', email.last_error)
+        self.assertGreater(
+            email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+        # Email isn't retried before delay passed
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_queued_mail(), (0, 1))
+        self.assertEqual(OutgoingEmail.objects.get().status, OutgoingEmail.FAILED)
+
+    def test_command(self):
+        self.queue(2)
+        call_command('send_queued_mail', verbosity=0)
+        self.assertEqual(len(mail.outbox), 2)
@@ -0,0 +1,65 @@
+from django.test import TestCase, RequestFactory, override_settings
+from django.http import HttpResponse
+from django.conf import settings
+
+from ..middleware import (QueryBudgetMiddleware, QueryBudgetExceeded,
+    get_query_fingerprint)
+from apps.users.models import Profile
+
+
+class TestQueryBudgetMiddleware(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = Profile.objects.create_user(
+            username='testuser',
+            email='testuser@mail.com',
+            password='hardpwd123',
+        )
+
+    def get_response(self, queries: int):
+        def view(request):
+            for i in range(queries):
+                Profile.objects.filter(pk__in=[self.u1.pk] * (i + 1)).exists()
+            return HttpResponse()
+
+        middleware = QueryBudgetMiddleware(view)
+        return middleware(RequestFactory().get('/some/url/'))
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            get_query_fingerprint('SELECT 1  FROM t WHERE id IN (%s, %s, %s)'),
+            'SELECT 1 FROM t WHERE id IN (%s)')
+
+    def test_strict_by_test_runner(self):
+        self.assertTrue(settings.QUERY_BUDGET_STRICT)
+
+    @override_settings(DEBUG=True)
+    def test_headers(self):
+        response = self.get_response(3)
+
+        self.assertEqual(response['X-Query-Count'], '3')
+        self.assertEqual(response['X-Query-Repeated'], '3')
+        self.assertIn('X-Query-Time', response)
+
+    @override_settings(QUERY_BUDGET_STRICT=True, QUERY_BUDGET_DEFAULT=2)
+    def test_budget_exceeded(self):
+        self.get_response(2)
+        with self.assertRaises(QueryBudgetExceeded):
+            self.get_response(3)
+
+    @override_settings(
+        QUERY_BUDGET_STRICT=True,
+        QUERY_BUDGET_REPEATED_LIMIT=3,
+    )
+    def test_repeated_queries(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, '4x SELECT'):
+            self.get_response(4)
+
+    @override_settings(QUERY_BUDGET_STRICT=False, QUERY_BUDGET_DEFAULT=1)
+    def test_warning(self):
+        with self.assertLogs('apps.core.middleware', 'WARNING') as logs:
+            response = self.get_response(2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('2 queries (budget 1)', logs.output[0])
+        self.assertNotIn('X-Query-Count', response)
@@ -0,0 +1,81 @@
+from datetime import timedelta
+from io import StringIO
+import secrets
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..sessions import SessionStore, is_signed_key
+
+
+class TestSessionStore(TestCase):
+    def test_small_session_is_stored_in_cookie(self):
+        session = SessionStore()
+        session['value'] = 1
+        with self.assertNumQueries(0):
+            session.save()
+        self.assertTrue(is_signed_key(session.session_key))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(session.session_key)['value'], 1)
+
+    def test_tampered_cookie(self):
+        session = SessionStore()
+        session['value'] = 1
+        session.save()
+
+        session = SessionStore(session.session_key[:-1] + 'x')
+        self.assertNotIn('value', session)
+        self.assertIsNone(session.session_key)
+
+    @override_settings(SESSION_COOKIE_MAX_DATA_SIZE=100)
+    def test_big_session_is_stored_on_server(self):
+        session = SessionStore()
+        session['value'] = 'small'
+        session.save()
+        self.assertTrue(is_signed_key(session.session_key))
+
+        # Random data can't be compressed
+        session['value'] = secrets.token_hex(100)
+        session.save()
+        self.assertFalse(is_signed_key(session.session_key))
+        self.assertTrue(Session.objects.filter(
+            session_key=session.session_key).exists())
+
+        with self.assertNumQueries(0):
+            loaded = SessionStore(session.session_key)
+            self.assertEqual(loaded['value'], session['value'])
+
+        key = session.session_key
+        session['value'] = 'small'
+        session.save()
+        self.assertTrue(is_signed_key(session.session_key))
+        self.assertFalse(Session.objects.filter(session_key=key).exists())
+
+    @override_settings(SESSION_COOKIE_MAX_DATA_SIZE=100)
+    def test_flush(self):
+        for value in ('small', 'a' * 1000):
+            session = SessionStore()
+            session['value'] = value
+            session.save()
+            session.flush()
+            self.assertIsNone(session.session_key)
+            self.assertFalse(Session.objects.exists())
+
+    def test_purge_sessions(self):
+        expired = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create([
+            Session(session_key=f'key{i:08}', session_data='',
+                expire_date=expired)
+            for i in range(5)
+        ] + [Session(session_key='alive000', session_data='',
+            expire_date=timezone.now() + timedelta(days=1))])
+
+        out = StringIO()
+        call_command('purge_sessions', '--batch-size=2', stdout=out)
+        self.assertIn('Deleted 5 expired sessions.', out.getvalue())
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            ['alive000'])
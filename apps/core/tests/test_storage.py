@@ -0,0 +1,73 @@
+from io import BytesIO, StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from apps.chats.models import Chat
+from apps.users.models import Profile
+from ..images import get_rendition_name
+from . import TemporaryMediaMixin
+
+
+def make_image(color):
+    output = BytesIO()
+    Image.new('RGB', (50, 50), color).save(output, 'png')
+    return output.getvalue()
+
+
+@override_settings(IMAGE_RENDITIONS={'small': 32})
+class TestContentAddressedStorage(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.u = Profile.objects.create_user(
+            username='user001',
+            email='email@mail.com',
+            password='hardpwd123'
+        )
+        self.chat1 = Chat.objects.create(owner=self.u, label='Chat', name='c1')
+        self.chat2 = Chat.objects.create(owner=self.u, label='Chat', name='c2')
+
+    def set_avatar(self, obj, color):
+        obj.avatar = SimpleUploadedFile('Photo.PNG', make_image(color))
+        obj.save()
+        return obj.avatar.name
+
+    def collect_garbage(self):
+        call_command('collect_media_garbage', min_age=0, stdout=StringIO())
+
+    def test_deduplication(self):
+        name = self.set_avatar(self.chat1, 'red')
+
+        self.assertRegex(
+            name, r'^chats_avatars/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.png$')
+
+        # Same content is stored once
+        self.assertEqual(self.set_avatar(self.chat2, 'red'), name)
+        self.assertNotEqual(self.set_avatar(self.chat2, 'blue'), name)
+
+    def test_garbage_collection(self):
+        red = self.set_avatar(self.chat1, 'red')
+        self.assertEqual(self.set_avatar(self.chat2, 'red'), red)
+        blue = self.set_avatar(self.chat2, 'blue')
+
+        # Red is still used by chat1
+        self.collect_garbage()
+        self.assertTrue(default_storage.exists(red))
+        self.assertTrue(default_storage.exists(
+            get_rendition_name(red, 32, 'webp')))
+
+        # Deleting avatar removes only reference
+        self.chat1.avatar.delete()
+        self.assertTrue(default_storage.exists(red))
+
+        # Recently modified files are kept
+        call_command('collect_media_garbage', stdout=StringIO())
+        self.assertTrue(default_storage.exists(red))
+
+        self.collect_garbage()
+        for name in [red, get_rendition_name(red, 32, 'webp')]:
+            self.assertFalse(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(blue))
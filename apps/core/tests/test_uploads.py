@@ -0,0 +1,61 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, RequestFactory, override_settings
+from django.core.exceptions import ValidationError
+from PIL import Image
+
+from ..uploads import sniff_image_format, validate_upload_size
+from ..images import ImageUploadField
+
+
+def make_image(image_format):
+    output = BytesIO()
+    Image.new('RGB', (10, 10)).save(output, image_format)
+    return output.getvalue()
+
+
+@override_settings(
+    UPLOAD_MAX_SIZES={'image': 100, 'attachment': 1000},
+    UPLOAD_FIELD_KINDS={'avatar': 'image'},
+)
+class TestUploads(SimpleTestCase):
+    def test_upload_handler(self):
+        request = RequestFactory().post('/', data={
+            'small': SimpleUploadedFile('small.txt', b'x' * 500),
+            'avatar': SimpleUploadedFile('avatar.png', b'x' * 500),
+            'label': 'Chat',
+        })
+
+        # Attachment fits its limit, avatar doesn't fit limit of images
+        # and rest of body isn't read
+        self.assertEqual(request.FILES['small'].read(), b'x' * 500)
+        self.assertNotIn('avatar', request.FILES)
+        self.assertNotIn('label', request.POST)
+
+    def test_validate_upload_size(self):
+        small = SimpleUploadedFile('small.txt', b'x' * 500)
+        validate_upload_size(small, 'attachment')
+        with self.assertRaisesMessage(ValidationError, 'too large'):
+            validate_upload_size(small, 'image')
+
+    def test_sniff_image_format(self):
+        for image_format in ['jpeg', 'png', 'gif', 'webp']:
+            file = BytesIO(make_image(image_format))
+            self.assertEqual(sniff_image_format(file), image_format)
+        self.assertIsNone(sniff_image_format(BytesIO(b'<?php echo 1; ?>')))
+
+    @override_settings(UPLOAD_MAX_SIZES={'image': 10000})
+    def test_image_upload_field(self):
+        field = ImageUploadField()
+
+        image = field.clean(SimpleUploadedFile('a.png', make_image('png')))
+        self.assertEqual(image.image.format, 'PNG')
+
+        for data in [b'not image', b'\x89PNG\r\n\x1a\n' + b'x' * 100]:
+            with self.assertRaises(ValidationError) as cm:
+                field.clean(SimpleUploadedFile('fake.png', data))
+            self.assertEqual(cm.exception.code, 'invalid_image')
+
+        with self.assertRaisesMessage(ValidationError, 'too large'):
+            field.clean(SimpleUploadedFile('big.png', b'x' * 20000))
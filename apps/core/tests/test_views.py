@@ -0,0 +1,65 @@
+from io import BytesIO
+
+from django.test import TestCase, override_settings
+from django.core.files.storage import default_storage
+from django.core.files.base import ContentFile
+from django.urls import reverse
+
+from . import TemporaryMediaMixin
+
+
+class TestServeMedia(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.name = default_storage.save(
+            'chats_avatars/photo.png', ContentFile(b'png content'))
+        self.url = reverse('media', kwargs={'path': self.name})
+
+    def test_serve_file(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'png content')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['Content-Length'], '11')
+        self.assertEqual(
+            response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertIn('Last-Modified', response)
+
+        # Conditional requests
+        for headers in [
+            {'HTTP_IF_NONE_MATCH': response['ETag']},
+            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+        ]:
+            not_modified = self.client.get(self.url, **headers)
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified['ETag'], response['ETag'])
+
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(changed.status_code, 200)
+
+    def test_not_content_addressed_file(self):
+        default_storage.save_as('chats_avatars/default.png', BytesIO(b'x'))
+        response = self.client.get(
+            reverse('media', kwargs={'path': 'chats_avatars/default.png'}))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SERVE_MODE='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], default_storage.path(self.name))
+
+    def test_not_found(self):
+        for path in ['missing.png', 'chats_avatars', '../settings/settings.py']:
+            response = self.client.get(f'/media/{path}')
+            self.assertEqual(response.status_code, 404)
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 405)
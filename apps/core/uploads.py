@@ -0,0 +1,83 @@
+"""
+Limits of uploaded files shared by all models and forms.
+
+UPLOAD_MAX_SIZES setting maps kind of upload (e.g. 'image',
+'attachment') to its max size in bytes, UPLOAD_FIELD_KINDS maps names
+of form fields to kinds of their uploads. LimitedUploadHandler stops
+reading request as soon as file exceeds limit of its field, so huge
+uploads never end up in memory or temporary files.
+"""
+from typing import Optional
+
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.core.exceptions import ValidationError
+from django.conf import settings
+
+# Signatures of image formats accepted as avatars
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+]
+
+
+# Kind of uploads of fields missing in UPLOAD_FIELD_KINDS
+DEFAULT_UPLOAD_KIND = 'attachment'
+
+
+def get_upload_max_size(kind: str) -> int:
+    return settings.UPLOAD_MAX_SIZES[kind]
+
+
+def get_field_upload_kind(field_name: str) -> str:
+    return settings.UPLOAD_FIELD_KINDS.get(field_name, DEFAULT_UPLOAD_KIND)
+
+
+def is_new_upload(file) -> bool:
+    """Files which are already in storage aren't validated again"""
+    return not getattr(file, '_committed', False)
+
+
+def validate_upload_size(file, kind: str):
+    if is_new_upload(file) and file.size > get_upload_max_size(kind):
+        raise ValidationError('This file too large.')
+
+
+def sniff_image_format(file) -> Optional[str]:
+    """
+    Return image format determined by first bytes of file
+    or None if file doesn't look like supported image.
+    """
+    position = file.tell()
+    file.seek(0)
+    header = file.read(16)
+    file.seek(position)
+
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """
+    Must be first in FILE_UPLOAD_HANDLERS. When file exceeds limit of
+    its field, upload is stopped and rest of request body isn't read,
+    so connection is reset after response.
+    """
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.max_size = get_upload_max_size(get_field_upload_kind(field_name))
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            raise StopUpload(connection_reset=True)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
@@ -0,0 +1,78 @@
+from mimetypes import guess_type
+from urllib.parse import quote
+import os
+
+from django.views.decorators.http import require_safe
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils.cache import get_conditional_response
+from django.utils._os import safe_join
+from django.http import (FileResponse, HttpResponse, HttpResponseRedirect,
+    Http404)
+from django.core.files.storage import default_storage
+from django.utils.http import http_date
+from django.conf import settings
+
+from .images import generate_missing_rendition
+from .storage import is_content_addressed
+
+
+def get_file_etag(stat) -> str:
+    return '"{0:x}-{1:x}"'.format(stat.st_mtime_ns, stat.st_size)
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve file from MEDIA_ROOT. Depending on MEDIA_SERVE_MODE the file
+    itself is sent by web server (X-Accel-Redirect for nginx,
+    X-Sendfile for apache/lighttpd) or by FileResponse, which uses
+    wsgi.file_wrapper (sendfile) when server provides it.
+    Content-addressed files never change, so they are cached forever.
+    Missing renditions of stored image are generated, if they can't be
+    made request is redirected to image itself.
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('File does not exist.')
+    if not os.path.exists(fullpath):
+        name = generate_missing_rendition(default_storage, path)
+        if name is None:
+            raise Http404('File does not exist.')
+        if name != path:
+            return HttpResponseRedirect(default_storage.url(name))
+    try:
+        stat = os.stat(fullpath)
+    except OSError:
+        raise Http404('File does not exist.')
+    if not os.path.isfile(fullpath):
+        raise Http404('File does not exist.')
+
+    etag = get_file_etag(stat)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        content_type, encoding = guess_type(fullpath)
+        content_type = content_type or 'application/octet-stream'
+        mode = settings.MEDIA_SERVE_MODE
+        if mode == 'x-accel-redirect':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = quote(
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX + path)
+        elif mode == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = fullpath
+        else:
+            response = FileResponse(
+                open(fullpath, 'rb'), content_type=content_type)
+            response['Content-Length'] = stat.st_size
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if is_content_addressed(path):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    return response
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 
 class UsersConfig(AppConfig):
-    name = 'users'
+    name = 'apps.users'
+
+    def ready(self):
+        from .signals import signals
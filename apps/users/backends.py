@@ -1,6 +1,8 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+
+from .cache import user_cache, permissions_cache
+from .utils import find_user
 
 
 UserModel = get_user_model()
@@ -8,9 +10,12 @@ UserModel = get_user_model()
 
 class EmailOrUsernameLoginBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
         try:
-            user = UserModel.objects.get(
-                Q(username__iexact=username) | Q(email__iexact=username))
+            user = find_user(username, request)
         except UserModel.DoesNotExist:
             UserModel().set_password(password)
         else:
@@ -18,9 +23,22 @@ class EmailOrUsernameLoginBackend(ModelBackend):
                 return user
 
     def get_user(self, user_id):
-        try:
-            user = UserModel.objects.get(pk=user_id)
-        except UserModel.DoesNotExist:
+        user = user_cache.get(user_id)
+        if user is None:
             return None
 
-        return user if self.user_can_authenticate(user) else None
\ No newline at end of file
+        return user if self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        """
+        Load permissions from cache, they are invalidated by signals
+        when user permissions or groups are changed (see PermissionsCache).
+        """
+        if (obj is None and user_obj.is_active and not user_obj.is_anonymous
+                and not hasattr(user_obj, '_perm_cache')):
+            perms = permissions_cache.get(user_obj.pk)
+            if perms is None:
+                perms = super().get_all_permissions(user_obj)
+                permissions_cache.set(user_obj.pk, perms)
+            user_obj._perm_cache = perms
+        return super().get_all_permissions(user_obj, obj)
@@ -0,0 +1,224 @@
+"""
+Cache of users loaded by authentication backend on every request.
+
+Users are kept in small in-process LRU with short TTL and, optionally,
+in shared Django cache (USERS_CACHE_ALIAS). Only field values are
+cached and new instance is built for every request, so changes made to
+request.user never leak into cache. Entries are invalidated by signals
+when profile is saved (including password changes) or deleted.
+
+Tokens of REST API and permission sets of users are cached the same
+way (see TokenCache, PermissionsCache).
+"""
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import time
+
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+from django.core.cache import caches
+from django.conf import settings
+
+
+# Marks missing entries, because None can be cached
+MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe in-process LRU cache with TTL of entries"""
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Return cached value or MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class UserCache:
+    def __init__(self, max_size: int, ttl: float):
+        self._local = LocalCache(max_size, ttl)
+
+    @property
+    def shared_cache(self):
+        alias = settings.USERS_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    def get_key(self, user_id) -> str:
+        return f'users.user.{user_id}'
+
+    def get(self, user_id):
+        """Return user with passed pk or None if it doesn't exist"""
+        user_model = get_user_model()
+        row = self._local.get(user_id)
+        if row is MISSING and self.shared_cache is not None:
+            row = self.shared_cache.get(self.get_key(user_id), MISSING)
+            if row is not MISSING:
+                self._local.set(user_id, row)
+        if row is MISSING:
+            row = self._load(user_model, user_id)
+            if row is None:
+                return None
+            self._local.set(user_id, row)
+            if self.shared_cache is not None:
+                self.shared_cache.set(
+                    self.get_key(user_id), row, settings.USERS_CACHE_TIMEOUT)
+
+        field_names, values = row
+        return user_model.from_db('default', field_names, values)
+
+    def invalidate(self, user_ids):
+        user_ids = list(user_ids)
+        self._local.delete_many(user_ids)
+        if self.shared_cache is not None:
+            self.shared_cache.delete_many(
+                [self.get_key(user_id) for user_id in user_ids])
+
+    def clear(self):
+        self._local.clear()
+
+    def _load(self, user_model, user_id):
+        field_names = [f.attname for f in user_model._meta.concrete_fields]
+        values = user_model.objects.filter(pk=user_id)\
+            .values_list(*field_names).first()
+        return None if values is None else (field_names, values)
+
+
+class TokenCache:
+    """
+    Cache of API tokens: {key: (user_id, created)}. Tokens are cached
+    locally and in shared cache (USERS_CACHE_ALIAS) like users, unknown
+    keys are cached as None only locally, so guessing keys can't
+    fill shared cache. Entries are invalidated by signals when token is
+    saved or deleted. Users are loaded by UserCache, so deactivation
+    of user is seen without invalidating tokens.
+    """
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float):
+        self.negative_ttl = negative_ttl
+        self._local = LocalCache(max_size, ttl)
+
+    @property
+    def shared_cache(self):
+        alias = settings.USERS_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    def get_key(self, key: str) -> str:
+        # Tokens are secrets, so they aren't stored in plain
+        return 'users.token.' + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str):
+        """Return (user_id, created) of token or None if it doesn't exist"""
+        entry = self._local.get(key)
+        if entry is MISSING and self.shared_cache is not None:
+            entry = self.shared_cache.get(self.get_key(key), MISSING)
+            if entry is not MISSING:
+                self._local.set(key, entry)
+        if entry is MISSING:
+            entry = Token.objects.filter(key=key)\
+                .values_list('user_id', 'created').first()
+            if entry is None:
+                self._local.set(key, None, self.negative_ttl)
+                return None
+            self._local.set(key, entry)
+            if self.shared_cache is not None:
+                self.shared_cache.set(
+                    self.get_key(key), entry, settings.USERS_CACHE_TIMEOUT)
+        return entry
+
+    def invalidate(self, keys):
+        keys = list(keys)
+        self._local.delete_many(keys)
+        if self.shared_cache is not None:
+            self.shared_cache.delete_many([self.get_key(key) for key in keys])
+
+    def clear(self):
+        self._local.clear()
+
+
+class PermissionsCache:
+    """
+    Cache of permission sets of users: {user_id: {'app.codename', ...}}.
+    Sets are cached locally and in shared cache (USERS_CACHE_ALIAS) like
+    users, so permission revoked in one process is seen by others after
+    USERS_CACHE_TTL at most. Entries are invalidated by signals when
+    permissions, groups or flags of users are changed.
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self._local = LocalCache(max_size, ttl)
+
+    @property
+    def shared_cache(self):
+        alias = settings.USERS_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    def get_key(self, user_id) -> str:
+        return f'users.permissions.{user_id}'
+
+    def get(self, user_id):
+        """Return cached permission set or None"""
+        perms = self._local.get(user_id)
+        if perms is MISSING and self.shared_cache is not None:
+            perms = self.shared_cache.get(self.get_key(user_id), MISSING)
+            if perms is not MISSING:
+                self._local.set(user_id, perms)
+        return None if perms is MISSING else perms
+
+    def set(self, user_id, perms: set):
+        self._local.set(user_id, perms)
+        if self.shared_cache is not None:
+            self.shared_cache.set(
+                self.get_key(user_id), perms, settings.USERS_CACHE_TIMEOUT)
+
+    def invalidate(self, user_ids):
+        user_ids = list(user_ids)
+        self._local.delete_many(user_ids)
+        if self.shared_cache is not None:
+            self.shared_cache.delete_many(
+                [self.get_key(user_id) for user_id in user_ids])
+
+    def clear(self):
+        self._local.clear()
+
+
+user_cache = UserCache(
+    max_size=settings.USERS_CACHE_MAX_SIZE,
+    ttl=settings.USERS_CACHE_TTL,
+)
+token_cache = TokenCache(
+    max_size=settings.API_TOKENS_CACHE_MAX_SIZE,
+    ttl=settings.API_TOKENS_CACHE_TTL,
+    negative_ttl=settings.API_TOKENS_NEGATIVE_CACHE_TTL,
+)
+permissions_cache = PermissionsCache(
+    max_size=settings.USERS_CACHE_MAX_SIZE,
+    ttl=settings.USERS_CACHE_TTL,
+)
@@ -0,0 +1,96 @@
+"""
+Deletion of expired tokens and of accounts which were never confirmed.
+
+Rows are deleted by small batches in separate transactions. Rows locked
+by other transactions (e.g. user is confirming email right now) are
+skipped and picked up by next run, so cleanup can work continuously
+next to site without long locks.
+"""
+from datetime import timedelta
+from collections import Counter
+import logging
+import time
+
+from django.db import transaction
+from django.utils import timezone
+from django.conf import settings
+
+from .models import Profile, EmailVerification, PasswordRecovery
+
+
+logger = logging.getLogger(__name__)
+
+
+def delete_in_batches(queryset, order_by: str, batch_size: int) -> Counter:
+    """
+    Delete rows of queryset by batches ordered by indexed field and
+    return metrics: number of deleted rows and batches.
+    """
+    metrics = Counter()
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.select_for_update(skip_locked=True)
+                .order_by(order_by).values_list('pk', flat=True)[:batch_size])
+            if ids:
+                queryset.model.objects.filter(pk__in=ids).delete()
+                metrics['deleted'] += len(ids)
+                metrics['batches'] += 1
+        if len(ids) < batch_size:
+            return metrics
+
+
+def get_cleanup_querysets() -> dict:
+    """Return {name: (queryset of stale rows, indexed field to order by)}"""
+    now = timezone.now()
+    return {
+        'password_recoveries': (
+            PasswordRecovery.objects.filter(expiration_date__lt=now),
+            'expiration_date',
+        ),
+        # Unconfirmed profiles keep expired verification, it's refreshed
+        # when user asks to resend confirmation email.
+        'email_verifications': (
+            EmailVerification.objects.filter(
+                expiration_date__lt=now,
+                profile__email_confirmed=True,
+            ),
+            'expiration_date',
+        ),
+        # email_confirmed is checked against permissions, so confirmed
+        # profiles are kept even if denormalized flag is stale.
+        'profiles': (
+            Profile.objects.filter(
+                email_confirmed=False,
+                is_superuser=False,
+                is_staff=False,
+                last_login__isnull=True,
+                date_joined__lt=now - timedelta(
+                    seconds=settings.USERS_UNCONFIRMED_LIFETIME),
+                email_verification__isnull=False,
+            ).exclude(
+                user_permissions__codename='can_login',
+            ).exclude(
+                groups__permissions__codename='can_login',
+            ),
+            'date_joined',
+        ),
+    }
+
+
+def cleanup_users(batch_size: int = None) -> dict:
+    """
+    Delete expired password recoveries, useless verifications of
+    confirmed profiles and profiles which weren't confirmed during
+    USERS_UNCONFIRMED_LIFETIME seconds. Return metrics of run:
+    {name: deleted rows, 'batches': ..., 'duration': seconds}.
+    """
+    batch_size = batch_size or settings.USERS_CLEANUP_BATCH_SIZE
+    started = time.monotonic()
+    metrics = {'batches': 0}
+    for name, (queryset, order_by) in get_cleanup_querysets().items():
+        result = delete_in_batches(queryset, order_by, batch_size)
+        metrics[name] = result['deleted']
+        metrics['batches'] += result['batches']
+    metrics['duration'] = round(time.monotonic() - started, 3)
+    logger.info('Users cleanup: %s', metrics)
+    return metrics
@@ -14,13 +14,19 @@ class UserLoginForm(AuthenticationForm):
     def __init__(self, request=None, *args, **kwargs):
         super().__init__(request, *args, **kwargs)
         self.fields['username'].label = 'Username or email'
-        self.fields['username'].validators += [username_exist_validator]
         self.fields['username'].widget.attrs['class'] = 'field'
 
         self.fields['password'].widget.attrs['class'] = 'field'
 
         self.error_messages['invalid_login'] = 'Enter correct password.'
 
+    def clean_username(self):
+        # Found user is memoized for request, so backend
+        # doesn't look it up again.
+        username = self.cleaned_data['username']
+        username_exist_validator(username, self.request)
+        return username
+
 
 class UserRegistrationForm(UserCreationForm):
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,256 @@
+"""
+Bulk import of users from CSV or NDJSON:
+
+    username,email,password                {"username": ..., "email": ...}
+    alice,alice@mail.com,secret123         {"username": ..., "email": ...,
+                                            "password": ...}
+
+Rows are read lazily and handled by chunks of USERS_IMPORT_CHUNK_SIZE.
+Every chunk is validated against database by one query, its passwords
+are hashed by process pool (USERS_IMPORT_PROCESSES) outside of
+transaction, then profiles, their verifications, privacy settings and
+confirmation letters are inserted by constant number of queries. Letters
+are sent by `send_queued_mail` worker. Users without password get
+unusable one and set it by password recovery.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+import logging
+import json
+import time
+import csv
+
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db.models.functions import Upper
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Q
+from django.conf import settings
+
+from apps.core.mail import queue_mass_mail
+from .models import Profile, Token, EmailVerification, PrivacySettings
+from .utils import get_confirmation_mail
+
+
+logger = logging.getLogger(__name__)
+
+IMPORTED_FIELDS = ('username', 'email')
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    """Yield (line number, row) of CSV with header"""
+    reader = csv.DictReader(lines)
+    for data in reader:
+        yield reader.line_num, data
+
+
+def read_ndjson(lines: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    """Yield (line number, object), malformed lines are yielded as None"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        yield number, data
+
+
+READERS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+}
+
+
+def build_profile(data) -> Profile:
+    """
+    Return unsaved profile from row, its password attribute holds raw
+    password until it's hashed. Raise ValidationError if row is invalid.
+    """
+    if not isinstance(data, dict):
+        raise ValidationError(
+            'Expected object with username, email and optional password.')
+    profile = Profile(
+        username=Profile.normalize_username(str(data.get('username') or '')),
+        email=Profile.objects.normalize_email(str(data.get('email') or '')),
+    )
+    profile.clean_fields(exclude=[
+        field.name for field in Profile._meta.fields
+        if field.name not in IMPORTED_FIELDS
+    ])
+    password = data.get('password')
+    profile.password = str(password) if password else None
+    if profile.password is not None:
+        validate_password(profile.password, profile)
+    return profile
+
+
+def get_existing_lines(profiles: Dict[int, Profile]) -> List[int]:
+    """Return lines of profiles whose username or email is already taken"""
+    if not profiles:
+        return []
+    usernames = {profile.username.upper() for profile in profiles.values()}
+    emails = {profile.email.upper() for profile in profiles.values()}
+    taken = set()
+    # Upper() is served by indexes of case-insensitive lookups
+    for username, email in Profile.objects.annotate(
+            username_upper=Upper('username'),
+            email_upper=Upper('email'),
+        ).filter(
+            Q(username_upper__in=usernames) | Q(email_upper__in=emails),
+        ).values_list('username_upper', 'email_upper'):
+        taken.update((username, email))
+    return [
+        line for line, profile in profiles.items()
+        if profile.username.upper() in taken or profile.email.upper() in taken
+    ]
+
+
+def hash_passwords(profiles: List[Profile], pool=None):
+    """Replace raw passwords of profiles with hashes, using pool if passed"""
+    passwords = [profile.password for profile in profiles]
+    if pool is None:
+        hashes = map(make_password, passwords)
+    else:
+        hashes = pool.map(make_password, passwords, chunksize=16)
+    for profile, password in zip(profiles, hashes):
+        profile.password = password
+
+
+def bulk_create_verifications(profiles: List[Profile]) -> List[EmailVerification]:
+    """
+    Django can't bulk create multi-table models, so parent Token rows
+    are bulk created first and EmailVerification rows are inserted
+    by one more query.
+    """
+    verifications = [EmailVerification(profile=profile) for profile in profiles]
+    for verification in verifications:
+        verification.set_token()
+    tokens = Token.objects.bulk_create([
+        Token(
+            token=verification.token,
+            creation_date=verification.creation_date,
+            expiration_date=verification.expiration_date,
+        )
+        for verification in verifications
+    ])
+
+    qn = connection.ops.quote_name
+    meta = EmailVerification._meta
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {0} ({1}, {2}) '
+            'SELECT * FROM unnest(%s::integer[], %s::integer[])'.format(
+                qn(meta.db_table),
+                qn(meta.pk.column),
+                qn(meta.get_field('profile').column),
+            ),
+            [[token.pk for token in tokens],
+                [profile.pk for profile in profiles]],
+        )
+    for verification, token in zip(verifications, tokens):
+        verification.id = verification.token_ptr_id = token.pk
+        verification._state.adding = False
+    return verifications
+
+
+def insert_profiles(profiles: List[Profile], send_emails: bool = True):
+    """
+    Insert profiles with rows every profile must have (see Profile.save)
+    and queue confirmation letters in one transaction.
+    """
+    if not profiles:
+        return
+    with transaction.atomic():
+        Profile.objects.bulk_create(profiles)
+        bulk_create_verifications(profiles)
+        PrivacySettings.objects.bulk_create(
+            [PrivacySettings(profile=profile) for profile in profiles])
+        if send_emails:
+            queue_mass_mail(get_confirmation_mail(profile)
+                for profile in profiles)
+
+
+def import_chunk(rows: List[Tuple[int, dict]], pool=None,
+    send_emails: bool = True) -> Tuple[int, List[dict]]:
+    """Import rows, return number of created users and errors of rows"""
+    errors = []
+    profiles = {}
+    # Usernames can't contain '@', so they never collide with emails
+    seen = set()
+    for line, data in rows:
+        try:
+            profile = build_profile(data)
+        except ValidationError as e:
+            errors.append({'line': line, 'errors': e.messages})
+            continue
+        keys = {profile.username.upper(), profile.email.upper()}
+        if keys & seen:
+            errors.append({'line': line, 'errors': [
+                'Username or email is repeated in import.']})
+            continue
+        seen.update(keys)
+        profiles[line] = profile
+
+    def exclude_existing() -> int:
+        existing = get_existing_lines(profiles)
+        for line in existing:
+            del profiles[line]
+            errors.append({'line': line, 'errors': [
+                'User with this username or email already exists.']})
+        return len(existing)
+
+    exclude_existing()
+    hash_passwords(list(profiles.values()), pool)
+    while True:
+        try:
+            insert_profiles(list(profiles.values()), send_emails)
+            break
+        except IntegrityError:
+            # Some users registered while chunk was inserted, error
+            # isn't caused by them if they aren't found
+            if not exclude_existing():
+                raise
+
+    errors.sort(key=lambda error: error['line'])
+    return len(profiles), errors
+
+
+def import_users(rows: Iterable[Tuple[int, dict]], chunk_size: int = None,
+    processes: int = None, send_emails: bool = True) -> dict:
+    """
+    Import (line number, row) pairs (see READERS) by chunks and return
+    metrics: {'created': ..., 'failed': ..., 'chunks': ...,
+    'duration': seconds, 'errors': [{'line': ..., 'errors': [...]}]}.
+    Invalid rows and rows of existing users are reported and skipped.
+
+     Args:
+       processes - number of processes hashing passwords, 1 means
+                   hashing in current process.
+    """
+    chunk_size = chunk_size or settings.USERS_IMPORT_CHUNK_SIZE
+    processes = processes or settings.USERS_IMPORT_PROCESSES
+    started = time.monotonic()
+    metrics = {'created': 0, 'failed': 0, 'chunks': 0}
+    errors = []
+
+    rows = iter(rows)
+    executor = ProcessPoolExecutor(processes) if processes != 1 else nullcontext()
+    with executor as pool:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            created, chunk_errors = import_chunk(chunk, pool, send_emails)
+            metrics['created'] += created
+            metrics['failed'] += len(chunk_errors)
+            metrics['chunks'] += 1
+            errors.extend(chunk_errors)
+
+    metrics['duration'] = round(time.monotonic() - started, 3)
+    logger.info('Users import: %s', metrics)
+    metrics['errors'] = errors
+    return metrics
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.users.utils import sync_email_confirmed
+
+
+class Command(BaseCommand):
+    help = ('Set Profile.email_confirmed for users by can_login permission '
+        'granted directly or through group. Run it after email_confirmed '
+        'column was added and after permissions were changed without '
+        'signals.')
+
+    def handle(self, *args, **options):
+        updated = sync_email_confirmed()
+        self.stdout.write(self.style.SUCCESS(f'Updated {len(updated)} users.'))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from apps.users.cleanup import cleanup_users
+
+
+class Command(BaseCommand):
+    help = ('Delete expired tokens and profiles which were never confirmed '
+        'by batches. With --loop works as background worker.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.USERS_CLEANUP_BATCH_SIZE,
+            help='Number of rows deleted in one transaction.',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help=('Repeat cleanup every USERS_CLEANUP_INTERVAL seconds '
+                'instead of exit after one run.'),
+        )
+
+    def handle(self, *args, batch_size=None, loop=False, **options):
+        try:
+            while True:
+                metrics = cleanup_users(batch_size)
+                if options['verbosity']:
+                    self.stdout.write(' '.join(
+                        f'{name}={value}' for name, value in metrics.items()))
+                if not loop:
+                    break
+                time.sleep(settings.USERS_CLEANUP_INTERVAL)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,71 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+
+from apps.users.imports import READERS, import_users
+
+
+class Command(BaseCommand):
+    help = ('Create users from CSV (username,email,password header) or '
+        'NDJSON file by chunks and queue their confirmation emails.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='File with users, "-" reads standard input.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(READERS),
+            help='Format of file, guessed from extension by default.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.USERS_IMPORT_CHUNK_SIZE,
+            help='Number of users inserted in one transaction.',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.USERS_IMPORT_PROCESSES,
+            help='Number of processes hashing passwords, CPUs by default.',
+        )
+        parser.add_argument(
+            '--no-email',
+            action='store_true',
+            help='Don\'t queue confirmation emails.',
+        )
+
+    def handle(self, path, format=None, chunk_size=None, processes=None,
+        no_email=False, **options):
+        if format is None:
+            format = path.rsplit('.', 1)[-1].lower()
+            if format not in READERS:
+                raise CommandError(
+                    'Unknown format of file, pass it by --format.')
+
+        if path == '-':
+            metrics = self._import(sys.stdin, format, chunk_size, processes,
+                no_email)
+        else:
+            with open(path, encoding='utf-8', newline='') as file:
+                metrics = self._import(file, format, chunk_size, processes,
+                    no_email)
+
+        errors = metrics.pop('errors')
+        if options['verbosity']:
+            for error in errors:
+                self.stderr.write(
+                    f'Line {error["line"]}: {" ".join(error["errors"])}')
+            self.stdout.write(' '.join(
+                f'{name}={value}' for name, value in metrics.items()))
+
+    def _import(self, file, format, chunk_size, processes, no_email):
+        return import_users(
+            READERS[format](file),
+            chunk_size=chunk_size,
+            processes=processes,
+            send_emails=not no_email,
+        )
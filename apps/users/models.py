@@ -1,21 +1,26 @@
 from datetime import timedelta
 
 from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.postgres.indexes import HashIndex
 from django.core.validators import EmailValidator
+from django.db.models.fields.files import FieldFile
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
 
+from apps.core.images import RenditionImageField
+from apps.core.indexes import UpperIndex
 from .validators import UsernameRegexValidator, image_size_validator
 from .managers import ProfileManager
-from .utils import generate_token
+from .tokens import make_signed_token, check_signed_token
 
 
 def user_directory_upload(instance, filename):
-    return 'users_avatars/{0}/{1}'.format(instance.username, filename)
+    # Storage replaces filename with hash of content
+    return 'users_avatars/{0}'.format(filename)
 
 
 class Profile(AbstractUser):
-    avatar_image = models.ImageField(
+    avatar_image = RenditionImageField(
         upload_to=user_directory_upload,
         blank=True,
         default='users_avatars/default_user_avatar.png',
@@ -38,29 +43,110 @@ class Profile(AbstractUser):
         unique=True,
     )
 
+    # Denormalized presence of 'can_login' permission in user_permissions
+    # or permissions of groups, kept in sync by signals and filled for
+    # existing users by `manage.py backfill_email_confirmed`.
+    email_confirmed = models.BooleanField(
+        default=False,
+        editable=False,
+    )
+
     objects = ProfileManager()
 
+    class Meta(AbstractUser.Meta):
+        # Users are looked up by case-insensitive username or email
+        indexes = [
+            UpperIndex(fields=['username'], name='profile_username_upper_idx'),
+            UpperIndex(fields=['email'], name='profile_email_upper_idx'),
+            # Unconfirmed profiles are deleted by date of registration
+            # (see apps.users.cleanup)
+            models.Index(
+                fields=['date_joined'],
+                name='profile_unconfirmed_idx',
+                condition=models.Q(email_confirmed=False),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_loaded_values()
+
     def save(self, **kwargs):
-        super().save(**kwargs)
+        """
+        New profile is created in one transaction with its related rows.
+        Existing profile updates only fields changed since it was
+        loaded, unless update_fields is passed.
+        """
+        if self._state.adding:
+            with transaction.atomic():
+                super().save(**kwargs)
+                self._provision()
+        else:
+            if (kwargs.get('update_fields') is None
+                    and not kwargs.get('force_insert')
+                    and hasattr(self, '_loaded_values')):
+                kwargs['update_fields'] = self.get_changed_fields()
+            super().save(**kwargs)
+        self._remember_loaded_values()
+
+    def _provision(self):
+        """Create rows every new profile must have"""
+        # Token is multi-table model, so it can't be bulk created
+        self.email_verification = EmailVerification.objects.create(
+            profile=self)
+        self.privacy_settings = PrivacySettings.objects.bulk_create(
+            [PrivacySettings(profile=self)])[0]
+
+    def _get_field_value(self, field):
+        value = self.__dict__[field.attname]
+        if isinstance(value, FieldFile):
+            # New file must be saved even if it has the same name
+            return value.name if value._committed else value
+        return value
+
+    def _remember_loaded_values(self):
+        self._loaded_values = {
+            field.attname: self._get_field_value(field)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
 
-        # When profile creates in first time
-        if not EmailVerification.objects.filter(profile=self):
-            EmailVerification(profile=self).save()
+    def get_changed_fields(self) -> list:
+        """Return names of fields changed since profile was loaded"""
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname in self.__dict__
+            and (field.attname not in self._loaded_values
+                or self._loaded_values[field.attname]
+                    != self._get_field_value(field))
+        ]
 
     def __str__(self):
         return self.email
     
     def is_email_confirmed(self):
-        try:
-            self.email_verification
-            return False
-        except EmailVerification.DoesNotExist:
-            return True
+        return self.email_confirmed
+
+    def can_login(self) -> bool:
+        """
+        Same as has_perm('users.can_login') for permission granted
+        directly or through group, but without database queries.
+        """
+        return self.is_active and (self.is_superuser or self.email_confirmed)
     
     def get_active_chats(self):
         """Return queryset of chats with specific Profile"""
         from ..chats.models import Chat
-        return Chat.objects.filter(members__contains=[self.id])
+        return Chat.objects.filter(
+            memberships__profile_id=self.id
+        ).order_by('memberships__joined_at')
 
 
 class Token(models.Model):
@@ -69,26 +155,57 @@ class Token(models.Model):
     by email using unique token.
 
      Attrs:
-       token - token which determine
+       token - signed token (see apps.users.tokens) which contains
+               its expiration date, so expired and forged tokens are
+               rejected before database lookup.
        creation_date - date when model was created
        expiration_date - date when the token will cease to be valid
     """
 
+    # Tokens are looked up only by equality, so hash index is used:
+    # it stores 4-byte hash codes instead of whole 140-char values.
     token = models.SlugField(
-        unique=True,
         max_length=140,
         blank=True,
     )
 
     creation_date = models.DateTimeField()
     expiration_date = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            HashIndex(fields=['token'], name='token_hash_idx'),
+            # Expired tokens are deleted in this order
+            models.Index(
+                fields=['expiration_date'],
+                name='token_expiration_idx',
+            ),
+        ]
     
     def save(self, **kwargs):
-        self.token = generate_token(140)
-        self.creation_date = timezone.now()
-        self.expiration_date = timezone.now() + timedelta(hours=1)
+        self.set_token()
         return super().save(**kwargs)
 
+    def set_token(self):
+        """Fill token, creation_date and expiration_date with new values"""
+        self.creation_date = timezone.now()
+        self.expiration_date = self.creation_date + timedelta(hours=1)
+        self.token = make_signed_token(
+            self.get_token_salt(), self.expiration_date)
+
+    @classmethod
+    def get_token_salt(cls) -> str:
+        """Tokens of different models can't be used interchangeably"""
+        return cls._meta.label
+
+    @classmethod
+    def check_token(cls, token: str):
+        """
+        Validate token signature and lifetime without database
+        lookup, raise apps.users.tokens.BadToken if it's invalid.
+        """
+        check_signed_token(token, cls.get_token_salt())
+
     def refresh(self):
         """
         Refresh data in model such as token, creation_date, expiration_date
@@ -1,9 +1,140 @@
-from django.dispatch import receiver, Signal
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.contrib.auth.models import Group, Permission
+from rest_framework.authtoken.models import Token
+from django.dispatch import receiver
 
-post_create_user = Signal()
 
+def invalidate_permissions_cache(user_ids):
+    from ..cache import permissions_cache
+    permissions_cache.invalidate(user_ids)
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def clear_permission_id_cache(sender, **kwargs):
+    from ..utils import get_can_login_permission_id
+    get_can_login_permission_id.cache_clear()
+
+
+@receiver(post_save)
+def invalidate_profile_permissions(sender, instance, update_fields=None,
+    **kwargs):
+    """Superusers and inactive users have different permission sets"""
+    from ..models import Profile
+    if sender is not Profile:
+        return
+    if update_fields is None or {'is_active', 'is_superuser'} & set(update_fields):
+        invalidate_permissions_cache([instance.pk])
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """Saving covers password changes as well"""
+    from ..models import Profile
+    from ..cache import user_cache
+    if sender is Profile:
+        user_cache.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_token_cache(sender, instance, **kwargs):
+    from ..cache import token_cache
+    token_cache.invalidate([instance.key])
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_group_permissions(sender, instance, **kwargs):
+    # Members are unknown after group is deleted
+    instance._member_ids = list(instance.user_set.values_list('pk', flat=True))
+    invalidate_permissions_cache(instance._member_ids)
+
+
+@receiver(post_delete, sender=Group)
+def sync_group_members(sender, instance, **kwargs):
+    from ..utils import sync_email_confirmed
+    sync_email_confirmed(instance.__dict__.pop('_member_ids', []))
+
+
+@receiver(m2m_changed)
+def on_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidate cached permission sets of affected users and keep
+    Profile.email_confirmed in sync with 'can_login' permission
+    granted directly or through group.
+    """
+    from ..utils import sync_email_confirmed
+    from ..models import Profile
+    if action not in ('pre_clear', 'post_add', 'post_remove', 'post_clear'):
+        return
+
+    if sender is Profile.user_permissions.through:
+        if action == 'pre_clear':
+            if reverse:
+                invalidate_permissions_cache(
+                    instance.user_set.values_list('pk', flat=True))
+            return
+        user_ids = pk_set if reverse else [instance.pk]
+        invalidate_permissions_cache(user_ids or [])
+        _sync_email_confirmed(instance, action, reverse, pk_set)
+
+    elif sender is Profile.groups.through:
+        if reverse:
+            if action == 'pre_clear':
+                # Members are unknown after clear
+                instance._member_ids = list(
+                    instance.user_set.values_list('pk', flat=True))
+                user_ids = instance._member_ids
+            elif action == 'post_clear':
+                user_ids = instance.__dict__.pop('_member_ids', [])
+            else:
+                user_ids = pk_set or []
+        else:
+            user_ids = [instance.pk]
+        invalidate_permissions_cache(user_ids)
+        if action != 'pre_clear':
+            changed = sync_email_confirmed(user_ids)
+            if not reverse:
+                instance.email_confirmed = changed.get(
+                    instance.pk, instance.email_confirmed)
+
+    elif sender is Group.permissions.through:
+        if reverse:
+            if action == 'pre_clear':
+                instance._group_ids = list(
+                    instance.group_set.values_list('pk', flat=True))
+                groups = instance._group_ids
+            elif action == 'post_clear':
+                groups = instance.__dict__.pop('_group_ids', [])
+            else:
+                groups = pk_set or []
+        else:
+            groups = [instance.pk]
+        user_ids = list(Profile.objects.filter(
+            groups__in=list(groups)).values_list('pk', flat=True))
+        invalidate_permissions_cache(user_ids)
+        if action != 'pre_clear':
+            sync_email_confirmed(user_ids)
+
+
+def _sync_email_confirmed(instance, action, reverse, pk_set):
+    from ..utils import get_can_login_permission_id, sync_email_confirmed
+    try:
+        permission_id = get_can_login_permission_id()
+    except Permission.DoesNotExist:
+        return
+
+    if reverse:
+        if instance.pk != permission_id:
+            return
+        sync_email_confirmed(None if action == 'post_clear' else pk_set)
+    elif action == 'post_clear' or permission_id in pk_set:
+        # User can still have permission through group
+        changed = sync_email_confirmed([instance.pk])
+        if action == 'post_add':
+            instance.email_confirmed = True
+        else:
+            instance.email_confirmed = changed.get(
+                instance.pk, instance.email_confirmed)
 
-@receiver(post_create_user)
-def callback(sender, **kwargs):
-    from ..models import PrivacySettings
-    PrivacySettings.objects.create(profile=sender)
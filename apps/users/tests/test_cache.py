@@ -0,0 +1,62 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+
+from ..backends import EmailOrUsernameLoginBackend
+from ..cache import user_cache
+from ..models import Profile
+
+
+class TestUserCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u = Profile.objects.create_user(
+            username='user001',
+            email='email@mail.com',
+            password='hardpwd123'
+        )
+
+    def setUp(self):
+        self.backend = EmailOrUsernameLoginBackend()
+        user_cache.clear()
+
+    def test_get_user(self):
+        with self.assertNumQueries(1):
+            user = self.backend.get_user(self.u.pk)
+        with self.assertNumQueries(0):
+            cached_user = self.backend.get_user(self.u.pk)
+
+        self.assertEqual(user, self.u)
+        self.assertEqual(cached_user.username, 'user001')
+        # Every call returns new instance
+        self.assertIsNot(user, cached_user)
+        user.username = 'changed'
+        self.assertEqual(self.backend.get_user(self.u.pk).username, 'user001')
+
+        self.assertIsNone(self.backend.get_user(100500))
+
+    def test_invalidation(self):
+        self.backend.get_user(self.u.pk)
+
+        self.u.set_password('newPassword123')
+        self.u.save()
+        user = self.backend.get_user(self.u.pk)
+        self.assertTrue(user.check_password('newPassword123'))
+        self.assertEqual(
+            user.get_session_auth_hash(), self.u.get_session_auth_hash())
+
+        user_id = self.u.pk
+        Profile.objects.get(pk=user_id).delete()
+        self.assertIsNone(self.backend.get_user(user_id))
+
+    @override_settings(USERS_CACHE_ALIAS='default')
+    def test_shared_cache(self):
+        self.backend.get_user(self.u.pk)
+
+        # Another process has empty local cache
+        user_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.get_user(self.u.pk), self.u)
+
+        self.u.first_name = 'Name'
+        self.u.save()
+        self.assertIsNone(cache.get(user_cache.get_key(self.u.pk)))
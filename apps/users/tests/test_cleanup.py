@@ -0,0 +1,93 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
+from django.utils import timezone
+from django.test import TestCase
+
+from ..cleanup import cleanup_users
+from ..models import Profile, Token, EmailVerification, PasswordRecovery
+
+
+class TestCleanupUsers(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        long_ago = timezone.now() - timedelta(days=30)
+        cls.profiles = {}
+        for name in ('stale', 'new', 'confirmed', 'logged_in', 'admin',
+                'granted', 'group_granted', 'verified'):
+            cls.profiles[name] = Profile.objects.create_user(
+                username=name,
+                email=f'{name}@mail.com',
+                password='hardpwd123',
+            )
+        Profile.objects.exclude(username='new').update(date_joined=long_ago)
+        Profile.objects.filter(username='confirmed').update(
+            email_confirmed=True)
+        Profile.objects.filter(username='logged_in').update(
+            last_login=long_ago)
+        Profile.objects.filter(username='admin').update(is_superuser=True)
+
+        # Confirmed before email_confirmed column was filled
+        permission = Permission.objects.create(
+            codename='can_login',
+            name='Can login to site',
+            content_type=ContentType.objects.get_for_model(Profile),
+        )
+        group = Group.objects.create(name='confirmed')
+        group.permissions.add(permission)
+        cls.profiles['granted'].user_permissions.add(permission)
+        cls.profiles['group_granted'].groups.add(group)
+        EmailVerification.objects.filter(
+            profile=cls.profiles['verified']).delete()
+        Profile.objects.filter(
+            username__in=['granted', 'group_granted', 'verified'],
+        ).update(email_confirmed=False)
+
+        PasswordRecovery.objects.create(profile=cls.profiles['confirmed'])
+        PasswordRecovery.objects.create(profile=cls.profiles['logged_in'])
+        Token.objects.filter(
+            passwordrecovery__profile=cls.profiles['confirmed'],
+        ).update(expiration_date=long_ago)
+        Token.objects.filter(
+            emailverification__profile__username__in=['confirmed', 'new'],
+        ).update(expiration_date=long_ago)
+
+    def test_cleanup(self):
+        metrics = cleanup_users(batch_size=1)
+        self.assertEqual(metrics['profiles'], 1)
+        self.assertEqual(metrics['password_recoveries'], 1)
+        self.assertEqual(metrics['email_verifications'], 1)
+        self.assertEqual(metrics['batches'], 3)
+
+        self.assertEqual(
+            set(Profile.objects.values_list('username', flat=True)),
+            {'new', 'confirmed', 'logged_in', 'admin', 'granted',
+                'group_granted', 'verified'},
+        )
+        self.assertEqual(
+            list(PasswordRecovery.objects.values_list(
+                'profile__username', flat=True)),
+            ['logged_in'],
+        )
+        # Expired verification is kept for resending until profile is deleted
+        self.assertTrue(EmailVerification.objects.filter(
+            profile=self.profiles['new']).exists())
+        self.assertFalse(EmailVerification.objects.filter(
+            profile=self.profiles['confirmed']).exists())
+        # Parent rows of deleted tokens are deleted too
+        self.assertEqual(
+            Token.objects.count(),
+            EmailVerification.objects.count()
+            + PasswordRecovery.objects.count(),
+        )
+
+        self.assertEqual(cleanup_users()['batches'], 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('cleanup_users', stdout=out)
+        self.assertIn('profiles=1', out.getvalue())
+        self.assertIn('duration=', out.getvalue())
@@ -1,6 +1,7 @@
-from django.test import TestCase
+from django.test import TestCase, RequestFactory
+from django.db import connection
 
-from ..forms import AskEmailForm, PasswordResetForm
+from ..forms import AskEmailForm, PasswordResetForm, UserLoginForm
 from ..models import Profile
 
 
@@ -87,3 +88,46 @@ class TestPasswordResetForm(TestCase):
 
         self.assertFalse(self.u.check_password('hardpwd123'))
         self.assertTrue(self.u.check_password('goodPwd345'))
+
+
+class TestUserLoginForm(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u = Profile.objects.create_user(
+            username='TempUser',
+            email='TempMail@mail.co',
+            password='hardpwd123',
+        )
+
+    def test_single_lookup(self):
+        """
+        Test that username is validated and authenticated
+        with one case-insensitive query
+        """
+        for username in ['tempuser', 'tempmail@MAIL.CO']:
+            request = RequestFactory().post('/')
+            f = UserLoginForm(request, data={
+                'username': username,
+                'password': 'hardpwd123',
+            })
+            with self.assertNumQueries(1):
+                self.assertTrue(f.is_valid())
+            self.assertEqual(f.get_user(), self.u)
+
+    def test_unknown_user(self):
+        f = UserLoginForm(RequestFactory().post('/'), data={
+            'username': 'unknown',
+            'password': 'hardpwd123',
+        })
+        self.assertFalse(f.is_valid())
+        self.assertIn('User with this username doesn\'t exist.',
+            f.errors['username'])
+
+    def test_lookup_uses_index(self):
+        # Table is tiny, so planner must be forced to use indexes
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        self.assertIn('profile_email_upper_idx', Profile.objects.filter(
+            email__iexact='x@mail.co').explain())
+        self.assertIn('profile_username_upper_idx', Profile.objects.filter(
+            username__iexact='x').explain())
@@ -0,0 +1,132 @@
+from unittest import mock
+from io import StringIO
+import tempfile
+import json
+import os
+
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase
+
+from apps.core.models import OutgoingEmail
+from .. import imports
+from ..imports import import_users, read_csv, read_ndjson
+from ..models import Profile, EmailVerification, PrivacySettings
+
+
+class TestImportUsers(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Profile.objects.create_user(
+            username='existing',
+            email='existing@mail.com',
+            password='hardpwd123',
+        )
+
+    def test_readers(self):
+        self.assertEqual(list(read_csv([
+            'username,email,password\n',
+            'user1,user1@mail.com,hardpwd123\n',
+        ])), [(2, {
+            'username': 'user1',
+            'email': 'user1@mail.com',
+            'password': 'hardpwd123',
+        })])
+        self.assertEqual(list(read_ndjson([
+            '{"username": "user1", "email": "user1@mail.com"}\n',
+            '\n',
+            'not json\n',
+        ])), [(1, {'username': 'user1', 'email': 'user1@mail.com'}), (3, None)])
+
+    def test_import(self):
+        rows = read_ndjson([
+            json.dumps({'username': 'user1', 'email': 'user1@mail.com',
+                'password': 'hardpwd123'}),
+            json.dumps({'username': 'user2', 'email': 'user2@mail.com'}),
+            json.dumps({'username': 'user3', 'email': 'user3@mail.com'}),
+            json.dumps({'username': 'EXISTING', 'email': 'new@mail.com'}),
+            json.dumps({'username': 'user4', 'email': 'USER1@mail.com'}),
+            json.dumps({'username': 'bad*name', 'email': 'bad'}),
+            json.dumps({'username': 'user5', 'email': 'user5@mail.com',
+                'password': '123'}),
+            '[]',
+        ])
+        # Lookup of existing users in both chunks, then 5 inserts
+        # of first chunk in savepoint; nothing is left in second chunk
+        with self.assertNumQueries(2 + 7):
+            metrics = import_users(rows, chunk_size=4, processes=1)
+
+        self.assertEqual(metrics['created'], 3)
+        self.assertEqual(metrics['failed'], 5)
+        self.assertEqual(metrics['chunks'], 2)
+        self.assertEqual([error['line'] for error in metrics['errors']],
+            [4, 5, 6, 7, 8])
+
+        users = Profile.objects.filter(username__in=['user1', 'user2', 'user3'])
+        self.assertEqual(users.count(), 3)
+        self.assertTrue(users.get(username='user1').check_password('hardpwd123'))
+        self.assertFalse(users.get(username='user2').has_usable_password())
+        self.assertEqual(
+            EmailVerification.objects.filter(profile__in=users).count(), 3)
+        self.assertEqual(
+            PrivacySettings.objects.filter(profile__in=users).count(), 3)
+
+        verification = EmailVerification.objects.get(profile__username='user1')
+        EmailVerification.check_token(verification.token)
+        email = OutgoingEmail.objects.get(recipients=['user1@mail.com'])
+        self.assertIn(verification.token, email.html_body)
+        self.assertEqual(OutgoingEmail.objects.count(), 3)
+
+    def test_concurrent_registrations(self):
+        insert_profiles = imports.insert_profiles
+        racers = iter(['user1', 'user2'])
+
+        def register_and_insert(profiles, send_emails=True):
+            # Users are registered while chunk is inserted, twice
+            username = next(racers, None)
+            if username is not None:
+                Profile.objects.create_user(
+                    username=username,
+                    email=f'{username}@other.com',
+                    password='hardpwd123',
+                )
+                raise IntegrityError()
+            insert_profiles(profiles, send_emails)
+
+        with mock.patch.object(imports, 'insert_profiles', register_and_insert):
+            metrics = import_users(read_csv([
+                'username,email\n',
+                'user1,user1@mail.com\n',
+                'user2,user2@mail.com\n',
+                'user3,user3@mail.com\n',
+            ]), processes=1)
+
+        self.assertEqual(metrics['created'], 1)
+        self.assertEqual([error['line'] for error in metrics['errors']], [2, 3])
+        self.assertTrue(Profile.objects.filter(email='user3@mail.com').exists())
+
+    def test_password_hashing_pool(self):
+        metrics = import_users(read_csv([
+            'username,email,password\n',
+            'user1,user1@mail.com,hardpwd123\n',
+            'user2,user2@mail.com,hardpwd456\n',
+        ]), processes=2, send_emails=False)
+
+        self.assertEqual(metrics['created'], 2)
+        self.assertTrue(Profile.objects.get(username='user2')
+            .check_password('hardpwd456'))
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write('username,email\nuser1,user1@mail.com\n'
+                'existing,existing2@mail.com\n')
+        self.addCleanup(os.remove, file.name)
+
+        out, err = StringIO(), StringIO()
+        call_command('import_users', file.name, processes=1, stdout=out,
+            stderr=err)
+
+        self.assertIn('created=1 failed=1 chunks=1', out.getvalue())
+        self.assertIn('Line 3:', err.getvalue())
+        self.assertTrue(Profile.objects.filter(username='user1').exists())
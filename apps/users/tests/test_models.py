@@ -1,12 +1,17 @@
+from io import StringIO
 from time import sleep
 
 from django.contrib.contenttypes.models import ContentType
 from django.core.validators import ValidationError
-from django.contrib.auth.models import Permission
+from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
 from django.db import IntegrityError, transaction
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-from ..models import Profile, PasswordRecovery, Token, PrivacySettings
+from ..models import (Profile, PasswordRecovery, Token, PrivacySettings,
+    EmailVerification)
+from ..cache import permissions_cache
+from ..tokens import BadToken
 
 
 class TestProfileModel(TestCase):
@@ -81,8 +86,9 @@ class TestProfileModel(TestCase):
         ev = self.u.email_verification
         token = ev.token
 
-        self.assertEqual(len(token), 140)
+        self.assertLessEqual(len(token), 140)
         self.assertLess(ev.creation_date, ev.expiration_date)
+        EmailVerification.check_token(token)
 
         ev.refresh()
         self.assertNotEqual(ev.token, token)
@@ -103,6 +109,40 @@ class TestProfileModel(TestCase):
         self.u.user_permissions.add(self.can_login_perm)
         self.assertIn(self.can_login_perm, self.u.user_permissions.all())    
 
+    def test_related_rows_created_once(self):
+        u = Profile.objects.create_user(
+            username='user335',
+            password='hardpwd123',
+            email='mail2@gmail.com'
+        )
+        self.assertTrue(EmailVerification.objects.filter(profile=u).exists())
+        self.assertTrue(PrivacySettings.objects.filter(profile=u).exists())
+
+        # Confirmed profile doesn't need verification anymore
+        EmailVerification.objects.filter(profile=u).delete()
+        u = Profile.objects.get(pk=u.pk)
+        u.first_name = 'Name'
+        u.save()
+        self.assertFalse(EmailVerification.objects.filter(profile=u).exists())
+
+    def test_save_updates_changed_fields(self):
+        u = Profile.objects.get(pk=self.u.pk)
+        with self.assertNumQueries(0):
+            u.save()
+
+        u.first_name = 'Name'
+        with self.assertNumQueries(1) as context:
+            u.save()
+        sql = context.captured_queries[0]['sql']
+        self.assertTrue(sql.startswith('UPDATE'))
+        self.assertIn('"first_name"', sql)
+        self.assertNotIn('"username"', sql)
+        self.assertEqual(Profile.objects.get(pk=u.pk).first_name, 'Name')
+
+        # Nothing changed since last save
+        with self.assertNumQueries(0):
+            u.save()
+
 
         
 class TestPasswordRecoveryModel(TestCase):
@@ -129,8 +169,9 @@ class TestTokenModel(TestCase):
         """
         t = Token.objects.create()
 
-        self.assertEqual(len(t.token), 140)
+        self.assertLessEqual(len(t.token), 140)
         self.assertLess(t.creation_date, t.expiration_date)
+        Token.check_token(t.token)
 
         old_token = t.token
         old_creation_date = t.creation_date
@@ -147,6 +188,14 @@ class TestTokenModel(TestCase):
         self.assertNotEqual(old_creation_date, t.creation_date)
         self.assertNotEqual(old_expiration_date, t.expiration_date)
 
+    def test_token_salt(self):
+        """
+        Check that token of one model isn't valid for another one
+        """
+        t = Token.objects.create()
+        with self.assertRaises(BadToken):
+            PasswordRecovery.check_token(t.token)
+
 
 class TestPrivacySettingsModel(TestCase):
     @classmethod
@@ -176,3 +225,122 @@ class TestPrivacySettingsModel(TestCase):
         self.assertEqual(len(PrivacySettings.objects.all()), 0)
         with self.assertRaises(PrivacySettings.DoesNotExist):
             PrivacySettings.objects.get(profile=self.u)
+
+
+class TestLoginPermission(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.u = Profile.objects.create_user(
+            username='user001',
+            email='email@mail.com',
+            password='hardpwd123'
+        )
+        cls.can_login_perm = Permission.objects.create(
+            codename='can_login',
+            name='Can login to site',
+            content_type=ContentType.objects.get_for_model(Profile),
+        )
+
+    def test_email_confirmed_sync(self):
+        self.assertFalse(self.u.can_login())
+
+        self.u.user_permissions.add(self.can_login_perm)
+        self.assertTrue(self.u.email_confirmed)
+        self.assertTrue(Profile.objects.get(pk=self.u.pk).can_login())
+
+        self.u.user_permissions.remove(self.can_login_perm)
+        self.assertFalse(Profile.objects.get(pk=self.u.pk).email_confirmed)
+
+        self.can_login_perm.user_set.add(self.u)
+        self.assertTrue(Profile.objects.get(pk=self.u.pk).email_confirmed)
+
+        self.can_login_perm.user_set.clear()
+        self.assertFalse(Profile.objects.get(pk=self.u.pk).email_confirmed)
+
+    def test_email_confirmed_sync_with_groups(self):
+        group = Group.objects.create(name='confirmed')
+        group.permissions.add(self.can_login_perm)
+        u = Profile.objects.get(pk=self.u.pk)
+
+        u.groups.add(group)
+        self.assertTrue(u.email_confirmed)
+        self.assertTrue(Profile.objects.get(pk=u.pk).can_login())
+
+        # Direct permission is removed, but group still grants it
+        u.user_permissions.add(self.can_login_perm)
+        u.user_permissions.remove(self.can_login_perm)
+        self.assertTrue(Profile.objects.get(pk=u.pk).email_confirmed)
+
+        group.permissions.remove(self.can_login_perm)
+        self.assertFalse(Profile.objects.get(pk=u.pk).email_confirmed)
+
+        self.can_login_perm.group_set.add(group)
+        self.assertTrue(Profile.objects.get(pk=u.pk).email_confirmed)
+
+        group.user_set.clear()
+        self.assertFalse(Profile.objects.get(pk=u.pk).email_confirmed)
+
+        group.user_set.add(u)
+        self.assertTrue(Profile.objects.get(pk=u.pk).email_confirmed)
+        group.delete()
+        self.assertFalse(Profile.objects.get(pk=u.pk).email_confirmed)
+
+    def test_backfill_command(self):
+        group = Group.objects.create(name='confirmed')
+        group.permissions.add(self.can_login_perm)
+        u2 = Profile.objects.create_user(
+            username='user002',
+            email='email2@mail.com',
+            password='hardpwd123'
+        )
+        u1 = Profile.objects.get(pk=self.u.pk)
+        u1.user_permissions.add(self.can_login_perm)
+        u2.groups.add(group)
+        # Rows which existed before email_confirmed column was added
+        Profile.objects.update(email_confirmed=False)
+
+        call_command('backfill_email_confirmed', stdout=StringIO())
+        self.assertTrue(Profile.objects.get(pk=u1.pk).can_login())
+        self.assertTrue(Profile.objects.get(pk=u2.pk).can_login())
+
+    def test_permissions_cache(self):
+        self.assertFalse(self.u.has_perm('users.can_login'))
+
+        # Permissions are loaded from cache
+        user = Profile.objects.get(pk=self.u.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(user.has_perm('users.can_login'))
+
+        # Cache is invalidated when permissions are changed
+        self.u.user_permissions.add(self.can_login_perm)
+        user = Profile.objects.get(pk=self.u.pk)
+        self.assertTrue(user.has_perm('users.can_login'))
+
+        group = Group.objects.create(name='group')
+        group.permissions.add(Permission.objects.get(codename='add_profile'))
+        self.u.groups.add(group)
+        user = Profile.objects.get(pk=self.u.pk)
+        self.assertTrue(user.has_perm('users.add_profile'))
+
+        group.permissions.clear()
+        user = Profile.objects.get(pk=self.u.pk)
+        self.assertFalse(user.has_perm('users.add_profile'))
+
+    @override_settings(USERS_CACHE_ALIAS='default')
+    def test_permissions_shared_cache(self):
+        # Entries of other tests aren't rolled back
+        permissions_cache.invalidate([self.u.pk])
+        self.assertFalse(
+            Profile.objects.get(pk=self.u.pk).has_perm('users.can_login'))
+
+        # Other process has no local entry, but finds shared one
+        permissions_cache.clear()
+        user = Profile.objects.get(pk=self.u.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(user.has_perm('users.can_login'))
+
+        # Invalidation of shared entry is seen by other processes
+        self.u.user_permissions.add(self.can_login_perm)
+        permissions_cache.clear()
+        user = Profile.objects.get(pk=self.u.pk)
+        self.assertTrue(user.has_perm('users.can_login'))
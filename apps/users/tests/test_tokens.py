@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from ..tokens import (BadToken, TokenExpired, make_signed_token,
+    check_signed_token)
+
+
+class TestTokens(SimpleTestCase):
+    def test_signed_token(self):
+        expires = timezone.now() + timedelta(hours=1)
+        token = make_signed_token('salt', expires)
+
+        self.assertRegex(token, r'^[-\w]+$')
+        self.assertEqual(
+            check_signed_token(token, 'salt'),
+            expires.replace(microsecond=0),
+        )
+
+    def test_invalid_tokens(self):
+        expires = timezone.now() + timedelta(hours=1)
+        token = make_signed_token('salt', expires)
+        timestamp, random, signature = token.split('-')
+        forged_expires = make_signed_token(
+            'salt', expires + timedelta(days=1)).split('-')[0]
+
+        for invalid in [
+            '',
+            'invalid_token',
+            token[:-1],
+            f'{forged_expires}-{random}-{signature}',
+            f'zzzzzzzzzzzzzzz-{random}-{signature}',
+        ]:
+            with self.assertRaises(BadToken):
+                check_signed_token(invalid, 'salt')
+
+        # Token signed with another salt
+        with self.assertRaises(BadToken):
+            check_signed_token(token, 'another salt')
+
+    def test_expired_token(self):
+        token = make_signed_token('salt', timezone.now() - timedelta(seconds=1))
+        with self.assertRaises(TokenExpired):
+            check_signed_token(token, 'salt')
@@ -12,6 +12,7 @@ from ..models import Profile, EmailVerification, PasswordRecovery
 from .. import views
 from ..utils import force_confirm_email
 from apps.chats.models import Chat
+from apps.core.mail import send_queued_mail
 
 
 class TestLoginView(TestCase):
@@ -176,7 +177,8 @@ class TestRegistrationView(TestCase):
         )
 
         # Check for sent email.
-        
+        self.assertEqual(len(mail.outbox), 0)
+        send_queued_mail()
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn('Follow this link to confirm your email address:', mail.outbox[0].body)
         
@@ -463,6 +465,7 @@ class TestAskEmailPasswordRecoveryView(TestCase):
         self.assertEqual(response.resolver_match.func.view_class, views.AskEmailForPasswordRecoveryView)
 
         # check that the email message was sent
+        send_queued_mail()
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn('Follow this link to continue password recovery', mail.outbox[0].body)
 
@@ -702,14 +705,14 @@ class TestProfileView(TestCase):
             owner=cls.u,
             label='Chat 1',
             name='chat1',
-            members=[cls.u.id]
         )
+        cls.c1.add_member_by_id(cls.u.id)
         cls.c2 = Chat.objects.create(
             owner=cls.u,
             label='Chat 2',
             name='chat2',
-            members=[cls.u.id]
         )
+        cls.c2.add_member_by_id(cls.u.id)
 
     def test_fundamental_view_properties(self):
         """Testing title, templates, status code, etc."""
@@ -0,0 +1,54 @@
+"""
+Tokens which are sent to users by email (email confirmation,
+password recovery).
+
+Signed token looks like `<expires>-<random>-<signature>` where
+expires is unix timestamp in base36 and signature is HMAC of first two
+parts made with SECRET_KEY and salt specific for token purpose. So
+expired or forged token can be rejected without database lookup.
+"""
+from datetime import datetime, timezone
+import secrets
+
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import base36_to_int, int_to_base36
+
+
+class BadToken(Exception):
+    """Token is malformed or its signature is invalid"""
+
+
+class TokenExpired(BadToken):
+    """Token is signed correctly but its lifetime is over"""
+
+
+def _get_signature(value: str, salt: str) -> str:
+    return salted_hmac(salt, value, algorithm='sha256').hexdigest()
+
+
+def make_signed_token(salt: str, expires: datetime) -> str:
+    value = '{0}-{1}'.format(
+        int_to_base36(int(expires.timestamp())),
+        secrets.token_hex(20),
+    )
+    return f'{value}-{_get_signature(value, salt)}'
+
+
+def check_signed_token(token: str, salt: str) -> datetime:
+    """
+    Return expiration date of token or raise BadToken
+    (TokenExpired if token is valid but expired).
+    """
+    try:
+        timestamp, nonce, signature = token.split('-')
+        expires = datetime.fromtimestamp(
+            base36_to_int(timestamp), tz=timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise BadToken('Malformed token.')
+
+    if not constant_time_compare(
+            signature, _get_signature(f'{timestamp}-{nonce}', salt)):
+        raise BadToken('Invalid token signature.')
+    if datetime.now(tz=timezone.utc) > expires:
+        raise TokenExpired('Token expired.')
+    return expires
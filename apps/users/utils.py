@@ -1,31 +1,73 @@
-from typing import Optional
-from random import randint
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
 
 from django.template.loader import render_to_string
 from django.contrib.messages import success, error
 from django.contrib.auth.models import Permission
+from django.db.models import Q
 from django.utils.html import strip_tags
-from django.core.mail import send_mail
 from django.contrib.auth import logout
 from django.utils import timezone
 from django.conf import settings
 from django.urls import reverse
 from django.http import Http404
-from django.db.models import Q
 
+from apps.core.mail import queue_mail
+from .tokens import BadToken, TokenExpired
 
-CHARS = '1234567890qwertyuiopasdfghjklzxcvbnm'
 
-
-def _random_upper(char: str) -> str:
-    return char.upper() if randint(0, 1) else char
+@lru_cache(maxsize=None)
+def get_can_login_permission_id() -> int:
+    """
+    Return id of 'can_login' permission. It's cached for whole process
+    and cleared when any permission is saved or deleted.
+    """
+    return Permission.objects.values_list('pk', flat=True)\
+        .get(codename='can_login')
 
 
-def generate_token(length: int) -> str:
-    output = ''
-    for i in range(length):
-        output += _random_upper(CHARS[randint(0, len(CHARS)-1)])
-    return output
+def sync_email_confirmed(user_ids: Optional[Iterable[int]] = None) -> Dict[int, bool]:
+    """
+    Set Profile.email_confirmed of users (all by default) by presence of
+    'can_login' permission granted directly or through group. Return
+    {user_id: new value} of updated users.
+    """
+    from .models import Profile
+    from .cache import user_cache
+    try:
+        permission_id = get_can_login_permission_id()
+    except Permission.DoesNotExist:
+        return {}
+
+    profiles = Profile.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        profiles = profiles.filter(pk__in=user_ids)
+    confirmed = Profile.objects.filter(
+        Q(user_permissions=permission_id) | Q(groups__permissions=permission_id),
+    ).values('pk')
+
+    changed = {}
+    for value, mismatched in (
+            (True, profiles.filter(email_confirmed=False, pk__in=confirmed)),
+            (False, profiles.filter(email_confirmed=True)
+                .exclude(pk__in=confirmed))):
+        ids = list(mismatched.values_list('pk', flat=True))
+        if ids:
+            Profile.objects.filter(pk__in=ids).update(email_confirmed=value)
+            changed.update(dict.fromkeys(ids, value))
+    user_cache.invalidate(list(changed))
+    return changed
+
+
+def grant_login_permission(user):
+    """
+    Add 'can_login' permission to user, user.email_confirmed is updated
+    by m2m_changed signal.
+    """
+    user.user_permissions.add(get_can_login_permission_id())
 
 
 def find_user_or_404(query: str):
@@ -36,11 +78,28 @@ def find_user_or_404(query: str):
         raise Http404('Page does not exist.')
 
 
-def find_user(query: str):
+def find_user(query: str, request=None):
+    """
+    Return user with case-insensitive username or email equal to query.
+    Usernames can't contain '@', so only one indexed column is queried.
+    If request is passed, result is memoized for this request (e.g.
+    login form validates username and then backend authenticates it).
+    """
     from .models import Profile
-    return Profile.objects.get(
-        Q(username__iexact=query) | Q(email__iexact=query)
-    )
+    if request is not None:
+        found_users = request.__dict__.setdefault('_found_users', {})
+        if query not in found_users:
+            try:
+                found_users[query] = find_user(query)
+            except Profile.DoesNotExist:
+                found_users[query] = None
+        if found_users[query] is None:
+            raise Profile.DoesNotExist('Profile matching query does not exist.')
+        return found_users[query]
+
+    if '@' in query:
+        return Profile.objects.get(email__iexact=query)
+    return Profile.objects.get(username__iexact=query)
 
 
 def prepare_password_recovery(user_query: str):
@@ -97,10 +156,25 @@ def generate_password_recovery_html_email(token: str) -> str:
     )
 
 
+def get_confirmation_mail(user) -> tuple:
+    """
+    Return email verification letter of user as (subject, message,
+    from_email, recipient_list, html_message), see apps.core.mail.
+    """
+    html_message = generate_confirmation_html_email(user.email_verification.token)
+    return (
+        'Chattings: Confirm your email',
+        strip_tags(html_message),
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+        html_message,
+    )
+
+
 def perform_email_verification(user, request:Optional=None,
     update_verification=False):
     """
-    Creates EmailVerification model and send email verification letter
+    Creates EmailVerification model and queue email verification letter
 
      Args:
        user - instance of user model which email need to be
@@ -113,15 +187,7 @@ def perform_email_verification(user, request:Optional=None,
     """
     if update_verification: user.email_verification.refresh()
     
-    html_message = generate_confirmation_html_email(user.email_verification.token)
-    plain_message = strip_tags(html_message)
-    
-    send_mail(
-        subject='Chattings: Confirm your email',
-        message=plain_message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email],
-        html_message=html_message)
+    queue_mail(*get_confirmation_mail(user))
     
     if request:
         success(request, ('We sent email confirmation'
@@ -133,7 +199,7 @@ def perform_password_recovery(email, request, alert:bool=True):
     """
     Alogorithm of preparing password recovery:
     1. Generate message which will be sent to user
-    2. Send current message
+    2. Put current message to outbox
     3. Tell to user in template about successfully
        sending email.
     """
@@ -144,7 +210,7 @@ def perform_password_recovery(email, request, alert:bool=True):
         user.password_recovery.token)
     plain_message = strip_tags(html_message)
 
-    send_mail(
+    queue_mail(
         subject='Chattings: Recover your password',
         message=plain_message,
         from_email=settings.DEFAULT_FROM_EMAIL,
@@ -165,11 +231,11 @@ def force_confirm_email(token: str):
      Args:
         token - token of EmailVerification model
     """
+    from .models import EmailVerification
     try:
-        from .models import EmailVerification
-        can_login_permission = Permission.objects.get(codename='can_login')
-        verification = EmailVerification.objects.get(token=token)
-        verification.profile.user_permissions.add(can_login_permission)
+        verification = EmailVerification.objects.select_related(
+            'profile').get(token=token)
+        grant_login_permission(verification.profile)
         verification.delete()
     except EmailVerification.DoesNotExist:
         pass
@@ -182,18 +248,21 @@ def confirm_email(token: str, request):
     EmailVerification model.
     """
     from .models import EmailVerification # due to a circular import
-    can_login_permission = Permission.objects.get(codename='can_login')
     try:
-        verification = EmailVerification.objects.get(token=token)
+        EmailVerification.check_token(token)
+        verification = EmailVerification.objects.select_related(
+            'profile').get(token=token)
         # validation here
         if timezone.now() < verification.expiration_date:
-            verification.profile.user_permissions.add(can_login_permission)
+            grant_login_permission(verification.profile)
             success(request, 'Email successfully confirmed,'
                 ' now you can login.', 'email-confirmed')
             verification.delete()
         else:
             error(request, 'EmailVerification expired.', 'token-expired')
-    except EmailVerification.DoesNotExist:
+    except TokenExpired:
+        error(request, 'EmailVerification expired.', 'token-expired')
+    except (BadToken, EmailVerification.DoesNotExist):
         error(request, 'Invalid token. Make sure your'
             ' token is valid and not deleted.', 'invalid-token')
 
@@ -205,12 +274,14 @@ def recover_password(form, pwd_recovery_obj, request:Optional=None):
     2. Remove passed PasswordRecovery object;
     3. Save user model with changed data;
     """
-    # step 1
-    try:
-        from .models import EmailVerification
-        force_confirm_email(pwd_recovery_obj.profile.email_verification.token)
-    except EmailVerification.DoesNotExist:
-        pass
+    from .models import EmailVerification
+    # step 1: profile instance is shared with form, so it must be
+    # updated in place, otherwise form.save() would overwrite
+    # email_confirmed with stale value.
+    profile = pwd_recovery_obj.profile
+    if not profile.email_confirmed:
+        grant_login_permission(profile)
+        EmailVerification.objects.filter(profile=profile).delete()
     # step 2
     pwd_recovery_obj.delete()
     # step 3
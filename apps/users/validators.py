@@ -1,15 +1,17 @@
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.contrib.auth import get_user_model
-from django.db.models import Q
 
+from apps.core.uploads import validate_upload_size
 
-def username_exist_validator(val):
+
+def username_exist_validator(val, request=None):
     """
     Help to determine is exist user with specific username or email.
     """
+    from .utils import find_user
     try:
-        get_user_model().objects.get(Q(username=val) | Q(email=val))
+        find_user(val, request)
     except get_user_model().DoesNotExist:
         msg = 'User with this username doesn\'t exist.'
         if '@' in val:
@@ -19,10 +21,9 @@ def username_exist_validator(val):
 
 
 def image_size_validator(img):
-    """Help to determine size of passed image
-       and forbid it, if size > 1mb"""
-    if img.file.size > 1024 * 1024:
-        raise ValidationError('This file too large.')
+    """Help to determine size of passed image and forbid
+       it, if size > UPLOAD_MAX_SIZES['image'] (1mb)"""
+    validate_upload_size(img, 'image')
 
 
 class UsernameRegexValidator(RegexValidator):
@@ -18,11 +18,12 @@ from django.db.models import Q
 
 
 from .utils import (perform_email_verification, confirm_email,
-    find_user_or_404, find_user, perform_password_recovery, recover_password)
+    find_user_or_404, perform_password_recovery, recover_password)
 from .forms import (UserLoginForm, UserRegistrationForm, AskEmailForm,
     PasswordResetForm, PrivacySettingsForm, UserPasswordChangeForm,
     ProfileAvatarForm)
 from .models import Profile, PasswordRecovery
+from .tokens import BadToken, TokenExpired
 
 
 class UserLoginView(LoginView):
@@ -30,16 +31,17 @@ class UserLoginView(LoginView):
     redirect_authenticated_user = True
     form_class = UserLoginForm
 
-    def form_valid(self, *args, **kwargs):
-        user = find_user(self.request.POST.get('username'))
+    def form_valid(self, form):
+        # User is already found and authenticated by form
+        user = form.get_user()
         # If user don't confirm his email address
-        if not user.has_perm('users.can_login'):
+        if not user.can_login():
             error(self.request, 'Confirm your email to login.',
                 'email-not-confirmed')
             return redirect(reverse('users:login')
                 + f'?username={user.username}')
 
-        return super().form_valid(*args, **kwargs)
+        return super().form_valid(form)
     
     def get_success_url(self):
         return reverse('users:profile', kwargs={'pk': self.request.user.pk})
@@ -151,10 +153,14 @@ class PasswordResetView(FormView):
         """Return PasswordRecovery model by token"""
         self.pwd_recovery = None
         try:
-            self.pwd_recovery = PasswordRecovery.objects.get(token=token)
+            PasswordRecovery.check_token(token)
+            self.pwd_recovery = PasswordRecovery.objects.select_related(
+                'profile').get(token=token)
             if self.pwd_recovery.is_token_expired():
                 raise SuspiciousOperation('Token expired.')
-        except PasswordRecovery.DoesNotExist:
+        except TokenExpired:
+            raise SuspiciousOperation('Token expired.')
+        except (BadToken, PasswordRecovery.DoesNotExist):
             raise SuspiciousOperation('Token doesn\'t exist.')
         if self.pwd_recovery:
             return self.pwd_recovery
@@ -181,10 +187,10 @@ class ProfileView(DetailView):
     """
     template_name = 'users/profiles/profile_details.html'
     context_object_name = 'profile'
-    model = Profile
+    queryset = Profile.objects.select_related('privacy_settings')
 
     def get_context_data(self, *args, **kwargs):
-        profile = self.get_object()
+        profile = self.object
         ctx = super().get_context_data(*args, **kwargs)
         ctx['profile_info'] = profile.privacy_settings.get_public_info().items()
         ctx['profile_chats'] = profile.get_active_chats()
@@ -2,6 +2,8 @@
 ASGI config for settings project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Http requests are served by django, websocket connections are routed
+by ``apps.chats.routing``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
@@ -13,4 +15,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Import after django setup, because consumers import models
+from apps.chats.routing import websocket_application
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
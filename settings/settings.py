@@ -41,6 +41,7 @@ BUILT_IN_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -50,6 +51,7 @@ THIRD_PARTY_APPS = [
 ]
 
 LOCAL_APPS = [
+    'apps.core',
     'apps.users',
     'apps.chats',
 ]
@@ -57,6 +59,7 @@ LOCAL_APPS = [
 INSTALLED_APPS = BUILT_IN_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'apps.core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -125,8 +128,9 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'users.Profile'
 
+# EmailOrUsernameLoginBackend extends ModelBackend and caches
+# permissions, so ModelBackend itself isn't needed.
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
     'apps.users.backends.EmailOrUsernameLoginBackend',
 ]
 
@@ -152,14 +156,71 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static'
 ]
 STATIC_ROOT = '/static/'
+# Names of collected files contain hash of content, so they can be
+# served with `Cache-Control: immutable` (see apps.core.storage)
+STATICFILES_STORAGE = 'apps.core.storage.ManifestStaticStorage'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# How media files are sent (see apps.core.views.serve_media):
+# None - FileResponse (sendfile through wsgi.file_wrapper if available),
+# 'x-accel-redirect' - by nginx from internal location
+# MEDIA_ACCEL_REDIRECT_PREFIX, 'x-sendfile' - by apache/lighttpd.
+MEDIA_SERVE_MODE = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+# Cache lifetime of media which isn't content-addressed (e.g. defaults)
+MEDIA_CACHE_MAX_AGE = 60 * 60
+
+# Uploaded files are named by hash of content (see apps.core.storage)
+DEFAULT_FILE_STORAGE = 'apps.core.storage.ContentAddressedStorage'
+# Directories of media where unreferenced files are
+# removed by `manage.py collect_media_garbage`
+MEDIA_GC_DIRECTORIES = ['users_avatars', 'chats_avatars']
+
+# Max sizes of uploaded files in bytes by kind (see apps.core.uploads)
+UPLOAD_MAX_SIZES = {
+    'image': 1024 * 1024,
+    'attachment': 10 * 1024 * 1024,
+}
+UPLOAD_FIELD_KINDS = {
+    # name of form field: kind of upload, other fields are attachments
+    'avatar': 'image',
+    'avatar_image': 'image',
+}
+FILE_UPLOAD_HANDLERS = [
+    'apps.core.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Renditions of uploaded avatars (see apps.core.images)
+IMAGE_RENDITIONS = {
+    # name: size of square in pixels
+    'small': 64,
+    'medium': 128,
+    'large': 256,
+}
+IMAGE_RENDITION_FORMATS = ['webp', 'jpeg']
+IMAGE_RENDITION_QUALITY = 80
+# Seconds missing renditions of broken image aren't generated again
+IMAGE_RENDITION_RETRY_DELAY = 60 * 60
+
 # Settings for login
 LOGIN_REDIRECT_URL =  '/admin/'
 LOGIN_URL = '/auth/login/'
 
+# Settings for cache of authenticated users and their permissions
+# (see apps.users.cache)
+USERS_CACHE_MAX_SIZE = 1024
+# Seconds user lives in process memory. Other processes don't see
+# invalidations of local cache, so keep it short.
+USERS_CACHE_TTL = 5
+# Alias of shared cache (e.g. memcached or redis) used as second
+# layer, None disables it.
+USERS_CACHE_ALIAS = None
+USERS_CACHE_TIMEOUT = 300
+
 # Settings for registration
 REGISTRATION_REDIRECT_URL = LOGIN_REDIRECT_URL
 
@@ -171,6 +232,17 @@ EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD')
 EMAIL_USE_SSL = True
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Settings for email outbox (see apps.core.mail)
+# Backend used by send_queued_mail worker, None means EMAIL_BACKEND.
+# For local testing use 'django.core.mail.backends.console.EmailBackend'
+# or 'django.core.mail.backends.filebased.EmailBackend'.
+EMAIL_QUEUE_BACKEND = None
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+# Seconds before first retry, doubles after every failed attempt
+EMAIL_QUEUE_RETRY_DELAY = 60
+# Seconds between polls of empty outbox
+EMAIL_QUEUE_POLL_INTERVAL = 5
+
 # DJANGO REST FRAMEWORK Settings 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
@@ -178,7 +250,71 @@ REST_FRAMEWORK = {
     ],
     'DATETIME_FORMAT': '%d.%m.%Y %H:%M:%S',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ]
 }
+
+# Settings for sessions (see apps.core.sessions)
+SESSION_ENGINE = 'apps.core.sessions'
+# Sessions which are longer when signed are stored in cache and database
+SESSION_COOKIE_MAX_DATA_SIZE = 2048
+SESSION_PURGE_BATCH_SIZE = 1000
+
+# Settings for cleanup of expired tokens and unconfirmed profiles
+# (see apps.users.cleanup)
+# Seconds after registration when unconfirmed profile is deleted
+USERS_UNCONFIRMED_LIFETIME = 60 * 60 * 24 * 7
+USERS_CLEANUP_BATCH_SIZE = 500
+# Seconds between runs of `cleanup_users --loop`
+USERS_CLEANUP_INTERVAL = 60 * 10
+
+# Settings for bulk import of users (see apps.users.imports)
+# Users inserted in one transaction
+USERS_IMPORT_CHUNK_SIZE = 1000
+# Processes hashing passwords, None means number of CPUs
+USERS_IMPORT_PROCESSES = None
+# Limits of import through API, where passwords are hashed in request.
+# Bigger imports are done by `manage.py import_users`.
+USERS_IMPORT_API_MAX_ROWS = 100
+USERS_IMPORT_API_MAX_SIZE = 1024 * 1024
+
+# Settings for tokens of REST API (see api.users.authentication)
+# Seconds since creation after which token must be rotated
+API_TOKEN_LIFETIME = 60 * 60 * 24 * 30
+API_TOKENS_CACHE_MAX_SIZE = 4096
+# Seconds token lives in process memory, shared cache is set by
+# USERS_CACHE_ALIAS.
+API_TOKENS_CACHE_TTL = 5
+# Seconds unknown token is remembered, so it doesn't hit database
+API_TOKENS_NEGATIVE_CACHE_TTL = 5
+
+# Settings for real-time chats
+CHATS_PUBSUB_BROKER = 'apps.chats.pubsub.InMemoryBroker'
+# Seconds after which access of connected user is checked again before
+# delivering message, posting always checks it
+CHATS_ACCESS_CHECK_INTERVAL = 60
+
+# Text search configuration used for chats search (see apps.chats.search)
+CHATS_SEARCH_CONFIG = 'english'
+
+# Settings for cache of rendered and serialized chats (see apps.chats.cache)
+CHATS_CACHE_ALIAS = 'default'
+CHATS_CACHE_TIMEOUT = 60 * 60
+
+# Settings for per-request query budget (see apps.core.middleware)
+QUERY_BUDGET_DEFAULT = 30
+QUERY_BUDGETS = {
+    # url name: max number of queries
+    'chats:chat-list': 8,
+    'chats:chat': 5,
+    'chats:chat-edit': 6,
+    'users:profile': 5,
+    'users:login': 15,
+}
+# Same statement executed more times than this is reported as N+1
+QUERY_BUDGET_REPEATED_LIMIT = 5
+# Raise exception instead of logging warning (enabled by TEST_RUNNER)
+QUERY_BUDGET_STRICT = False
+
+TEST_RUNNER = 'apps.core.runner.TestRunner'
@@ -15,12 +15,13 @@ Including another URLconf
 """
 from django.contrib.staticfiles.storage import staticfiles_storage
 from django.views.generic.base import RedirectView
-from django.conf.urls.static import static
 from django.urls import path, include
 from django.contrib import admin
 from django.conf import settings
 from django.urls import reverse
 
+from apps.core.views import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('favicon.ico', RedirectView.as_view(url=staticfiles_storage.url('images/favicon.ico'))),
@@ -28,4 +29,9 @@ urlpatterns = [
     path('', include('apps.users.urls')),
     path('api/', include('api.api_urls')),
     path('chats/', include('apps.chats.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(
+        settings.MEDIA_URL.lstrip('/') + '<path:path>',
+        serve_media,
+        name='media',
+    ),
+]
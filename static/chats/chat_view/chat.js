@@ -0,0 +1,62 @@
+const messagesBox = document.getElementById("chatMessages");
+const messageForm = document.getElementById("chatMessageForm");
+const messageField = document.getElementById("chatMessageField");
+
+const scheme = window.location.protocol === "https:" ? "wss://" : "ws://";
+let socket = null;
+
+
+function renderMessage(message){
+    const wrapper = document.createElement("div");
+    wrapper.className = "chat__message mb-1";
+
+    const author = document.createElement("b");
+    author.textContent = message.author_username + ": ";
+
+    const text = document.createElement("span");
+    text.textContent = message.text;
+
+    wrapper.append(author, text);
+    messagesBox.append(wrapper);
+    messagesBox.scrollTop = messagesBox.scrollHeight;
+}
+
+
+function loadHistory(){
+    // Latest page of messages, newer ones come from websocket
+    return fetch(messagesBox.dataset.historyUrl, {credentials: "same-origin"})
+        .then(response => response.json())
+        .then(data => data.results.forEach(renderMessage));
+}
+
+
+function connect(){
+    socket = new WebSocket(scheme + window.location.host + messagesBox.dataset.websocketUrl);
+
+    socket.onmessage = function(event){
+        const data = JSON.parse(event.data);
+        if (data.type === "message"){
+            renderMessage(data);
+        }
+    };
+
+    socket.onclose = function(event){
+        // Reconnect only if connection was lost, not rejected by server
+        if (event.code < 4000){
+            setTimeout(connect, 2000);
+        }
+    };
+}
+
+
+messageForm.addEventListener("submit", function(event){
+    event.preventDefault();
+    if (messageField.value.trim().length === 0 || socket.readyState !== WebSocket.OPEN){
+        return;
+    }
+    socket.send(JSON.stringify({"text": messageField.value}));
+    messageField.value = "";
+});
+
+
+loadHistory().finally(connect);